@@ -0,0 +1,95 @@
+"""
+Compares the sync WSGI chat endpoint with the async ASGI one under simulated
+upstream latency.
+
+    python -m benchmarks.async_vs_sync --requests 200 --concurrency 50 --latency 0.2
+
+Both servers run as a single worker process against the same local stub
+upstream; the sync server gets ``--threads`` gunicorn threads.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from benchmarks.harness import app_env, asgi_command, free_port, percentile, start_server, start_stub, wsgi_command
+
+MESSAGE = "What is John working on these days?"
+
+
+async def _drive(url, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(total=120),
+    ) as client:
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with client.post(url, json={"message": MESSAGE}) as resp:
+                        await resp.read()
+                        if resp.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies, errors
+
+
+def _report(label, elapsed, latencies, errors):
+    ordered = sorted(latencies)
+    p95 = percentile(ordered, 0.95)
+    print(
+        f"{label:<6} {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(ordered) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated upstream latency in seconds")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads for the sync server")
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub(args.latency)
+    env = app_env(stub_url)
+
+    sync_port, async_port = free_port(), free_port()
+    servers = {
+        "wsgi": (wsgi_command(sync_port, threads=args.threads), f"http://127.0.0.1:{sync_port}/api/chat/", sync_port),
+        "asgi": (asgi_command(async_port), f"http://127.0.0.1:{async_port}/api/chat/async/", async_port),
+    }
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, upstream latency {args.latency * 1000:.0f} ms")
+    try:
+        for label, (command, url, port) in servers.items():
+            proc = start_server(command, env, f"http://127.0.0.1:{port}/ping")
+            try:
+                _report(label, *asyncio.run(_drive(url, args.requests, args.concurrency)))
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
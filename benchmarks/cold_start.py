@@ -0,0 +1,172 @@
+"""
+Compares worker cold start and per-request overhead of the default and the
+lean (``settings_lean``) settings profiles, with and without PRELOAD_APP.
+
+    python -m benchmarks.cold_start --runs 5 --requests 2000
+
+Each measurement runs in a fresh interpreter and calls the WSGI application
+directly, so the numbers are Django's own cost without any network:
+
+- boot: importing and creating the WSGI application (what a worker does
+  before it can accept requests)
+- first ping / first chat: the first requests, which import the URLconf,
+  views and upstream clients unless they were preloaded
+- ping / chat: mean time per request once warm; the chat request names no
+  one, so it runs parsing and validation without upstream calls
+
+``--gunicorn`` also times a single gunicorn worker until it answers /ping.
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.harness import BASE_DIR, free_port, wsgi_command
+
+PROFILES = {"default": "team_activity_tracker.settings", "lean": "team_activity_tracker.settings_lean"}
+
+CHAT_BODY = json.dumps({"message": "hello there"}).encode()
+
+
+def _environ(method, path, body=b""):
+    return {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "SERVER_NAME": "127.0.0.1",
+        "SERVER_PORT": "8000",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+
+def _call(application, method, path, body=b""):
+    start = time.perf_counter()
+    result = application(_environ(method, path, body), lambda status, headers, exc_info=None: None)
+    b"".join(result)
+    result.close()
+    return time.perf_counter() - start
+
+
+def _child(requests):
+    """
+    Runs inside the fresh interpreter and prints its measurements as JSON.
+    """
+    start = time.perf_counter()
+    from team_activity_tracker.wsgi import application  # pylint: disable=import-outside-toplevel
+
+    boot = time.perf_counter() - start
+    first_ping = _call(application, "GET", "/ping")
+    first_chat = _call(application, "POST", "/api/chat/", CHAT_BODY)
+    ping = sum(_call(application, "GET", "/ping") for _ in range(requests)) / requests
+    chat = sum(_call(application, "POST", "/api/chat/", CHAT_BODY) for _ in range(requests)) / requests
+
+    print(
+        json.dumps(
+            {
+                "boot": boot,
+                "first_ping": first_ping,
+                "first_chat": first_chat,
+                "ping": ping,
+                "chat": chat,
+                "modules": len(sys.modules),
+            }
+        )
+    )
+
+
+def _env(settings, preload):
+    return dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=settings,
+        PRELOAD_APP="1" if preload else "0",
+        ACTIVITY_STORE_MAX_AGE="0",
+    )
+
+
+def _measure(settings, preload, requests):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--child", f"--requests={requests}"],
+        cwd=BASE_DIR,
+        env=_env(settings, preload),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _gunicorn_ready(settings, preload):
+    port = free_port()
+    command = wsgi_command(port) + (["--preload"] if preload else [])
+    start = time.perf_counter()
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        command, cwd=BASE_DIR, env=_env(settings, preload), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ping", timeout=1.0):
+                    return time.perf_counter() - start
+            except OSError:
+                if time.perf_counter() - start > 30:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per configuration (median taken)")
+    parser.add_argument("--requests", type=int, default=2000, help="warm requests timed per run")
+    parser.add_argument("--gunicorn", action="store_true", help="also time gunicorn until /ping answers")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.requests)
+        return
+
+    header = (
+        f"{'profile':<8} {'preload':<8} {'boot ms':>8} {'1st ping':>9} {'1st chat':>9} "
+        f"{'ping us':>8} {'chat us':>8} {'modules':>8}"
+    )
+    if args.gunicorn:
+        header += f" {'gunicorn':>9}"
+    print(header)
+
+    for profile, settings in PROFILES.items():
+        for preload in (False, True):
+            runs = [_measure(settings, preload, args.requests) for _ in range(args.runs)]
+
+            def median(key, runs=runs):
+                return statistics.median(run[key] for run in runs)
+
+            row = (
+                f"{profile:<8} {'yes' if preload else 'no':<8} {median('boot') * 1000:>8.1f} "
+                f"{median('first_ping') * 1000:>9.1f} {median('first_chat') * 1000:>9.1f} "
+                f"{median('ping') * 1e6:>8.1f} {median('chat') * 1e6:>8.1f} {median('modules'):>8.0f}"
+            )
+            if args.gunicorn:
+                ready = statistics.median(_gunicorn_ready(settings, preload) for _ in range(args.runs))
+                row += f" {ready * 1000:>7.0f}ms"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Helpers shared by the load tests: starting the stub upstream and app
+servers as subprocesses and summarising latencies.
+"""
+
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def start_server(command, env, health_url):
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        command,
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(health_url)
+    except RuntimeError:
+        proc.terminate()
+        raise
+    return proc
+
+
+def start_stub(latency, items=20, error_rate=0.0, text_size=0):
+    """
+    Starts ``benchmarks.stub_upstream`` in its own process, so it doesn't
+    compete with the load generator for the GIL. Returns the process and
+    its base URL.
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.stub_upstream",
+        f"--port={port}",
+        f"--latency={latency}",
+        f"--items={items}",
+        f"--error-rate={error_rate}",
+        f"--text-size={text_size}",
+    ]
+    return start_server(command, os.environ, f"{url}/health"), url
+
+
+def app_env(stub_url, caches=False):
+    """
+    Environment for an app server talking to the stub. Response caches are
+    off unless ``caches``, so every chat reaches the upstreams.
+    """
+    env = dict(
+        os.environ,
+        GITHUB_BASE_URL=stub_url,
+        JIRA_BASE_URL=stub_url,
+        JIRA_ACCOUNT_ID=os.environ.get("JIRA_ACCOUNT_ID", "stub-account"),
+        ACTIVITY_STORE_MAX_AGE="0",
+    )
+    if not caches:
+        env.update(GITHUB_CACHE_TTL="0", JIRA_CACHE_TTL="0", ACTIVITY_CACHE_TTL="0")
+    return env
+
+
+def wsgi_command(port, workers=1, threads=4):
+    return [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "team_activity_tracker.wsgi:application",
+        f"--workers={workers}",
+        f"--threads={threads}",
+        f"--bind=127.0.0.1:{port}",
+    ]
+
+
+def asgi_command(port, workers=1):
+    return [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "team_activity_tracker.asgi:application",
+        f"--workers={workers}",
+        f"--port={port}",
+        "--log-level=warning",
+    ]
+
+
+def percentile(ordered, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return float("nan")
+    rank = max(1, min(len(ordered), math.ceil(fraction * len(ordered))))
+    return ordered[rank - 1]
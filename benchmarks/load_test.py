@@ -0,0 +1,182 @@
+"""
+Load test for the chat endpoint against the local stub upstream.
+
+Starts the stub (with ``--latency``, ``--error-rate``, ``--items`` and
+``--text-size``) and a single app server, then posts a weighted mix of
+intents to the chat endpoint at fixed concurrency and reports throughput
+and p50/p95/p99 latency, overall and per intent.
+
+    python -m benchmarks.load_test --requests 1000 --concurrency 32 --latency 0.1
+    python -m benchmarks.load_test --server asgi --error-rate 0.02 --mix BOTH=3,GITHUB_PRS=1
+    python -m benchmarks.load_test --url http://127.0.0.1:8000/api/chat/
+
+With ``--url`` nothing is started and the given endpoint is driven as is.
+Response caches are off unless ``--caches`` is passed.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import urllib.request
+from collections import defaultdict
+
+import aiohttp
+
+from benchmarks.harness import app_env, asgi_command, free_port, percentile, start_server, start_stub, wsgi_command
+
+NAMES = ["John", "Sarah", "Mike"]
+
+# One phrasing per intent the parser recognises
+MESSAGES = {
+    "BOTH": "What is {} working on these days?",
+    "JIRA_ONLY": "What jira tickets is {} working on this week?",
+    "GITHUB_COMMITS": "Show me {}'s commits this week",
+    "GITHUB_PRS": "Which pull requests does {} have open?",
+    "GITHUB_REPOS": "Which repos has {} contributed to?",
+    "GITHUB_ONLY": "How active is {} on github?",
+}
+
+DEFAULT_MIX = "BOTH=40,JIRA_ONLY=20,GITHUB_COMMITS=15,GITHUB_PRS=10,GITHUB_REPOS=10,GITHUB_ONLY=5"
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        intent, _, weight = part.partition("=")
+        intent = intent.strip().upper()
+        if intent not in MESSAGES:
+            raise argparse.ArgumentTypeError(f"unknown intent {intent!r}, expected one of {', '.join(MESSAGES)}")
+        mix[intent] = float(weight or 1)
+    return mix
+
+
+def _workload(mix, total, seed):
+    rng = random.Random(seed)
+    intents = rng.choices(list(mix), weights=list(mix.values()), k=total)
+    return [(intent, MESSAGES[intent].format(rng.choice(NAMES))) for intent in intents]
+
+
+async def _drive(url, workload, concurrency):
+    results = []
+    queue = iter(workload)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        timeout=aiohttp.ClientTimeout(total=120),
+    ) as client:
+
+        async def worker():
+            for intent, message in queue:
+                start = time.perf_counter()
+                try:
+                    async with client.post(url, json={"message": message}) as resp:
+                        await resp.read()
+                        ok = resp.status == 200
+                except aiohttp.ClientError:
+                    ok = False
+                results.append((intent, time.perf_counter() - start, ok))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, results
+
+
+def _row(label, latencies, errors):
+    ordered = sorted(latencies)
+    return (
+        f"{label:<15} {len(ordered):>6} {errors:>6} "
+        f"{statistics.median(ordered) * 1000:>9.1f} "
+        f"{percentile(ordered, 0.95) * 1000:>9.1f} "
+        f"{percentile(ordered, 0.99) * 1000:>9.1f}"
+    )
+
+
+def _report(elapsed, results):
+    by_intent = defaultdict(list)
+    errors = defaultdict(int)
+    for intent, latency, ok in results:
+        by_intent[intent].append(latency)
+        errors[intent] += not ok
+
+    print(f"\n{len(results) / elapsed:.1f} req/s over {elapsed:.2f}s")
+    print(f"{'intent':<15} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for intent in MESSAGES:
+        if intent in by_intent:
+            print(_row(intent, by_intent[intent], errors[intent]))
+    print(_row("all", [latency for _, latency, _ in results], sum(errors.values())))
+
+
+def _get_json(url):
+    try:
+        with urllib.request.urlopen(url, timeout=2.0) as resp:
+            return json.load(resp)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help="INTENT=weight,...")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker (wsgi)")
+    parser.add_argument("--caches", action="store_true", help="keep the GitHub and activity caches on")
+    parser.add_argument("--url", help="drive this chat endpoint instead of starting a stub and server")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub responses that fail with a 500")
+    parser.add_argument("--items", type=int, default=20, help="items per stub search response")
+    parser.add_argument("--text-size", type=int, default=0, help="pad stub summaries and messages to this size")
+    args = parser.parse_args()
+
+    workload = _workload(args.mix, args.requests, args.seed)
+    warmup = _workload(args.mix, args.warmup, args.seed + 1)
+
+    if args.url:
+        elapsed, results = asyncio.run(_drive(args.url, warmup + workload, args.concurrency))
+        _report(elapsed, results[len(warmup) :])
+        return
+
+    stub, stub_url = start_stub(args.latency, args.items, args.error_rate, args.text_size)
+    port = free_port()
+    if args.server == "asgi":
+        command, path = asgi_command(port, args.workers), "/api/chat/async/"
+    else:
+        command, path = wsgi_command(port, args.workers, args.threads), "/api/chat/"
+
+    print(
+        f"{args.server}: {args.requests} requests, concurrency {args.concurrency}, "
+        f"upstream latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.1%}"
+    )
+    try:
+        proc = start_server(command, app_env(stub_url, caches=args.caches), f"http://127.0.0.1:{port}/ping")
+        try:
+            url = f"http://127.0.0.1:{port}{path}"
+            asyncio.run(_drive(url, warmup, args.concurrency))
+            before = _get_json(f"{stub_url}/health") or {}
+            _report(*asyncio.run(_drive(url, workload, args.concurrency)))
+
+            after = _get_json(f"{stub_url}/health") or {}
+            upstream = {key: after.get(key, 0) - before.get(key, 0) for key in ("requests", "errors")}
+            print(f"\nupstream calls {upstream['requests']}, injected errors {upstream['errors']}")
+            circuits = _get_json(f"http://127.0.0.1:{port}/api/circuits/")
+            if circuits:
+                print("circuits:", {name: state["state"] for name, state in circuits["data"].items()})
+        finally:
+            proc.terminate()
+            proc.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Memory cost of reading upstream search responses: decoding the whole body
+with ``json.loads`` and copying fields into dicts (how the clients used to
+read them) against decoding it incrementally into records with
+``ItemDecoder`` while it streams in.
+
+    python -m benchmarks.memory --items 100 1000 5000
+
+Commit search items are padded to the shape of real GitHub search results
+(author, committer and repository objects with their API URLs), about 6 KB
+each, since most of that is what the clients throw away. For each size it
+reports, per approach:
+
+- peak: the most memory held while reading one response, including the
+  body (the whole of it, or one network chunk when streaming)
+- kept: what the extracted results hold once the response is gone
+- ms: time to decode it
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.stub_upstream import _commit_items, _jira_issues
+from chatbot.json_stream import ItemDecoder
+from chatbot.records import CommitRecord, JiraIssueRecord
+from chatbot.transport import STREAM_CHUNK_SIZE
+
+_USER_URLS = [
+    "url",
+    "html_url",
+    "followers_url",
+    "following_url",
+    "gists_url",
+    "starred_url",
+    "subscriptions_url",
+    "organizations_url",
+    "repos_url",
+    "events_url",
+    "received_events_url",
+]
+
+_REPO_URLS = [
+    "url",
+    "html_url",
+    "forks_url",
+    "keys_url",
+    "collaborators_url",
+    "teams_url",
+    "hooks_url",
+    "issue_events_url",
+    "events_url",
+    "assignees_url",
+    "branches_url",
+    "tags_url",
+    "blobs_url",
+    "git_tags_url",
+    "git_refs_url",
+    "trees_url",
+    "statuses_url",
+    "languages_url",
+    "stargazers_url",
+    "contributors_url",
+    "subscribers_url",
+    "subscription_url",
+    "commits_url",
+    "git_commits_url",
+    "comments_url",
+    "issue_comment_url",
+    "contents_url",
+    "compare_url",
+    "merges_url",
+    "archive_url",
+    "downloads_url",
+    "issues_url",
+    "pulls_url",
+    "milestones_url",
+    "notifications_url",
+    "labels_url",
+    "releases_url",
+    "deployments_url",
+]
+
+
+def _user(login):
+    return {
+        "login": login,
+        "id": 1234567,
+        "node_id": "MDQ6VXNlcjEyMzQ1Njc=",
+        "avatar_url": "https://avatars.githubusercontent.com/u/1234567?v=4",
+        "gravatar_id": "",
+        **{name: f"https://api.github.com/users/{login}/{name[:-4]}" for name in _USER_URLS},
+        "type": "User",
+        "site_admin": False,
+    }
+
+
+def _github_commit_item(item):
+    """
+    Pads a stub commit search item with the fields GitHub also returns.
+    """
+    repo = item["repository"]["full_name"]
+    sha = item["sha"]
+    item["node_id"] = f"C_kwDO{sha[:24]}"
+    item["url"] = f"https://api.github.com/repos/{repo}/commits/{sha}"
+    item["html_url"] = f"https://github.com/{repo}/commit/{sha}"
+    item["comments_url"] = f"https://api.github.com/repos/{repo}/commits/{sha}/comments"
+    item["commit"]["committer"] = dict(item["commit"]["author"], name="John Doe", email="john@example.com")
+    item["commit"]["author"].update(name="John Doe", email="john@example.com")
+    item["commit"]["tree"] = {"sha": sha, "url": f"https://api.github.com/repos/{repo}/git/trees/{sha}"}
+    item["commit"]["comment_count"] = 0
+    item["author"] = _user("john-doe")
+    item["committer"] = _user("web-flow")
+    item["parents"] = [{"sha": sha, "url": item["url"], "html_url": item["html_url"]}]
+    item["repository"].update(
+        {
+            "id": 987654321,
+            "node_id": "R_kgDOHt0vXw",
+            "name": repo.split("/")[1],
+            "private": False,
+            "owner": _user(repo.split("/")[0]),
+            "description": "A repository with a reasonably long description of what it does",
+            "fork": False,
+            **{name: f"https://api.github.com/repos/{repo}/{name[:-4]}" for name in _REPO_URLS},
+        }
+    )
+    item["score"] = 1.0
+    return item
+
+
+def _bodies(items):
+    commits = {"total_count": items, "incomplete_results": False}
+    commits["items"] = [_github_commit_item(item) for item in _commit_items(items)]
+    issues = {"issues": _jira_issues(items), "isLast": True}
+    return {"github commits": json.dumps(commits).encode(), "jira issues": json.dumps(issues).encode()}
+
+
+def _chunks(body):
+    for start in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[start : start + STREAM_CHUNK_SIZE]
+
+
+# Before: the whole body is read, decoded, and fields are copied into dicts
+
+
+def _commit_dict(item):
+    return {
+        "sha": item["sha"],
+        "repo": item["repository"]["full_name"],
+        "message": item["commit"]["message"],
+        "date": item["commit"]["author"]["date"],
+    }
+
+
+def _issue_dict(issue):
+    return {
+        "key": issue["key"],
+        "summary": issue["fields"]["summary"],
+        "status": issue["fields"]["status"]["name"],
+        "updated": issue["fields"]["updated"],
+    }
+
+
+def _read_whole(body, key, extract):
+    content = b"".join(_chunks(body))
+    data = json.loads(content)
+    return [extract(item) for item in data[key]]
+
+
+# After: items are decoded one at a time into records as chunks arrive
+
+
+def _commit_record(item):
+    return CommitRecord(
+        item["sha"], item["repository"]["full_name"], item["commit"]["message"], item["commit"]["author"]["date"]
+    )
+
+
+def _issue_record(issue):
+    fields = issue["fields"]
+    return JiraIssueRecord(issue["key"], fields["summary"], fields["status"]["name"], fields["updated"])
+
+
+def _read_streamed(body, key, record):
+    decoder = ItemDecoder(key, record)
+    for chunk in _chunks(body):
+        decoder.feed(chunk)
+    return decoder.close()[key]
+
+
+APPROACHES = {
+    "json.loads + dicts": (_read_whole, {"github commits": _commit_dict, "jira issues": _issue_dict}),
+    "streamed + records": (_read_streamed, {"github commits": _commit_record, "jira issues": _issue_record}),
+}
+
+ARRAY_KEYS = {"github commits": "items", "jira issues": "issues"}
+
+
+def _measure(read, body, key, extract):
+    # Timed untraced first, which also keeps one-off allocations out of
+    # the traced run
+    start = time.perf_counter()
+    read(body, key, extract)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    results = read(body, key, extract)
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return peak, kept, elapsed
+
+
+def _kb(size):
+    return f"{size / 1024:,.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 5000], help="items per response")
+    args = parser.parse_args()
+
+    print(f"{'response':<16} {'items':>6} {'body KB':>9} {'approach':<20} {'peak KB':>9} {'kept KB':>9} {'ms':>8}")
+    for items in args.items:
+        for label, body in _bodies(items).items():
+            for approach, (read, extractors) in APPROACHES.items():
+                peak, kept, elapsed = _measure(read, body, ARRAY_KEYS[label], extractors[label])
+                print(
+                    f"{label:<16} {items:>6} {_kb(len(body)):>9} {approach:<20} "
+                    f"{_kb(peak):>9} {_kb(kept):>9} {elapsed * 1000:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Microbenchmarks for the CPU-bound parts of a chat: message parsing, the
+response templates, the metrics recorded on the hot path and analytics
+queries over the activity rollups.
+
+    python -m benchmarks.microbench --items 5 20 100
+
+Each case reports the best per-call time over ``--repeat`` rounds.
+"""
+
+import argparse
+import timeit
+from datetime import date, timedelta
+
+from benchmarks.load_test import MESSAGES, NAMES
+from chatbot.metrics import Counter, Histogram, request_timings, stage
+from chatbot.query_parser import extract_name_and_intent
+from chatbot.records import CommitRecord, JiraIssueRecord, PullRequestRecord
+from chatbot.response_generator import (
+    combined_template,
+    github_commits_template,
+    github_prs_template,
+    github_repos_template,
+    github_template,
+    jira_template,
+    team_template,
+)
+from chatbot.rollups import ActivityRollups
+
+DATE = "2024-01-01T00:00:00Z"
+
+
+def _issues(count):
+    return [JiraIssueRecord(f"PROJ-{i}", f"Issue number {i}", "In Progress", DATE) for i in range(count)]
+
+
+def _commits(count):
+    return [CommitRecord(f"{i:040x}", f"org/repo-{i % 7}", f"Commit number {i}", DATE) for i in range(count)]
+
+
+def _prs(count):
+    return [
+        PullRequestRecord(f"Pull request {i}", f"org/repo-{i % 7}", f"https://example.com/{i}") for i in range(count)
+    ]
+
+
+def _best_us(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def _parser_cases():
+    messages = [template.format(name) for template in MESSAGES.values() for name in NAMES]
+    for intent, template in MESSAGES.items():
+        # Guards the load test mix against parser changes
+        parsed = extract_name_and_intent(template.format(NAMES[0]))[1]
+        assert parsed == intent, f"{template!r} parses as {parsed}, not {intent}"
+
+    yield "extract_name_and_intent", len(messages), lambda: [extract_name_and_intent(m) for m in messages]
+
+
+def _template_cases(items):
+    issues, commits, prs = _issues(items), _commits(items), _prs(items)
+    repos = [f"org/repo-{i}" for i in range(items)]
+    replies = [combined_template(name, issues, commits) for name in NAMES]
+
+    yield "jira_template", 1, lambda: jira_template("John", issues)
+    yield "github_commits_template", 1, lambda: github_commits_template("John", commits)
+    yield "github_prs_template", 1, lambda: github_prs_template("John", prs)
+    yield "github_repos_template", 1, lambda: github_repos_template("John", repos)
+    yield "github_template", 1, lambda: github_template("John", {"commits": items, "pull_requests": items})
+    yield "combined_template", 1, lambda: combined_template("John", issues, commits)
+    yield "team_template", 1, lambda: team_template("Everyone", replies)
+
+
+def _noop():
+    pass
+
+
+def _metrics_cases():
+    histogram = Histogram("bench_seconds", "", ["stage"])
+    counter = Counter("bench_total", "", ["upstream", "status"])
+
+    def timed_stage():
+        with stage("bench", histogram):
+            pass
+
+    yield "Histogram.observe", 1, lambda: histogram.observe(0.012, "bench")
+    yield "Counter.inc", 1, lambda: counter.inc("bench", "200")
+    yield "stage() outside a request", 1, timed_stage
+    with request_timings():
+        yield "stage() inside a request", 1, timed_stage
+    yield "empty call (baseline)", 1, _noop
+
+
+def _analytics_cases(users=100, days=365):
+    today = date(2024, 12, 31)
+    names = [f"user-{u}" for u in range(users)]
+    daily = {
+        "commits": {name: {today - timedelta(days=d): (u + d) % 5 for d in range(days)} for u, name in enumerate(names)}
+    }
+    rollups = ActivityRollups(daily, today)
+
+    yield f"rollups build {users}x{days}d", 1, lambda: ActivityRollups(daily, today)
+    yield f"leaderboard 30d, {users} users", 1, lambda: rollups.totals("commits", names, 30, today)
+    yield f"per day 30d, {users} users", 1, lambda: rollups.daily("commits", names, 30, today)
+    yield f"per day 365d, {users} users", 1, lambda: rollups.daily("commits", names, 365, today)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[5, 20, 100], help="records per template")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<26} {'items':>6} {'us/call':>10}")
+    for label, calls, fn in _parser_cases():
+        print(f"{label:<26} {'-':>6} {_best_us(fn, args.repeat) / calls:>10.2f}")
+    for label, calls, fn in _metrics_cases():
+        print(f"{label:<26} {'-':>6} {_best_us(fn, args.repeat) / calls:>10.2f}")
+    for label, calls, fn in _analytics_cases():
+        print(f"{label:<26} {'-':>6} {_best_us(fn, args.repeat) / calls:>10.2f}")
+    for items in args.items:
+        for label, calls, fn in _template_cases(items):
+            print(f"{label:<26} {items:>6} {_best_us(fn, args.repeat) / calls:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
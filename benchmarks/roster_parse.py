@@ -0,0 +1,83 @@
+"""
+Measures name resolution against rosters of growing size, comparing the
+token-trie RosterIndex with the regex alternation it replaced.
+
+    python -m benchmarks.roster_parse --sizes 10 1000 10000 --messages 2000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from chatbot.roster import Member, RosterIndex
+
+TEMPLATES = [
+    "What is {} working on these days?",
+    "Show me {}'s commits this week",
+    "Which pull requests does {} have open?",
+    "what jira tickets is {} assigned to this month",
+    "Has anyone heard from the team today?",
+]
+
+
+def _roster(size):
+    return [
+        Member(
+            name=f"member{i}",
+            jira_account_id=f"account-{i}",
+            github_username=f"gh-{i}",
+            aliases=(f"first{i} last{i}",),
+        )
+        for i in range(size)
+    ]
+
+
+def _messages(members, count, seed=0):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        member = rng.choice(members)
+        name = rng.choice((member.name, *member.aliases))
+        messages.append(rng.choice(TEMPLATES).format(name))
+    return messages
+
+
+def _per_message_us(fn, messages):
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'members':>8} {'build trie':>11} {'trie':>10} {'build regex':>12} {'regex':>10}")
+    for size in args.sizes:
+        members = _roster(size)
+        messages = _messages(members, args.messages)
+
+        start = time.perf_counter()
+        index = RosterIndex(members)
+        trie_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        aliases = sorted((alias for m in members for alias in (m.name, *m.aliases)), key=len, reverse=True)
+        pattern = re.compile(r"\b(" + "|".join(map(re.escape, aliases)) + r")\b")
+        regex_build = time.perf_counter() - start
+
+        trie_us = _per_message_us(index.find, [m.lower() for m in messages])
+        regex_us = _per_message_us(pattern.search, [m.lower() for m in messages])
+
+        print(
+            f"{size:>8} {trie_build * 1000:>9.1f}ms {trie_us:>8.1f}us "
+            f"{regex_build * 1000:>10.1f}ms {regex_us:>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compares the per-process (``local``) and the cross-worker SQLite (``shared``)
+upstream response caches under multi-worker load.
+
+    python -m benchmarks.shared_cache --workers 4 --requests 1000 --concurrency 32
+
+For each backend it starts the stub upstream and gunicorn with ``--workers``
+processes, each with a cold cache, and posts the load test's intent mix.
+Answers are not cached above the upstream caches (ACTIVITY_CACHE_TTL=0),
+so every chat goes through them, and the caches keep entries for ``--ttl``
+seconds so they expire during the run. It reports throughput, latency and
+the upstream calls the stub received: with per-process caches each worker
+fetches every distinct query itself whenever its copy expires, with the
+shared one the host fetches it once.
+
+It also times a cache hit in process, the price of sharing.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import timeit
+
+from benchmarks.harness import app_env, free_port, percentile, start_server, start_stub, wsgi_command
+from benchmarks.load_test import DEFAULT_MIX, _drive, _get_json, _parse_mix, _workload
+from chatbot.cache import TTLCache
+from chatbot.records import CommitRecord
+from chatbot.shared_cache import SharedCache
+
+BACKENDS = ["local", "shared"]
+
+
+def _run(backend, args, stub_url, cache_path):
+    port = free_port()
+    env = dict(
+        app_env(stub_url, caches=True),
+        UPSTREAM_CACHE_BACKEND=backend,
+        UPSTREAM_CACHE_PATH=cache_path,
+        GITHUB_CACHE_TTL=str(args.ttl),
+        JIRA_CACHE_TTL=str(args.ttl),
+        ACTIVITY_CACHE_TTL="0",
+    )
+    proc = start_server(wsgi_command(port, args.workers, args.threads), env, f"http://127.0.0.1:{port}/ping")
+    try:
+        before = _get_json(f"{stub_url}/health") or {}
+        workload = _workload(args.mix, args.requests, args.seed)
+        elapsed, results = asyncio.run(_drive(f"http://127.0.0.1:{port}/api/chat/", workload, args.concurrency))
+        after = _get_json(f"{stub_url}/health") or {}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = sorted(latency for _, latency, _ in results)
+    errors = sum(not ok for _, _, ok in results)
+    print(
+        f"{backend:<8} {len(results) / elapsed:>8.1f} {statistics.median(latencies) * 1000:>9.1f} "
+        f"{percentile(latencies, 0.95) * 1000:>9.1f} {after.get('requests', 0) - before.get('requests', 0):>9} "
+        f"{errors:>7}"
+    )
+
+
+def _hit_cost(cache_path, repeat):
+    page = (
+        {"total_count": 20, "items": [CommitRecord(f"{i:040x}", "org/repo", "message", "date") for i in range(20)]},
+        None,
+    )
+    key = ("https://api.github.com/search/commits", (("q", "author:someone"),))
+    caches = {
+        "local": TTLCache(max_entries=1024, ttl=60),
+        "shared": SharedCache(cache_path, "bench", max_entries=1024, ttl=60, max_bytes=64 * 1024 * 1024),
+    }
+    print(f"\n{'backend':<8} {'hit us':>9} {'set us':>9}")
+    for backend, cache in caches.items():
+        cache.set(key, page)
+        get = timeit.Timer(lambda cache=cache: cache.get(key))
+        put = timeit.Timer(lambda cache=cache: cache.set(key, page))
+        number = get.autorange()[0]
+        hit = min(get.repeat(repeat=repeat, number=number)) / number
+        number = put.autorange()[0]
+        store = min(put.repeat(repeat=repeat, number=number)) / number
+        print(f"{backend:<8} {hit * 1e6:>9.1f} {store * 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help="INTENT=weight,...")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub latency in seconds")
+    parser.add_argument("--ttl", type=float, default=2, help="GitHub and Jira cache TTL in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds of the in-process hit timing")
+    args = parser.parse_args()
+
+    print(
+        f"{args.workers} workers x {args.threads} threads, {args.requests} requests, "
+        f"concurrency {args.concurrency}, upstream latency {args.latency * 1000:.0f} ms"
+    )
+    print(f"{'backend':<8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'upstream':>9} {'errors':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stub, stub_url = start_stub(args.latency)
+        try:
+            for backend in BACKENDS:
+                _run(backend, args, stub_url, os.path.join(tmp, f"{backend}.sqlite3"))
+        finally:
+            stub.terminate()
+            stub.wait()
+
+        _hit_cost(os.path.join(tmp, "hits.sqlite3"), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
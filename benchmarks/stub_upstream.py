@@ -0,0 +1,273 @@
+"""
+Local stand-in for the GitHub search, GitHub GraphQL and Jira search APIs.
+
+Serves canned payloads after a configurable delay so benchmarks can measure
+the app without touching the real upstreams. A share of responses can fail
+with a 500, and ``text_size`` pads summaries and commit messages to grow
+the payloads.
+
+    python -m benchmarks.stub_upstream --port 8900 --latency 0.1 --error-rate 0.01 --items 50 --text-size 200
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+def _text(label, size):
+    return label.ljust(size, ".") if size else label
+
+
+def _commit_items(count, text_size=0):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "sha": f"{i:040x}",
+            "repository": {"full_name": f"org/repo-{i % 7}"},
+            "commit": {
+                "message": _text(f"Commit number {i}", text_size),
+                "author": {"date": (now - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ")},
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def _pr_items(count, text_size=0):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "title": _text(f"Pull request {i}", text_size),
+            "repository_url": f"https://api.github.com/repos/org/repo-{i % 7}",
+            "html_url": f"https://github.com/org/repo-{i % 7}/pull/{i}",
+            "state": "open" if i % 3 else "closed",
+            "created_at": (now - timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updated_at": (now - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "pull_request": {"merged_at": None},
+        }
+        for i in range(count)
+    ]
+
+
+def _jira_issues(count, text_size=0):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "key": f"PROJ-{i}",
+            "fields": {
+                "summary": _text(f"Issue {i}", text_size),
+                "status": {"name": "In Progress"},
+                "updated": (now - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S.000%z"),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+class StubUpstream:
+    def __init__(self, latency=0.1, items=20, error_rate=0.0, text_size=0, host="127.0.0.1", port=0, seed=None):
+        self.latency = latency
+        self.items = items
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        ThreadingHTTPServer.request_queue_size = 1024
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._bodies = {
+            "not_found": json.dumps({"message": "Not Found"}).encode(),
+            "server_error": json.dumps({"message": "Server Error"}).encode(),
+        }
+        self._github_items = {
+            "/search/commits": _commit_items(items, text_size),
+            "/search/issues": _pr_items(items, text_size),
+        }
+        self._github_pages = {}
+        self._jira_issues = _jira_issues(items, text_size)
+        self._jira_pages = {}
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == "/health":
+                    stub.respond_health(self)
+                elif parts.path in stub._github_items:  # pylint: disable=protected-access
+                    body, link = stub.github_page(parts.path, dict(parse_qsl(parts.query)))
+                    stub.respond(self, body, headers={"Link": link} if link else None)
+                else:
+                    stub.respond(self, "not_found", status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                path = urlsplit(self.path).path
+                if path == "/rest/api/3/search/jql":
+                    stub.respond(self, stub.jira_page(payload))
+                elif path == "/graphql":
+                    stub.respond(self, stub.graphql_response(payload))
+                else:
+                    stub.respond(self, "not_found", status=404)
+
+        return Handler
+
+    def github_page(self, path, query):
+        """
+        Returns the encoded page for a GitHub search and its ``Link`` header,
+        paginated with ``page``/``per_page`` like the real API.
+        """
+        page = int(query.get("page") or 1)
+        per_page = int(query.get("per_page") or 30)
+        items = self._github_items[path]
+        key = (path, page, per_page)
+        if key not in self._github_pages:
+            start = (page - 1) * per_page
+            body = json.dumps({"total_count": len(items), "items": items[start : start + per_page]}).encode()
+            self._github_pages[key] = body
+
+        link = None
+        if page * per_page < len(items):
+            next_query = urlencode({**query, "page": page + 1})
+            link = f'<{self.base_url}{path}?{next_query}>; rel="next"'
+        return self._github_pages[key], link
+
+    def jira_page(self, payload):
+        """
+        Returns the encoded page for a Jira search, paginated with
+        ``nextPageToken`` like ``/rest/api/3/search/jql``.
+        """
+        start = int(payload.get("nextPageToken") or 0)
+        size = int(payload.get("maxResults") or 50)
+        key = (start, size)
+        if key not in self._jira_pages:
+            end = start + size
+            page = {"issues": self._jira_issues[start:end], "isLast": end >= len(self._jira_issues)}
+            if not page["isLast"]:
+                page["nextPageToken"] = str(end)
+            self._jira_pages[key] = json.dumps(page).encode()
+        return self._jira_pages[key]
+
+    def graphql_response(self, payload):
+        """
+        Answers the aliased activity query built by ``github_client`` from its
+        ``<alias>_login`` variables. Logins starting with "ghost" don't exist.
+        """
+        variables = payload.get("variables") or {}
+        pull_requests = self._github_items["/search/issues"]
+        open_prs = [pr for pr in pull_requests if pr["state"] == "open"][: variables.get("open", 30)]
+        repos = list(dict.fromkeys(c["repository"]["full_name"] for c in self._github_items["/search/commits"]))
+
+        data = {}
+        errors = []
+        for key, login in variables.items():
+            if not key.endswith("_login"):
+                continue
+            alias = key[: -len("_login")]
+            if login.startswith("ghost"):
+                data[f"{alias}_user"] = None
+                errors.append({"type": "NOT_FOUND", "path": [f"{alias}_user"], "message": f"No user '{login}'"})
+            else:
+                data[f"{alias}_user"] = {
+                    "contributionsCollection": {"totalCommitContributions": self.items},
+                    "repositoriesContributedTo": {
+                        "nodes": [{"nameWithOwner": repo} for repo in repos[: variables.get("repos", 5)]]
+                    },
+                }
+            data[f"{alias}_prs"] = {"issueCount": len(pull_requests)}
+            data[f"{alias}_open"] = {
+                "nodes": [
+                    {
+                        "title": pr["title"],
+                        "url": pr["html_url"],
+                        "repository": {"nameWithOwner": pr["repository_url"].split("repos/")[-1]},
+                    }
+                    for pr in open_prs
+                ]
+            }
+
+        body = {"data": data}
+        if errors:
+            body["errors"] = errors
+        return json.dumps(body).encode()
+
+    def respond(self, handler, body, status=200, headers=None):
+        with self._lock:
+            self.requests += 1
+            if status == 200 and self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                body, status, headers = "server_error", 500, None
+        if self.latency:
+            time.sleep(self.latency)
+        self._send(handler, body, status, headers)
+
+    def respond_health(self, handler):
+        """
+        Answers without delay or injected errors, with the request counters.
+        """
+        with self._lock:
+            body = json.dumps({"requests": self.requests, "errors": self.errors}).encode()
+        self._send(handler, body)
+
+    def _send(self, handler, body, status=200, headers=None):
+        if isinstance(body, str):
+            body = self._bodies[body]
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stub GitHub/Jira search endpoints")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds to wait before each response")
+    parser.add_argument("--items", type=int, default=20, help="items per search response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of responses that fail with a 500")
+    parser.add_argument("--text-size", type=int, default=0, help="pad summaries and messages to this many chars")
+    args = parser.parse_args()
+
+    stub = StubUpstream(
+        latency=args.latency,
+        items=args.items,
+        error_rate=args.error_rate,
+        text_size=args.text_size,
+        port=args.port,
+    )
+    print(f"Stub upstream listening on {stub.base_url}", flush=True)
+    stub._server.serve_forever()  # pylint: disable=protected-access
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from chatbot.github_client import fetch_commits_since, fetch_pull_requests_since
+from chatbot.jira_client import ACTIVITY_LIMIT, fetch_issues_since
+from chatbot.models import Commit, JiraIssue, PullRequest, SyncState
+from chatbot.pagination import Page
+from chatbot.records import CommitRecord, JiraIssueRecord, PullRequestRecord
+from team_activity_tracker.settings import ACTIVITY_STORE_MAX_AGE
+
+JIRA_INTENT_SOURCES = {"JIRA_ONLY": [SyncState.SOURCE_JIRA], "BOTH": [SyncState.SOURCE_JIRA]}
+
+GITHUB_INTENT_SOURCES = {
+    "GITHUB_COMMITS": [SyncState.SOURCE_COMMITS],
+    "GITHUB_REPOS": [SyncState.SOURCE_COMMITS],
+    "BOTH": [SyncState.SOURCE_COMMITS],
+    "GITHUB_PRS": [SyncState.SOURCE_PULL_REQUESTS],
+    "GITHUB_ONLY": [SyncState.SOURCE_COMMITS, SyncState.SOURCE_PULL_REQUESTS],
+}
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # Jira sends "+0000" offsets, which fromisoformat only accepts from 3.11
+    parsed = parse_datetime(value.replace("Z", "+00:00"))
+    if parsed is None:
+        parsed = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+    return parsed
+
+
+# Sync
+
+
+def _high_water_mark(user: str, source: str) -> Optional[datetime]:
+    state = SyncState.objects.filter(user=user, source=source).first()
+    return state.high_water_mark if state else None
+
+
+def _save_sync_state(user: str, source: str, high_water_mark: Optional[datetime]) -> None:
+    SyncState.objects.update_or_create(
+        user=user,
+        source=source,
+        defaults={"high_water_mark": high_water_mark, "last_synced_at": timezone.now()},
+    )
+
+
+def _save_commits(user: str, commits: List[CommitRecord]) -> Optional[datetime]:
+    for commit in commits:
+        Commit.objects.update_or_create(
+            user=user,
+            sha=commit.sha,
+            defaults={
+                "repo": commit.repo,
+                "message": commit.message,
+                "authored_at": _parse_timestamp(commit.date),
+            },
+        )
+    return Commit.objects.filter(user=user).order_by("-authored_at").values_list("authored_at", flat=True).first()
+
+
+def _save_pull_requests(user: str, pull_requests: List[PullRequestRecord]) -> Optional[datetime]:
+    for pr in pull_requests:
+        PullRequest.objects.update_or_create(
+            user=user,
+            url=pr.url,
+            defaults={
+                "repo": pr.repo,
+                "title": pr.title,
+                "state": pr.state,
+                "created_at": _parse_timestamp(pr.created_at),
+                "updated_at": _parse_timestamp(pr.updated_at),
+                "merged_at": _parse_timestamp(pr.merged_at) if pr.merged_at else None,
+            },
+        )
+    return PullRequest.objects.filter(user=user).order_by("-updated_at").values_list("updated_at", flat=True).first()
+
+
+def _save_jira_issues(user: str, issues: List[JiraIssueRecord]) -> Optional[datetime]:
+    for issue in issues:
+        JiraIssue.objects.update_or_create(
+            user=user,
+            key=issue.key,
+            defaults={
+                "summary": issue.summary,
+                "status": issue.status,
+                "updated_at": _parse_timestamp(issue.updated),
+            },
+        )
+    return JiraIssue.objects.filter(user=user).order_by("-updated_at").values_list("updated_at", flat=True).first()
+
+
+def sync_commits(user: str) -> int:
+    since = _high_water_mark(user, SyncState.SOURCE_COMMITS)
+    commits = fetch_commits_since(user, since)
+
+    with transaction.atomic():
+        _save_sync_state(user, SyncState.SOURCE_COMMITS, _save_commits(user, commits))
+
+    return len(commits)
+
+
+def sync_pull_requests(user: str) -> int:
+    since = _high_water_mark(user, SyncState.SOURCE_PULL_REQUESTS)
+    pull_requests = fetch_pull_requests_since(user, since)
+
+    with transaction.atomic():
+        _save_sync_state(user, SyncState.SOURCE_PULL_REQUESTS, _save_pull_requests(user, pull_requests))
+
+    return len(pull_requests)
+
+
+def sync_jira_issues(user: str) -> int:
+    since = _high_water_mark(user, SyncState.SOURCE_JIRA)
+    issues = fetch_issues_since(user, since)
+
+    with transaction.atomic():
+        _save_sync_state(user, SyncState.SOURCE_JIRA, _save_jira_issues(user, issues))
+
+    return len(issues)
+
+
+SYNC_FUNCTIONS = {
+    SyncState.SOURCE_COMMITS: sync_commits,
+    SyncState.SOURCE_PULL_REQUESTS: sync_pull_requests,
+    SyncState.SOURCE_JIRA: sync_jira_issues,
+}
+
+
+# Pushed changes (webhooks)
+
+
+def _extend_sync_state(user: str, source: str, high_water_mark: Optional[datetime]) -> None:
+    # Only a source with a full sync behind it is complete once the pushed
+    # change is applied; otherwise it still needs a sync to be served
+    SyncState.objects.filter(user=user, source=source).update(
+        high_water_mark=high_water_mark, last_synced_at=timezone.now()
+    )
+
+
+def push_commits(user: str, commits: List[CommitRecord]) -> None:
+    with transaction.atomic():
+        _extend_sync_state(user, SyncState.SOURCE_COMMITS, _save_commits(user, commits))
+
+
+def push_pull_requests(user: str, pull_requests: List[PullRequestRecord]) -> None:
+    with transaction.atomic():
+        _extend_sync_state(user, SyncState.SOURCE_PULL_REQUESTS, _save_pull_requests(user, pull_requests))
+
+
+def push_jira_issue(users: List[str], issue: JiraIssueRecord) -> List[str]:
+    """
+    Stores a created or updated issue for its assignees (``users``) and
+    drops it from anyone it was assigned to before. Returns every user
+    whose issues changed.
+    """
+    with transaction.atomic():
+        previous = list(JiraIssue.objects.filter(key=issue.key).exclude(user__in=users).values_list("user", flat=True))
+        JiraIssue.objects.filter(key=issue.key, user__in=previous).delete()
+        for user in users:
+            _extend_sync_state(user, SyncState.SOURCE_JIRA, _save_jira_issues(user, [issue]))
+    return list(dict.fromkeys(users + previous))
+
+
+def delete_jira_issue(key: str) -> List[str]:
+    """
+    Removes a deleted issue. Returns the users it was stored for.
+    """
+    with transaction.atomic():
+        users = list(JiraIssue.objects.filter(key=key).values_list("user", flat=True))
+        JiraIssue.objects.filter(key=key).delete()
+    return users
+
+
+# Reads
+
+
+def is_fresh(user: str, sources: List[str]) -> bool:
+    """
+    True when every source was synced for the user within ACTIVITY_STORE_MAX_AGE.
+    """
+    if ACTIVITY_STORE_MAX_AGE <= 0:
+        return False
+
+    cutoff = timezone.now() - timedelta(seconds=ACTIVITY_STORE_MAX_AGE)
+    fresh = SyncState.objects.filter(user=user, source__in=sources, last_synced_at__gte=cutoff).count()
+    return fresh == len(set(sources))
+
+
+def _window_start(days: Optional[int]) -> Optional[datetime]:
+    if days is None:
+        return None
+    return timezone.now() - timedelta(days=days)
+
+
+def _rows(queryset, offset: int, limit: Optional[int]):
+    return queryset[offset : None if limit is None else offset + limit]
+
+
+def jira_activity(
+    user: str, days: Optional[int] = None, limit: Optional[int] = None, offset: int = 0
+) -> List[JiraIssueRecord]:
+    issues = JiraIssue.objects.filter(user=user)
+    since = _window_start(days)
+    if since is not None:
+        issues = issues.filter(updated_at__gte=since)
+
+    return [
+        JiraIssueRecord(key, summary, status, updated_at.isoformat())
+        for key, summary, status, updated_at in _rows(
+            issues.values_list("key", "summary", "status", "updated_at"), offset, limit
+        )
+    ]
+
+
+def recent_commits(user: str, days: Optional[int] = None, limit: int = 20, offset: int = 0) -> List[CommitRecord]:
+    commits = Commit.objects.filter(user=user)
+    since = _window_start(days)
+    if since is not None:
+        commits = commits.filter(authored_at__gte=since)
+
+    return [
+        CommitRecord(sha, repo, message, authored_at.isoformat())
+        for sha, repo, message, authored_at in _rows(
+            commits.values_list("sha", "repo", "message", "authored_at"), offset, limit
+        )
+    ]
+
+
+def active_pull_requests(user: str, limit: Optional[int] = None, offset: int = 0) -> List[PullRequestRecord]:
+    pull_requests = PullRequest.objects.filter(user=user, state="open").values_list("title", "repo", "url")
+    return [
+        PullRequestRecord(title, repo, url, state="open") for title, repo, url in _rows(pull_requests, offset, limit)
+    ]
+
+
+def recent_repositories(user: str, limit: int = 5, offset: int = 0) -> List[str]:
+    repos = []
+    for repo in Commit.objects.filter(user=user).values_list("repo", flat=True).iterator():
+        if repo not in repos:
+            repos.append(repo)
+        if len(repos) >= offset + limit:
+            break
+    return repos[offset:]
+
+
+def github_activity(user: str) -> Dict[str, int]:
+    return {
+        "commits": Commit.objects.filter(user=user).count(),
+        "pull_requests": PullRequest.objects.filter(user=user).count(),
+    }
+
+
+def stored_activity(name: str, intent: str, days: Optional[int]) -> Dict[str, Any]:
+    """
+    Returns the parts of an answer ("jira" and/or "github") that can be served
+    from the local store because their sources are fresh. Parts missing from
+    the result have to be fetched live.
+    """
+    user = name.lower()
+    stored = {}
+
+    if intent in JIRA_INTENT_SOURCES and is_fresh(user, JIRA_INTENT_SOURCES[intent]):
+        stored["jira"] = jira_activity(user, days, limit=ACTIVITY_LIMIT)
+
+    if intent in GITHUB_INTENT_SOURCES and is_fresh(user, GITHUB_INTENT_SOURCES[intent]):
+        if intent in ["GITHUB_COMMITS", "BOTH"]:
+            stored["github"] = recent_commits(user, days)
+        elif intent == "GITHUB_PRS":
+            stored["github"] = active_pull_requests(user)
+        elif intent == "GITHUB_REPOS":
+            stored["github"] = recent_repositories(user)
+        elif intent == "GITHUB_ONLY":
+            stored["github"] = github_activity(user)
+
+    return stored
+
+
+# Source each item list of a structured reply is stored from
+PAGE_SOURCES = {
+    "jira": SyncState.SOURCE_JIRA,
+    "commits": SyncState.SOURCE_COMMITS,
+    "pull_requests": SyncState.SOURCE_PULL_REQUESTS,
+    "repositories": SyncState.SOURCE_COMMITS,
+}
+
+
+def stored_page(kind: str, name: str, days: Optional[int], offset: int, size: int) -> Optional[Page]:
+    """
+    Returns items ``offset`` to ``offset + size`` of one of a user's item
+    lists and whether more follow, reading only those rows (and the next),
+    or None when its source isn't fresh and has to be read live.
+    """
+    user = name.lower()
+    if not is_fresh(user, [PAGE_SOURCES[kind]]):
+        return None
+
+    if kind == "jira":
+        items = jira_activity(user, days, limit=size + 1, offset=offset)
+    elif kind == "commits":
+        items = recent_commits(user, days, limit=size + 1, offset=offset)
+    elif kind == "pull_requests":
+        items = active_pull_requests(user, limit=size + 1, offset=offset)
+    else:
+        items = recent_repositories(user, limit=size + 1, offset=offset)
+
+    return Page(items[:size], len(items) > size)
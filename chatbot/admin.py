@@ -1 +1,26 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import Commit, JiraIssue, PullRequest, SyncState
+
+
+@admin.register(Commit)
+class CommitAdmin(admin.ModelAdmin):
+    list_display = ["user", "repo", "sha", "authored_at"]
+    list_filter = ["user"]
+
+
+@admin.register(PullRequest)
+class PullRequestAdmin(admin.ModelAdmin):
+    list_display = ["user", "repo", "title", "state", "updated_at"]
+    list_filter = ["user", "state"]
+
+
+@admin.register(JiraIssue)
+class JiraIssueAdmin(admin.ModelAdmin):
+    list_display = ["user", "key", "status", "updated_at"]
+    list_filter = ["user", "status"]
+
+
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ["user", "source", "high_water_mark", "last_synced_at"]
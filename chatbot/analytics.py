@@ -0,0 +1,118 @@
+import threading
+from datetime import date
+from typing import Optional, Tuple
+
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+
+from chatbot.models import Commit, JiraIssue, PullRequest, SyncState
+from chatbot.rollups import STATUS_PREFIX, ActivityRollups, DailyCounts
+from team_activity_tracker.settings import JIRA_DONE_STATUSES
+
+# What each metric counts, as the templates name it
+METRICS = {
+    "commits": "commits",
+    "prs_opened": "pull requests opened",
+    "prs_merged": "pull requests merged",
+    "issues_done": "Jira issues closed",
+    "issues_updated": "Jira issues updated",
+}
+
+
+def _daily_rows(queryset, field: str, *group: str):
+    """
+    ``(user, *group, day, count)`` rows counting ``queryset`` by the day of
+    ``field``.
+    """
+    return (
+        queryset.exclude(**{f"{field}__isnull": True})
+        .annotate(day=TruncDate(field))
+        .order_by()
+        .values("user", *group, "day")
+        .annotate(count=Count("id"))
+        .values_list("user", *group, "day", "count")
+    )
+
+
+def _add(daily: DailyCounts, metric: str, user: str, day: date, count: int) -> None:
+    counts = daily.setdefault(metric, {}).setdefault(user, {})
+    counts[day] = counts.get(day, 0) + count
+
+
+def daily_counts() -> DailyCounts:
+    """
+    Counts stored activity per metric, user and day with one grouped query
+    per table.
+    """
+    daily: DailyCounts = {}
+    done = {status.lower() for status in JIRA_DONE_STATUSES}
+
+    for user, day, count in _daily_rows(Commit.objects.all(), "authored_at"):
+        _add(daily, "commits", user, day, count)
+    for user, day, count in _daily_rows(PullRequest.objects.all(), "created_at"):
+        _add(daily, "prs_opened", user, day, count)
+    for user, day, count in _daily_rows(PullRequest.objects.all(), "merged_at"):
+        _add(daily, "prs_merged", user, day, count)
+
+    # Issues count on the day they were last updated, which for a closed
+    # issue is normally the day it was closed
+    for user, status, day, count in _daily_rows(JiraIssue.objects.all(), "updated_at", "status"):
+        _add(daily, STATUS_PREFIX + status, user, day, count)
+        _add(daily, "issues_updated", user, day, count)
+        if status.lower() in done:
+            _add(daily, "issues_done", user, day, count)
+
+    return daily
+
+
+def _store_stamp() -> Tuple:
+    # Every sync, and every webhook change to a synced source, moves this
+    return tuple(SyncState.objects.aggregate(latest=Max("last_synced_at"), count=Count("id")).values())
+
+
+class _RollupsHolder:
+    """
+    Keeps the current ActivityRollups and rebuilds them when the store has
+    changed since they were built.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rollups: Optional[ActivityRollups] = None
+        self._stamp: Optional[Tuple] = None
+        self._generation = 0
+
+    def get(self) -> ActivityRollups:
+        stamp = _store_stamp()
+        rollups = self._rollups
+        if rollups is not None and stamp == self._stamp:
+            return rollups
+
+        with self._lock:
+            if self._rollups is None or stamp != self._stamp:
+                generation = self._generation
+                rollups = ActivityRollups(daily_counts())
+                # Changes invalidated while building are rebuilt next time
+                if generation == self._generation:
+                    self._rollups, self._stamp = rollups, stamp
+                return rollups
+            return self._rollups
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._rollups = None
+
+
+_holder = _RollupsHolder()
+
+
+def get_rollups() -> ActivityRollups:
+    return _holder.get()
+
+
+def invalidate_rollups() -> None:
+    """
+    Rebuilds the rollups on next use, for store changes made in this
+    process that don't move any sync state.
+    """
+    _holder.invalidate()
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "expires_at")
+
+    def __init__(self, value: Any, etag: Optional[str], expires_at: float):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Expired entries are kept until evicted so their ETag can still be used
+    for a conditional refresh.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: Hashable, value: Any, etag: Optional[str] = None) -> None:
+        with self._lock:
+            self._entries[key] = CacheEntry(value, etag, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Async callers share the interface of SharedCache; nothing here blocks
+
+    async def aget(self, key: Hashable) -> Optional[CacheEntry]:
+        return self.get(key)
+
+    async def aset(self, key: Hashable, value: Any, etag: Optional[str] = None) -> None:
+        self.set(key, value, etag)
+
+    def touch(self, key: Hashable) -> None:
+        """
+        Extends the TTL of an entry after the upstream confirmed it is unchanged.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl
+                self._entries.move_to_end(key)
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def get_or_compute(
+        self, key: Hashable, compute: Callable[[Optional[CacheEntry]], Tuple[Any, Optional[str]]]
+    ) -> Any:
+        """
+        Returns the fresh cached value of ``key``, or stores and returns the
+        ``(value, etag)`` that ``compute`` makes of the stale entry (or None).
+        Concurrent callers are not coalesced here; see ``SingleFlight``.
+        """
+        entry = self.get(key)
+        if entry is not None and entry.is_fresh:
+            self.record_hit()
+            return entry.value
+
+        value, etag = compute(entry)
+        self.set(key, value, etag)
+        return value
+
+    async def aget_or_compute(
+        self, key: Hashable, compute: Callable[[Optional[CacheEntry]], Awaitable[Tuple[Any, Optional[str]]]]
+    ) -> Any:
+        entry = self.get(key)
+        if entry is not None and entry.is_fresh:
+            self.record_hit()
+            return entry.value
+
+        value, etag = await compute(entry)
+        self.set(key, value, etag)
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drops the entries whose key matches ``predicate``. Returns how many.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
@@ -0,0 +1,172 @@
+import asyncio
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Type
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Errors that mean the upstream itself is failing, as opposed to a bad request
+_TRANSPORT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    asyncio.TimeoutError,
+)
+
+_registry: Dict[str, "CircuitBreaker"] = {}
+
+
+def _is_failure(error: Exception) -> bool:
+    if isinstance(error, _TRANSPORT_ERRORS):
+        return True
+    # aiohttp errors can only occur once the async transport has imported it
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None and isinstance(error, aiohttp.ClientError):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    After ``failure_threshold`` consecutive failures (5xx responses,
+    connection errors and timeouts) the circuit opens and calls raise
+    ``error`` straight away. After ``reset_timeout`` seconds it turns
+    half-open and lets up to ``half_open_probes`` trial calls through: a
+    success closes it again, a failure reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error: Type[Exception],
+        message: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.error = error
+        self.message = message
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(1, half_open_probes)
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+
+        _registry[name] = self
+
+    def _before_call(self) -> bool:
+        """
+        Returns whether the call takes one of the half-open probe slots.
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probes = 0
+
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+
+            self.rejected += 1
+        raise self.error(self.message)
+
+    def _on_abandoned(self, probe: bool) -> None:
+        # A cancelled call says nothing about the upstream; free its probe slot
+        with self._lock:
+            if probe and self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def _on_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def _on_error(self, error: Exception) -> None:
+        if not _is_failure(error):
+            # The upstream answered, it just didn't like the request
+            self._on_success()
+            return
+        self._on_failure()
+        raise self.error(self.message) from error
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs ``fn`` through the breaker.
+
+        Raises:
+            self.error: while the circuit is open, or when ``fn`` fails in a
+                way that counts against the upstream
+        """
+        probe = self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._on_error(e)
+            raise
+        except BaseException:
+            self._on_abandoned(probe)
+            raise
+        self._on_success()
+        return result
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        probe = self._before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self._on_error(e)
+            raise
+        except BaseException:
+            self._on_abandoned(probe)
+            raise
+        self._on_success()
+        return result
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            retry_in = 0.0
+            if state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in": round(retry_in, 3),
+                "rejected": self.rejected,
+            }
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _registry.items()}
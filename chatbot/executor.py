@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from typing import Callable, Dict, Hashable, Optional
+
+from team_activity_tracker.settings import UPSTREAM_MAX_WORKERS
+
+_local = threading.local()
+
+
+def _mark_worker() -> None:
+    _local.is_worker = True
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=UPSTREAM_MAX_WORKERS,
+    thread_name_prefix="upstream",
+    initializer=_mark_worker,
+)
+
+
+def _run_inline(fn: Callable) -> Future:
+    future = Future()
+    try:
+        future.set_result(fn())
+    except Exception as e:  # pylint: disable=broad-except
+        future.set_exception(e)
+    return future
+
+
+def _submit_bounded(calls: Dict[Hashable, Callable], max_concurrency: int) -> Dict[Hashable, Future]:
+    futures = {key: Future() for key in calls}
+    pending = iter(calls.items())
+    lock = threading.Lock()
+
+    def start_next():
+        with lock:
+            item = next(pending, None)
+        if item is None:
+            return
+        key, fn = item
+        _executor.submit(fn).add_done_callback(lambda done: finish(key, done))
+
+    def finish(key, done):
+        # Keep the slot busy before handing the result over
+        start_next()
+        error = done.exception()
+        if error is not None:
+            futures[key].set_exception(error)
+        else:
+            futures[key].set_result(done.result())
+
+    for _ in range(min(max_concurrency, len(calls))):
+        start_next()
+    return futures
+
+
+def submit_parallel(calls: Dict[Hashable, Callable], max_concurrency: Optional[int] = None) -> Dict[Hashable, Future]:
+    """
+    Starts the given zero-argument callables on the shared upstream executor
+    and returns their futures, keyed like ``calls``, without waiting.
+
+    ``max_concurrency`` caps how many of these calls occupy the pool at once,
+    so a large fan-out leaves workers free for other requests; the rest are
+    submitted as earlier ones finish.
+
+    Calls made from inside an executor worker run inline instead, so nested
+    fan-outs can never deadlock the bounded pool.
+    """
+    if len(calls) <= 1 or getattr(_local, "is_worker", False):
+        return {key: _run_inline(fn) for key, fn in calls.items()}
+
+    # Workers run each call in a copy of the caller's context, so per-request
+    # state such as stage timings follows the call
+    calls = {key: partial(copy_context().run, fn) for key, fn in calls.items()}
+
+    if max_concurrency is None:
+        return {key: _executor.submit(fn) for key, fn in calls.items()}
+
+    return _submit_bounded(calls, max_concurrency)
+
+
+def run_parallel(calls: Dict[Hashable, Callable], max_concurrency: Optional[int] = None) -> Dict[Hashable, Future]:
+    """
+    Like ``submit_parallel``, but returns once every call has completed.
+    """
+    futures = submit_parallel(calls, max_concurrency)
+    for future in futures.values():
+        # Wait for all results; exceptions are surfaced by ``future.result()``
+        future.exception()
+    return futures
@@ -1,69 +1,258 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
-from multiprocessing.dummy import Pool as ThreadPool
-from typing import Dict, List
+from functools import partial
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
 
 import requests
-from tenacity import retry, retry_if_exception, stop_after_attempt, wait_fixed
 
-from chatbot.constants import GITHUB_USER_ALIAS_TO_USERNAME_MAP
+from chatbot import transport
+from chatbot.cache import CacheEntry
+from chatbot.circuit_breaker import CircuitBreaker
 from chatbot.exceptions import GitHubServiceUnavailable
-from team_activity_tracker.settings import GITHUB_BASE_URL
+from chatbot.executor import run_parallel
+from chatbot.metrics import UPSTREAM_RESPONSE_BYTES, register_stats, upstream_stage
+from chatbot.pagination import Page, atake_page, take_page
+from chatbot.records import CommitRecord, PullRequestRecord
+from chatbot.roster import resolve_member
+from chatbot.scheduler import UpstreamScheduler
+from chatbot.shared_cache import upstream_cache
+from chatbot.singleflight import SingleFlight
+from team_activity_tracker.settings import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    GITHUB_BACKEND,
+    GITHUB_BASE_URL,
+    GITHUB_CACHE_MAX_ENTRIES,
+    GITHUB_CACHE_TTL,
+    GITHUB_GRAPHQL_BATCH_SIZE,
+    GITHUB_GRAPHQL_URL,
+    GITHUB_REQUESTS_PER_SECOND,
+    GITHUB_TOKEN,
+    UPSTREAM_BURST,
+    UPSTREAM_DEADLINE,
+    UPSTREAM_MAX_ATTEMPTS,
+)
+
+search_cache = upstream_cache("github-search", max_entries=GITHUB_CACHE_MAX_ENTRIES, ttl=GITHUB_CACHE_TTL)
+inflight = SingleFlight()
+
+# Search and GraphQL draw on separate GitHub rate limit budgets
+search_scheduler = UpstreamScheduler(
+    "github-search",
+    rate=GITHUB_REQUESTS_PER_SECOND,
+    burst=UPSTREAM_BURST,
+    max_attempts=UPSTREAM_MAX_ATTEMPTS,
+    deadline=UPSTREAM_DEADLINE,
+)
+graphql_scheduler = UpstreamScheduler(
+    "github-graphql",
+    rate=GITHUB_REQUESTS_PER_SECOND,
+    burst=UPSTREAM_BURST,
+    max_attempts=UPSTREAM_MAX_ATTEMPTS,
+    deadline=UPSTREAM_DEADLINE,
+)
+
+register_stats("cache", lambda: {"github-search": search_cache.stats()})
+register_stats("inflight", lambda: {"github": inflight.stats()})
+register_stats("scheduler", lambda: {s.name: s.stats() for s in (search_scheduler, graphql_scheduler)})
+
+# Both APIs fail together when GitHub is down, so they share one circuit
+breaker = CircuitBreaker(
+    "github",
+    GitHubServiceUnavailable,
+    "Github is temporarily unavailable",
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=CIRCUIT_RESET_TIMEOUT,
+)
+
+# GitHub search returns at most 100 items per page and 1000 per query
+MAX_PER_PAGE = 100
+MAX_SEARCH_RESULTS = 1000
 
 
-def is_retryable_github_error(exception: Exception) -> bool:
+def github_username(name: str) -> str:
     """
-    Retry only for HTTP 5xx errors from GitHub.
+    Raises:
+        KeyError: if the name is not on the roster or has no GitHub account
     """
-    if isinstance(exception, requests.exceptions.HTTPError):
-        response = exception.response
-        return response is not None and 500 <= response.status_code < 600
-    return False
+    username = resolve_member(name).github_username
+    if not username:
+        raise KeyError(name)
+    return username
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_fixed(3),
-    retry=retry_if_exception(is_retryable_github_error),
-    reraise=True,
-)
-def fetch_github_data(url: str, headers=None, params=None) -> requests.Response:
-    resp = requests.get(
-        url,
-        headers=headers,
-        params=params,
-        timeout=10,
+def _search_record(url: str) -> Callable[[Dict], Any]:
+    # Each search endpoint is read into one record type, whoever asks, so
+    # every caller can share its cached pages
+    return _commit_record if urlsplit(url).path.endswith("/commits") else _pull_request_record
+
+
+def _send_search(
+    url: str, headers: Optional[dict], params: Optional[dict]
+) -> Tuple[requests.Response, Optional[Dict[str, Any]]]:
+    resp = search_scheduler.call(
+        lambda timeout: transport.get(url, headers=headers, params=params, timeout=timeout, stream=True),
+        stream=True,
     )
-    resp.raise_for_status()
-    return resp
+    if resp.status_code == 304:
+        return resp, None
+
+    data, size = transport.read_json_items(resp, "items", _search_record(url))
+    UPSTREAM_RESPONSE_BYTES.observe(size, search_scheduler.name)
+    return resp, data
+
+
+def fetch_search_page(
+    url: str, headers: Optional[dict] = None, params: Optional[dict] = None
+) -> Tuple[requests.Response, Optional[Dict[str, Any]]]:
+    """
+    Sends a search request and decodes its items into records while the
+    body streams in, so large pages are never held as raw JSON. Returns the
+    response and the decoded body, which is None for a 304.
+    """
+    with upstream_stage(search_scheduler.name):
+        return breaker.call(_send_search, url, headers, params)
+
+
+def _search_key(url: str, params: Optional[dict]) -> tuple:
+    return (url, tuple(sorted((params or {}).items())))
+
+
+def search_page(url: str, params: Optional[dict] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Returns the decoded body of a GitHub search call, with its items as
+    records, and the URL of its next page (from the ``Link`` header),
+    served from ``search_cache`` while fresh. Stale entries are revalidated
+    with ``If-None-Match``; a 304 reuses the cached body and does not count
+    against the search rate limit. Concurrent misses for the same query
+    share one upstream call, across worker processes with the shared cache.
+    """
+    key = _search_key(url, params)
+    entry = search_cache.get(key)
+
+    if entry is not None and entry.is_fresh:
+        search_cache.record_hit()
+        return entry.value
+
+    return inflight.do(key, lambda: search_cache.get_or_compute(key, partial(_refresh_search, url, params)))
+
+
+def search_github(url: str, params: Optional[dict] = None) -> Dict[str, Any]:
+    data, _ = search_page(url, params)
+    return data
+
+
+class _ResumableSearch:
+    """
+    The items of a GitHub search from ``resume``, a ``[link, index]``
+    position (``link`` is None on the first page), following
+    ``Link: rel="next"`` only when the caller reads past the current page.
+    ``position`` is that of the last item read.
+    """
+
+    def __init__(self, url: str, params: dict, resume: Optional[list] = None):
+        self.url = url
+        self.params = params
+        self.resume = resume or [None, 0]
+        self.position: Optional[list] = None
+
+    def _request(self, link: Optional[str]) -> Tuple[str, Optional[dict]]:
+        return (link, None) if link else (self.url, self.params)
+
+    def __iter__(self) -> Iterator[Any]:
+        link, index = self.resume
+        while True:
+            data, next_link = search_page(*self._request(link))
+            for position, item in enumerate(data.get("items", [])[index:], index):
+                self.position = [link, position]
+                yield item
+            if not next_link:
+                return
+            link, index = next_link, 0
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        link, index = self.resume
+        while True:
+            data, next_link = await asearch_page(*self._request(link))
+            for position, item in enumerate(data.get("items", [])[index:], index):
+                self.position = [link, position]
+                yield item
+            if not next_link:
+                return
+            link, index = next_link, 0
+
+
+def iter_search_items(url: str, params: dict) -> Iterator[Any]:
+    """
+    Yields the items of a GitHub search, following ``Link: rel="next"`` only
+    when the caller reads past the current page.
+    """
+    yield from _ResumableSearch(url, params)
+
+
+def _refresh_search(
+    url: str, params: Optional[dict], entry: Optional[CacheEntry]
+) -> Tuple[Tuple[Dict[str, Any], Optional[str]], Optional[str]]:
+    resp, data = fetch_search_page(url, headers=_conditional_headers(entry), params=params)
+    return _search_response(entry, resp, data)
+
+
+def _conditional_headers(entry: Optional[CacheEntry]) -> Optional[dict]:
+    if entry is not None and entry.etag:
+        return {"If-None-Match": entry.etag}
+    return None
+
+
+def _search_response(
+    entry: Optional[CacheEntry], resp: requests.Response, data: Optional[Dict[str, Any]]
+) -> Tuple[Tuple[Dict[str, Any], Optional[str]], Optional[str]]:
+    """
+    Returns the page to cache and its ETag; a 304 keeps the cached page.
+    """
+    if resp.status_code == 304 and entry is not None:
+        search_cache.record_not_modified()
+        return entry.value, entry.etag
+
+    search_cache.record_miss()
+    return (data, resp.links.get("next", {}).get("url")), resp.headers.get("ETag")
 
 
 def fetch_commits_count(username: str) -> int:
     url = f"{GITHUB_BASE_URL}/search/commits"
-    resp = fetch_github_data(
+    data = search_github(
         url,
         params={"q": f"author:{username}"},
     )
-    return resp.json().get("total_count", 0)
+    return data.get("total_count", 0)
 
 
 def fetch_prs_count(username: str) -> int:
     url = f"{GITHUB_BASE_URL}/search/issues"
-    resp = fetch_github_data(
+    data = search_github(
         url,
         params={"q": f"type:pr author:{username}"},
     )
-    return resp.json().get("total_count", 0)
+    return data.get("total_count", 0)
 
 
 def get_github_activity(name: str) -> Dict[str, int]:
-    username = GITHUB_USER_ALIAS_TO_USERNAME_MAP[name.lower()]
+    username = github_username(name)
+
+    if GITHUB_BACKEND == "graphql":
+        return _graphql_user_activity(username)["summary"]
+
+    futures = run_parallel(
+        {
+            "commits": lambda: fetch_commits_count(username),
+            "pull_requests": lambda: fetch_prs_count(username),
+        }
+    )
 
     try:
-        with ThreadPool(processes=2) as pool:
-            commits_count, prs_count = pool.map(
-                lambda fn: fn(username),
-                [fetch_commits_count, fetch_prs_count],
-            )
+        commits_count = futures["commits"].result()
+        prs_count = futures["pull_requests"].result()
     except requests.exceptions.HTTPError as e:
         raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
 
@@ -73,100 +262,727 @@ def get_github_activity(name: str) -> Dict[str, int]:
     }
 
 
-def get_recent_commits(name: str, days: int = None, limit: int = 20) -> List[Dict]:
-    username = GITHUB_USER_ALIAS_TO_USERNAME_MAP[name.lower()]
+def _window_start(days: Optional[int]) -> Optional[datetime]:
+    if days is None:
+        return None
+    return datetime.now(timezone.utc) - timedelta(days=days)
 
-    url = f"{GITHUB_BASE_URL}/search/commits"
-    params = {
-        "q": f"author:{username}",
+
+def _commits_params(username: str, days: Optional[int], per_page: int) -> dict:
+    # The search qualifier is day-granular so the query (and its cache key)
+    # stays stable all day; the exact cutoff is applied in _commit_records.
+    query = f"author:{username}"
+    since = _window_start(days)
+    if since is not None:
+        query += f" author-date:>={since.date().isoformat()}"
+
+    return {
+        "q": query,
         "sort": "author-date",
         "order": "desc",
-        "per_page": limit,
+        "per_page": max(1, min(per_page, MAX_PER_PAGE)),
     }
 
+
+def _commit_date(commit: CommitRecord) -> datetime:
+    return datetime.fromisoformat(commit.date.replace("Z", "+00:00"))
+
+
+def _commit_record(item: Dict) -> CommitRecord:
+    return CommitRecord(
+        sha=item["sha"],
+        repo=item["repository"]["full_name"],
+        message=item["commit"]["message"],
+        date=item["commit"]["author"]["date"],
+    )
+
+
+def _pull_request_record(item: Dict) -> PullRequestRecord:
+    return PullRequestRecord(
+        title=item["title"],
+        repo=item["repository_url"].split("repos/")[-1],
+        url=item["html_url"],
+        state=item["state"],
+        created_at=item["created_at"],
+        updated_at=item["updated_at"],
+        merged_at=(item.get("pull_request") or {}).get("merged_at"),
+    )
+
+
+def _commit_records(commits: Iterable[CommitRecord], days: Optional[int]) -> Iterator[CommitRecord]:
+    since = _window_start(days)
+
+    for commit in commits:
+        # Items are sorted newest first, so nothing after this is in the window
+        if since and _commit_date(commit) < since:
+            return
+        yield commit
+
+
+def _distinct_repos(commits: Iterable[CommitRecord], seen: Optional[set] = None) -> Iterator[str]:
+    seen = set() if seen is None else seen
+
+    for commit in commits:
+        repo = commit.repo
+        if repo not in seen:
+            seen.add(repo)
+            yield repo
+
+
+def _repos_from_items(commits: Iterable[CommitRecord], limit: int) -> List[str]:
+    return list(islice(_distinct_repos(commits), limit))
+
+
+def get_recent_commits(name: str, days: int = None, limit: int = 20) -> List[CommitRecord]:
+    username = github_username(name)
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    items = iter_search_items(url, _commits_params(username, days, per_page=limit))
+
+    try:
+        return list(islice(_commit_records(items, days), limit))
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+def get_active_pull_requests(name: str) -> List[PullRequestRecord]:
+    username = github_username(name)
+
+    if GITHUB_BACKEND == "graphql":
+        return _graphql_user_activity(username)["pull_requests"]
+
+    url = f"{GITHUB_BASE_URL}/search/issues"
+    params = {"q": f"type:pr author:{username} state:open"}
+
     try:
-        resp = fetch_github_data(
+        data = search_github(
             url,
             params=params,
         )
     except requests.exceptions.HTTPError as e:
         raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
 
-    items = resp.json().get("items", [])
+    return list(data.get("items", []))
 
-    since = None
-    if days is not None:
-        since = datetime.now(timezone.utc) - timedelta(days=days)
 
-    commits = []
-    for item in items:
-        commit_date = datetime.fromisoformat(item["commit"]["author"]["date"].replace("Z", "+00:00"))
-
-        if since and commit_date < since:
-            continue
-
-        commits.append(
-            {
-                "repo": item["repository"]["full_name"],
-                "message": item["commit"]["message"],
-                "date": item["commit"]["author"]["date"],
-            }
-        )
+def get_recent_repositories(name: str, limit: int = 5) -> List[str]:
+    """
+    Returns up to ``limit`` distinct repositories the user committed to most
+    recently, reading further commit pages only until enough were found.
+    With the GraphQL backend at most REPOSITORIES_LIMIT are returned.
+    """
+    username = github_username(name)
+
+    if GITHUB_BACKEND == "graphql":
+        return _graphql_user_activity(username)["repositories"][:limit]
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    params = _commits_params(username, None, per_page=MAX_PER_PAGE)
+
+    try:
+        return _repos_from_items(iter_search_items(url, params), limit)
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+# Pages of the lists above for structured replies. Each reads search pages
+# only up to the one holding the item after the page, and a page after one
+# read live starts at that item's ``resume`` position. Repository pages also
+# carry the repositories already listed. Pull requests are always read from
+# search, since the GraphQL backend returns only the first
+# OPEN_PULL_REQUESTS_LIMIT.
 
-    return commits
 
+def _open_pull_requests_params(username: str, per_page: int) -> dict:
+    return {"q": f"type:pr author:{username} state:open", "per_page": max(1, min(per_page, MAX_PER_PAGE))}
 
-def get_active_pull_requests(name: str) -> List[Dict]:
-    username = GITHUB_USER_ALIAS_TO_USERNAME_MAP[name.lower()]
+
+def _repositories_page(page: Page, seen: set) -> Page:
+    if not page.more:
+        return page
+    return page._replace(resume=[*page.resume, sorted(seen.union(page.items))])
+
+
+def get_recent_commits_page(
+    name: str, days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    username = github_username(name)
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    items = _ResumableSearch(url, _commits_params(username, days, per_page=size), resume)
+
+    try:
+        return take_page(_commit_records(items, days), 0 if resume else offset, size, lambda: items.position)
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+def get_active_pull_requests_page(
+    name: str, _days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    username = github_username(name)
 
     url = f"{GITHUB_BASE_URL}/search/issues"
-    params = {"q": f"type:pr author:{username} state:open"}
+    items = _ResumableSearch(url, _open_pull_requests_params(username, size), resume)
 
     try:
-        resp = fetch_github_data(
-            url,
-            params=params,
+        return take_page(items, 0 if resume else offset, size, lambda: items.position)
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+def get_recent_repositories_page(
+    name: str, _days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    username = github_username(name)
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    link, index, listed = resume or [None, 0, []]
+    items = _ResumableSearch(url, _commits_params(username, None, per_page=MAX_PER_PAGE), [link, index])
+    seen = set(listed)
+
+    try:
+        page = take_page(_distinct_repos(items, set(seen)), 0 if resume else offset, size, lambda: items.position)
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+    return _repositories_page(page, seen)
+
+
+def _search_since(since: datetime) -> str:
+    return since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+
+def fetch_commits_since(name: str, since: Optional[datetime] = None) -> List[CommitRecord]:
+    """
+    Returns the user's commits authored at or after ``since`` (all commits
+    when ``None``), newest first. Used by the incremental activity sync.
+
+    Raises:
+        GitHubServiceUnavailable: if GitHub fails after retries
+    """
+    username = github_username(name)
+
+    query = f"author:{username}"
+    if since is not None:
+        query += f" author-date:>={_search_since(since)}"
+
+    items = iter_search_items(
+        f"{GITHUB_BASE_URL}/search/commits",
+        {"q": query, "sort": "author-date", "order": "desc", "per_page": MAX_PER_PAGE},
+    )
+
+    try:
+        return list(islice(items, MAX_SEARCH_RESULTS))
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+def fetch_pull_requests_since(name: str, since: Optional[datetime] = None) -> List[PullRequestRecord]:
+    """
+    Returns the user's pull requests updated at or after ``since`` (all pull
+    requests when ``None``), newest first. Used by the incremental activity sync.
+
+    Raises:
+        GitHubServiceUnavailable: if GitHub fails after retries
+    """
+    username = github_username(name)
+
+    query = f"type:pr author:{username}"
+    if since is not None:
+        query += f" updated:>={_search_since(since)}"
+
+    items = iter_search_items(
+        f"{GITHUB_BASE_URL}/search/issues",
+        {"q": query, "sort": "updated", "order": "desc", "per_page": MAX_PER_PAGE},
+    )
+
+    try:
+        return list(islice(items, MAX_SEARCH_RESULTS))
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+# Async variants used by the ASGI chat endpoint. They share the search cache
+# and response parsing with the sync functions above.
+
+
+async def _asend_search(
+    url: str, headers: Optional[dict], params: Optional[dict]
+) -> Tuple[requests.Response, Optional[Dict[str, Any]]]:
+    resp = await search_scheduler.acall(
+        lambda timeout: transport.aget(url, headers=headers, params=params, timeout=timeout, stream=True),
+        stream=True,
+    )
+    if resp.status_code == 304:
+        return resp, None
+
+    data, size = await transport.aread_json_items(resp, "items", _search_record(url))
+    UPSTREAM_RESPONSE_BYTES.observe(size, search_scheduler.name)
+    return resp, data
+
+
+async def afetch_search_page(
+    url: str, headers: Optional[dict] = None, params: Optional[dict] = None
+) -> Tuple[requests.Response, Optional[Dict[str, Any]]]:
+    with upstream_stage(search_scheduler.name):
+        return await breaker.acall(_asend_search, url, headers, params)
+
+
+async def asearch_page(url: str, params: Optional[dict] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    key = _search_key(url, params)
+    entry = await search_cache.aget(key)
+
+    if entry is not None and entry.is_fresh:
+        search_cache.record_hit()
+        return entry.value
+
+    return await inflight.ado(key, lambda: search_cache.aget_or_compute(key, partial(_arefresh_search, url, params)))
+
+
+async def asearch_github(url: str, params: Optional[dict] = None) -> Dict[str, Any]:
+    data, _ = await asearch_page(url, params)
+    return data
+
+
+async def aiter_search_items(url: str, params: dict) -> AsyncIterator[Any]:
+    async for item in _ResumableSearch(url, params):
+        yield item
+
+
+async def _arefresh_search(
+    url: str, params: Optional[dict], entry: Optional[CacheEntry]
+) -> Tuple[Tuple[Dict[str, Any], Optional[str]], Optional[str]]:
+    resp, data = await afetch_search_page(url, headers=_conditional_headers(entry), params=params)
+    return _search_response(entry, resp, data)
+
+
+async def aget_github_activity(name: str) -> Dict[str, int]:
+    username = github_username(name)
+
+    if GITHUB_BACKEND == "graphql":
+        return (await _agraphql_user_activity(username))["summary"]
+
+    try:
+        commits_data, prs_data = await asyncio.gather(
+            asearch_github(f"{GITHUB_BASE_URL}/search/commits", params={"q": f"author:{username}"}),
+            asearch_github(f"{GITHUB_BASE_URL}/search/issues", params={"q": f"type:pr author:{username}"}),
         )
     except requests.exceptions.HTTPError as e:
         raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
 
-    return [
-        {
-            "title": pr["title"],
-            "repo": pr["repository_url"].split("repos/")[-1],
-            "url": pr["html_url"],
-        }
-        for pr in resp.json().get("items", [])
-    ]
+    return {
+        "commits": commits_data.get("total_count", 0),
+        "pull_requests": prs_data.get("total_count", 0),
+    }
 
 
-def get_recent_repositories(name: str, limit: int = 5) -> List[str]:
-    username = GITHUB_USER_ALIAS_TO_USERNAME_MAP[name.lower()]
+async def aget_recent_commits(name: str, days: int = None, limit: int = 20) -> List[CommitRecord]:
+    username = github_username(name)
 
     url = f"{GITHUB_BASE_URL}/search/commits"
-    params = {
-        "q": f"author:{username}",
-        "sort": "author-date",
-        "order": "desc",
-    }
+    since = _window_start(days)
 
+    commits = []
     try:
-        resp = fetch_github_data(
-            url,
-            params=params,
+        async for commit in aiter_search_items(url, _commits_params(username, days, per_page=limit)):
+            if since and _commit_date(commit) < since:
+                break
+            commits.append(commit)
+            if len(commits) >= limit:
+                break
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+    return commits
+
+
+async def aget_active_pull_requests(name: str) -> List[PullRequestRecord]:
+    username = github_username(name)
+
+    if GITHUB_BACKEND == "graphql":
+        return (await _agraphql_user_activity(username))["pull_requests"]
+
+    try:
+        data = await asearch_github(
+            f"{GITHUB_BASE_URL}/search/issues",
+            params={"q": f"type:pr author:{username} state:open"},
         )
     except requests.exceptions.HTTPError as e:
         raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
 
+    return list(data.get("items", []))
+
+
+async def aget_recent_repositories(name: str, limit: int = 5) -> List[str]:
+    username = github_username(name)
+
+    if GITHUB_BACKEND == "graphql":
+        return (await _agraphql_user_activity(username))["repositories"][:limit]
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    params = _commits_params(username, None, per_page=MAX_PER_PAGE)
+
     repos = []
     seen = set()
-
-    for item in resp.json().get("items", []):
-        repo = item["repository"]["full_name"]
-        if repo not in seen:
-            seen.add(repo)
-            repos.append(repo)
-        if len(repos) >= limit:
-            break
+    try:
+        async for commit in aiter_search_items(url, params):
+            repo = commit.repo
+            if repo not in seen:
+                seen.add(repo)
+                repos.append(repo)
+            if len(repos) >= limit:
+                break
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
 
     return repos
+
+
+async def _acommit_records(commits: AsyncIterator[CommitRecord], days: Optional[int]) -> AsyncIterator[CommitRecord]:
+    since = _window_start(days)
+
+    async for commit in commits:
+        if since and _commit_date(commit) < since:
+            return
+        yield commit
+
+
+async def _adistinct_repos(commits: AsyncIterator[CommitRecord], seen: Optional[set] = None) -> AsyncIterator[str]:
+    seen = set() if seen is None else seen
+
+    async for commit in commits:
+        if commit.repo not in seen:
+            seen.add(commit.repo)
+            yield commit.repo
+
+
+async def aget_recent_commits_page(
+    name: str, days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    username = github_username(name)
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    items = _ResumableSearch(url, _commits_params(username, days, per_page=size), resume)
+
+    try:
+        return await atake_page(_acommit_records(items, days), 0 if resume else offset, size, lambda: items.position)
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+async def aget_active_pull_requests_page(
+    name: str, _days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    username = github_username(name)
+
+    url = f"{GITHUB_BASE_URL}/search/issues"
+    items = _ResumableSearch(url, _open_pull_requests_params(username, size), resume)
+
+    try:
+        return await atake_page(items, 0 if resume else offset, size, lambda: items.position)
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+
+
+async def aget_recent_repositories_page(
+    name: str, _days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    username = github_username(name)
+
+    url = f"{GITHUB_BASE_URL}/search/commits"
+    link, index, listed = resume or [None, 0, []]
+    items = _ResumableSearch(url, _commits_params(username, None, per_page=MAX_PER_PAGE), [link, index])
+    seen = set(listed)
+
+    try:
+        page = await atake_page(
+            _adistinct_repos(items, set(seen)), 0 if resume else offset, size, lambda: items.position
+        )
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+    return _repositories_page(page, seen)
+
+
+# GraphQL backend (GITHUB_BACKEND = "graphql"). One query answers the activity
+# summary, open pull requests and recent repositories for a batch of users by
+# aliasing the same fields per user. GraphQL has no commit search, so commit
+# lists always use the REST functions above.
+
+# Matches the REST search default page size used for open pull requests
+OPEN_PULL_REQUESTS_LIMIT = 30
+REPOSITORIES_LIMIT = 5
+
+activity_cache = upstream_cache("github-graphql", max_entries=GITHUB_CACHE_MAX_ENTRIES, ttl=GITHUB_CACHE_TTL)
+register_stats("cache", lambda: {"github-graphql": activity_cache.stats()})
+
+_GRAPHQL_USER_FIELDS = """
+  {alias}_user: user(login: ${alias}_login) {{
+    contributionsCollection {{ totalCommitContributions }}
+    repositoriesContributedTo(
+      first: $repos, contributionTypes: [COMMIT], orderBy: {{field: PUSHED_AT, direction: DESC}}
+    ) {{
+      nodes {{ nameWithOwner }}
+    }}
+  }}
+  {alias}_prs: search(query: ${alias}_prs, type: ISSUE, first: 0) {{ issueCount }}
+  {alias}_open: search(query: ${alias}_open, type: ISSUE, first: $open) {{
+    nodes {{ ... on PullRequest {{ title url repository {{ nameWithOwner }} }} }}
+  }}
+"""
+
+
+def _graphql_query(usernames: List[str]) -> Tuple[str, dict]:
+    """
+    Builds one query with ``u0_*``, ``u1_*``, ... aliases per user. Logins and
+    search strings are passed as variables, never spliced into the query.
+    """
+    declarations = ["$repos: Int!", "$open: Int!"]
+    fields = []
+    variables = {"repos": REPOSITORIES_LIMIT, "open": OPEN_PULL_REQUESTS_LIMIT}
+
+    for i, username in enumerate(usernames):
+        alias = f"u{i}"
+        declarations += [f"${alias}_login: String!", f"${alias}_prs: String!", f"${alias}_open: String!"]
+        fields.append(_GRAPHQL_USER_FIELDS.format(alias=alias))
+        variables[f"{alias}_login"] = username
+        variables[f"{alias}_prs"] = f"type:pr author:{username}"
+        variables[f"{alias}_open"] = f"type:pr author:{username} state:open"
+
+    query = f"query({', '.join(declarations)}) {{{''.join(fields)}}}"
+    return query, variables
+
+
+def _graphql_activity(data: Dict[str, Any], alias: str) -> Optional[Dict[str, Any]]:
+    user = data.get(f"{alias}_user")
+    if user is None:
+        return None
+
+    return {
+        "summary": {
+            "commits": user["contributionsCollection"]["totalCommitContributions"],
+            "pull_requests": data[f"{alias}_prs"]["issueCount"],
+        },
+        "pull_requests": [
+            PullRequestRecord(title=pr["title"], repo=pr["repository"]["nameWithOwner"], url=pr["url"])
+            for pr in data[f"{alias}_open"]["nodes"]
+            if pr
+        ],
+        "repositories": [repo["nameWithOwner"] for repo in user["repositoriesContributedTo"]["nodes"]],
+    }
+
+
+def _graphql_headers() -> dict:
+    headers = {"Content-Type": "application/json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+    return headers
+
+
+def _graphql_activities(usernames: List[str], body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Maps each username to its activity, or to GitHubServiceUnavailable when
+    GitHub returned nothing for that user.
+    """
+    data = body.get("data")
+    if not data:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable")
+
+    activities = {}
+    for i, username in enumerate(usernames):
+        activity_cache.record_miss()
+        activity = _graphql_activity(data, f"u{i}")
+        if activity is None:
+            activities[username] = GitHubServiceUnavailable(f"GitHub user '{username}' not found")
+        else:
+            activities[username] = activity
+    return activities
+
+
+def _store_graphql_response(usernames: List[str], body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ``_graphql_activities``, caching the users that were found.
+    """
+    activities = _graphql_activities(usernames, body)
+    for username, activity in activities.items():
+        if not isinstance(activity, Exception):
+            activity_cache.set(username, activity)
+    return activities
+
+
+def _cached_activity(username: str, entry: Optional[CacheEntry], cached: Dict[str, Any], missing: List[str]) -> None:
+    if entry is not None and entry.is_fresh:
+        activity_cache.record_hit()
+        cached[username] = entry.value
+    else:
+        missing.append(username)
+
+
+def _cached_activities(usernames: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+    cached = {}
+    missing = []
+    for username in dict.fromkeys(usernames):
+        _cached_activity(username, activity_cache.get(username), cached, missing)
+    return cached, missing
+
+
+def _github_usernames(names: Iterable[str]) -> Tuple[Dict[str, str], Dict[str, Exception]]:
+    usernames = {}
+    errors = {}
+    for name in names:
+        try:
+            usernames[name] = github_username(name)
+        except KeyError as e:
+            errors[name] = e
+    return usernames, errors
+
+
+def _batches(usernames: List[str]) -> List[List[str]]:
+    size = max(1, GITHUB_GRAPHQL_BATCH_SIZE)
+    return [usernames[i : i + size] for i in range(0, len(usernames), size)]
+
+
+def post_github_graphql(payload: dict) -> requests.Response:
+    with upstream_stage(graphql_scheduler.name):
+        return breaker.call(
+            graphql_scheduler.call,
+            lambda timeout: transport.post(
+                GITHUB_GRAPHQL_URL,
+                json=payload,
+                headers=_graphql_headers(),
+                timeout=timeout,
+            ),
+        )
+
+
+def _query_activities(usernames: List[str]) -> Dict[str, Any]:
+    return inflight.do(("graphql", *usernames), partial(_request_activities, usernames))
+
+
+def _request_activities(usernames: List[str]) -> Dict[str, Any]:
+    query, variables = _graphql_query(usernames)
+    try:
+        resp = post_github_graphql({"query": query, "variables": variables})
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+    return _store_graphql_response(usernames, resp.json())
+
+
+def fetch_activities(usernames: Iterable[str]) -> Dict[str, Any]:
+    """
+    Returns each GitHub username's activity (``summary``, ``pull_requests``
+    and ``repositories``), or the exception raised for it. Users missing from
+    ``activity_cache`` are fetched in batches of GITHUB_GRAPHQL_BATCH_SIZE,
+    one GraphQL request per batch.
+    """
+    activities, missing = _cached_activities(usernames)
+
+    futures = run_parallel({tuple(batch): partial(_query_activities, batch) for batch in _batches(missing)})
+
+    for batch, future in futures.items():
+        error = future.exception()
+        activities.update({username: error for username in batch} if error else future.result())
+
+    return activities
+
+
+def _graphql_user_activity(username: str) -> Dict[str, Any]:
+    activity = fetch_activities([username])[username]
+    if isinstance(activity, Exception):
+        raise activity
+    return activity
+
+
+def get_github_activities(names: Iterable[str]) -> Dict[str, Any]:
+    """
+    Batched counterpart of the per-user functions for the GraphQL backend:
+    maps each name to its activity dict or to the exception raised for it.
+    """
+    usernames, activities = _github_usernames(names)
+
+    fetched = fetch_activities(usernames.values())
+    activities.update({name: fetched[username] for name, username in usernames.items()})
+    return activities
+
+
+async def apost_github_graphql(payload: dict) -> requests.Response:
+    with upstream_stage(graphql_scheduler.name):
+        return await breaker.acall(
+            graphql_scheduler.acall,
+            lambda timeout: transport.apost(
+                GITHUB_GRAPHQL_URL,
+                json=payload,
+                headers=_graphql_headers(),
+                timeout=timeout,
+            ),
+        )
+
+
+async def _aquery_activities(usernames: List[str]) -> Dict[str, Any]:
+    return await inflight.ado(("graphql", *usernames), partial(_arequest_activities, usernames))
+
+
+async def _arequest_activities(usernames: List[str]) -> Dict[str, Any]:
+    query, variables = _graphql_query(usernames)
+    try:
+        resp = await apost_github_graphql({"query": query, "variables": variables})
+    except requests.exceptions.HTTPError as e:
+        raise GitHubServiceUnavailable("Github is temporarily unavailable") from e
+    activities = _graphql_activities(usernames, resp.json())
+    for username, activity in activities.items():
+        if not isinstance(activity, Exception):
+            await activity_cache.aset(username, activity)
+    return activities
+
+
+async def _acached_activities(usernames: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+    cached = {}
+    missing = []
+    for username in dict.fromkeys(usernames):
+        _cached_activity(username, await activity_cache.aget(username), cached, missing)
+    return cached, missing
+
+
+async def afetch_activities(usernames: Iterable[str]) -> Dict[str, Any]:
+    activities, missing = await _acached_activities(usernames)
+
+    batches = _batches(missing)
+    results = await asyncio.gather(
+        *(_aquery_activities(batch) for batch in batches),
+        return_exceptions=True,
+    )
+
+    for batch, result in zip(batches, results):
+        activities.update({username: result for username in batch} if isinstance(result, Exception) else result)
+
+    return activities
+
+
+async def _agraphql_user_activity(username: str) -> Dict[str, Any]:
+    activity = (await afetch_activities([username]))[username]
+    if isinstance(activity, Exception):
+        raise activity
+    return activity
+
+
+async def aget_github_activities(names: Iterable[str]) -> Dict[str, Any]:
+    usernames, activities = _github_usernames(names)
+
+    fetched = await afetch_activities(usernames.values())
+    activities.update({name: fetched[username] for name, username in usernames.items()})
+    return activities
+
+
+def invalidate_user(username: str) -> int:
+    """
+    Drops cached search pages and GraphQL activity of one GitHub user, e.g.
+    after a webhook reported new activity. Returns how many entries went.
+    """
+    qualifier = f"author:{username}"
+
+    def mentions_user(key) -> bool:
+        url, params = key
+        # Follow-on pages are cached by their Link URL, with the query inside it
+        values = [value for _, value in params] + [value for _, value in parse_qsl(urlsplit(url).query)]
+        return any(qualifier in str(value).split() for value in values)
+
+    return search_cache.invalidate(mentions_user) + activity_cache.invalidate(lambda key: key == username)
@@ -1,91 +1,380 @@
-from datetime import datetime, timedelta
-from typing import Any, Dict, List
+import json
+from datetime import datetime
+from functools import lru_cache, partial
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 import requests
 from requests.auth import HTTPBasicAuth
-from tenacity import retry, retry_if_exception, stop_after_attempt, wait_fixed
 
-from chatbot.constants import JIRA_USERNAME_TO_ACCOUNT_ID_MAP
+from chatbot import transport
+from chatbot.cache import CacheEntry
+from chatbot.circuit_breaker import CircuitBreaker
 from chatbot.exceptions import JiraServiceUnavailable
-from team_activity_tracker.settings import JIRA_API_TOKEN, JIRA_BASE_URL, JIRA_EMAIL
+from chatbot.metrics import UPSTREAM_RESPONSE_BYTES, register_stats, upstream_stage
+from chatbot.pagination import Page, atake_page, take_page
+from chatbot.records import JiraIssueRecord
+from chatbot.roster import get_roster
+from chatbot.scheduler import UpstreamScheduler
+from chatbot.shared_cache import upstream_cache
+from chatbot.singleflight import SingleFlight
+from team_activity_tracker.settings import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    JIRA_API_TOKEN,
+    JIRA_BASE_URL,
+    JIRA_CACHE_MAX_ENTRIES,
+    JIRA_CACHE_TTL,
+    JIRA_EMAIL,
+    JIRA_REQUESTS_PER_SECOND,
+    UPSTREAM_BURST,
+    UPSTREAM_DEADLINE,
+    UPSTREAM_MAX_ATTEMPTS,
+)
+
+_AUTH = HTTPBasicAuth(JIRA_EMAIL, JIRA_API_TOKEN)
+
+search_cache = upstream_cache("jira-search", max_entries=JIRA_CACHE_MAX_ENTRIES, ttl=JIRA_CACHE_TTL)
+inflight = SingleFlight()
+
+scheduler = UpstreamScheduler(
+    "jira",
+    rate=JIRA_REQUESTS_PER_SECOND,
+    burst=UPSTREAM_BURST,
+    max_attempts=UPSTREAM_MAX_ATTEMPTS,
+    deadline=UPSTREAM_DEADLINE,
+)
+
+register_stats("cache", lambda: {"jira-search": search_cache.stats()})
+register_stats("inflight", lambda: {"jira": inflight.stats()})
+register_stats("scheduler", lambda: {scheduler.name: scheduler.stats()})
+
+breaker = CircuitBreaker(
+    "jira",
+    JiraServiceUnavailable,
+    "Jira is temporarily unavailable",
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=CIRCUIT_RESET_TIMEOUT,
+)
 
 
 def get_auth():
-    return HTTPBasicAuth(JIRA_EMAIL, JIRA_API_TOKEN)
+    return _AUTH
 
 
-def is_retryable_http_error(exception: Exception) -> bool:
+@lru_cache(maxsize=None)
+def get_async_auth():
+    import aiohttp  # pylint: disable=import-outside-toplevel
+
+    return aiohttp.BasicAuth(JIRA_EMAIL or "", JIRA_API_TOKEN or "")
+
+
+def _send_page(url: str, payload: dict) -> Dict[str, Any]:
+    resp = scheduler.call(
+        lambda timeout: transport.post(url, auth=get_auth(), json=payload, timeout=timeout, stream=True),
+        stream=True,
+    )
+    data, size = transport.read_json_items(resp, "issues", _issue_record)
+    UPSTREAM_RESPONSE_BYTES.observe(size, scheduler.name)
+    return data
+
+
+def fetch_jira_issues(url: str, payload: dict) -> Dict[str, Any]:
     """
-    Retry only for HTTP 5xx errors.
+    Runs one page of a JQL search, decoding its issues into records while
+    the body streams in.
     """
-    if isinstance(exception, requests.exceptions.HTTPError):
-        response = exception.response
-        return response is not None and 500 <= response.status_code < 600
-    return False
+    with upstream_stage(scheduler.name):
+        return breaker.call(_send_page, url, payload)
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_fixed(3),
-    retry=retry_if_exception(is_retryable_http_error),
-    reraise=True,
-)
-def fetch_jira_issues(url: str, payload: dict) -> requests.Response:
-    resp = requests.post(
-        url,
-        auth=get_auth(),
-        json=payload,
-        timeout=10,
+# Only the fields the response templates use
+ISSUE_FIELDS = ["summary", "status", "updated"]
+
+MAX_PAGE_SIZE = 100
+
+# Issues listed in a text reply, so it reads one search page, not every one
+ACTIVITY_LIMIT = 20
+
+
+def _search_request(
+    username: str, updated_within: Optional[str] = None, page_size: int = MAX_PAGE_SIZE
+) -> Tuple[str, dict]:
+    """
+    Builds the search call for issues assigned to the user, newest first.
+    ``updated_within`` is a relative JQL duration such as ``"7d"`` or ``"90m"``.
+    """
+    member = get_roster().get(username)
+
+    if member is None or not member.jira_account_id:
+        raise ValueError(f"User '{username}' not found")
+
+    account_id = member.jira_account_id
+
+    jql = f'assignee = "{account_id}"'
+    if updated_within is not None:
+        jql += f" AND updated >= -{updated_within}"
+    jql += " ORDER BY updated DESC"
+
+    url = f"{JIRA_BASE_URL}/rest/api/3/search/jql"
+    payload = {
+        "jql": jql,
+        "fields": ISSUE_FIELDS,
+        "maxResults": min(page_size, MAX_PAGE_SIZE),
+    }
+    return url, payload
+
+
+def _page_size(limit: Optional[int]) -> int:
+    return MAX_PAGE_SIZE if limit is None else max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _flight_key(url: str, payload: dict) -> tuple:
+    return (url, json.dumps(payload, sort_keys=True))
+
+
+def _next_page(payload: dict, data: dict) -> Optional[dict]:
+    next_page_token = data.get("nextPageToken")
+    if data.get("isLast", True) or not next_page_token:
+        return None
+    return {**payload, "nextPageToken": next_page_token}
+
+
+def _issue_record(issue: Dict) -> JiraIssueRecord:
+    return JiraIssueRecord(
+        key=issue["key"],
+        summary=issue["fields"]["summary"],
+        status=issue["fields"]["status"]["name"],
+        updated=issue["fields"]["updated"],
     )
-    resp.raise_for_status()
-    return resp
 
 
-def get_jira_activity(username: str, days: int = None) -> List[Dict[str, Any]]:
+def _refresh_page(url: str, payload: dict, _entry: Optional[CacheEntry]) -> Tuple[Dict[str, Any], None]:
+    # Jira sends no ETags, so a stale page is fetched again in full
+    search_cache.record_miss()
+    return fetch_jira_issues(url, payload), None
+
+
+def search_page(url: str, payload: dict) -> Dict[str, Any]:
+    """
+    Returns one page of a JQL search, served from ``search_cache`` while
+    fresh. Identical concurrent page requests share one upstream call,
+    across worker processes with the shared cache.
+    """
+    key = _flight_key(url, payload)
+    entry = search_cache.get(key)
+
+    if entry is not None and entry.is_fresh:
+        search_cache.record_hit()
+        return entry.value
+
+    return inflight.do(key, lambda: search_cache.get_or_compute(key, partial(_refresh_page, url, payload)))
+
+
+class _ResumableSearch:
+    """
+    The issues of a JQL search from ``resume``, a ``[nextPageToken, index]``
+    position (the token is None on the first page), fetching the next page
+    only when the caller asks for more. ``position`` is that of the last
+    issue read.
+    """
+
+    def __init__(self, url: str, payload: dict, resume: Optional[list] = None):
+        self.url = url
+        self.payload = payload
+        self.resume = resume or [None, 0]
+        self.position: Optional[list] = None
+
+    def _first_page(self) -> Tuple[dict, int]:
+        token, index = self.resume
+        return ({**self.payload, "nextPageToken": token} if token else self.payload), index
+
+    def __iter__(self) -> Iterator[JiraIssueRecord]:
+        page, index = self._first_page()
+        while page is not None:
+            data = search_page(self.url, page)
+            for position, issue in enumerate(data.get("issues", [])[index:], index):
+                self.position = [page.get("nextPageToken"), position]
+                yield issue
+            page, index = _next_page(page, data), 0
+
+    async def __aiter__(self) -> AsyncIterator[JiraIssueRecord]:
+        page, index = self._first_page()
+        while page is not None:
+            data = await asearch_page(self.url, page)
+            for position, issue in enumerate(data.get("issues", [])[index:], index):
+                self.position = [page.get("nextPageToken"), position]
+                yield issue
+            page, index = _next_page(page, data), 0
+
+
+def iter_jira_issues(url: str, payload: dict) -> Iterator[JiraIssueRecord]:
+    """
+    Yields the issues of a JQL search, fetching the next page (via
+    ``nextPageToken``) only when the caller asks for more.
     """
-    Returns a list of Jira issues assigned to the user.
+    yield from _ResumableSearch(url, payload)
+
+
+def get_jira_activity(username: str, days: int = None, limit: Optional[int] = ACTIVITY_LIMIT) -> List[JiraIssueRecord]:
+    """
+    Returns a list of Jira issues assigned to the user, most recently updated
+    first. The ``days`` window is applied by Jira; pages are fetched until
+    ``limit`` issues were read (all matching issues when ``None``).
 
     Raises:
         ValueError: if user is not found
         JiraServiceUnavailable: if Jira API fails after retries
     """
+    url, payload = _search_request(
+        username,
+        updated_within=f"{days}d" if days is not None else None,
+        page_size=_page_size(limit),
+    )
 
-    username_key = username.lower()
+    try:
+        return list(islice(iter_jira_issues(url, payload), limit))
+    except requests.exceptions.HTTPError as e:
+        raise JiraServiceUnavailable("Jira is temporarily unavailable") from e
 
-    if username_key not in JIRA_USERNAME_TO_ACCOUNT_ID_MAP:
-        raise ValueError(f"User '{username}' not found")
 
-    account_id = JIRA_USERNAME_TO_ACCOUNT_ID_MAP[username_key]
+def get_jira_activity_page(
+    username: str, days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    """
+    Returns issues ``offset`` to ``offset + size`` of ``get_jira_activity``
+    and whether more follow. Search pages are ``size`` issues long, so a
+    page reads at most one search page past those already cached. With
+    ``resume``, the position of the page's first issue, it is read from
+    there instead of from the first search page.
 
-    url = f"{JIRA_BASE_URL}/rest/api/3/search/jql"
-    payload = {
-        "jql": f'assignee = "{account_id}"',
-        "fields": ["summary", "status", "updated"],
-        "maxResults": 50,
-    }
+    Raises:
+        ValueError: if user is not found
+        JiraServiceUnavailable: if Jira API fails after retries
+    """
+    url, payload = _search_request(
+        username,
+        updated_within=f"{days}d" if days is not None else None,
+        page_size=_page_size(size),
+    )
+
+    issues = _ResumableSearch(url, payload, resume)
+
+    try:
+        return take_page(issues, 0 if resume else offset, size, lambda: issues.position)
+    except requests.exceptions.HTTPError as e:
+        raise JiraServiceUnavailable("Jira is temporarily unavailable") from e
+
+
+def fetch_issues_since(username: str, since: Optional[datetime] = None) -> List[JiraIssueRecord]:
+    """
+    Returns every issue assigned to the user that was updated at or after
+    ``since`` (all assigned issues when ``None``). Used by the incremental
+    activity sync.
+
+    Raises:
+        ValueError: if user is not found
+        JiraServiceUnavailable: if Jira API fails after retries
+    """
+    updated_within = None
+    if since is not None:
+        # Relative JQL dates are evaluated in Jira's timezone, so pad the
+        # window by an hour; re-fetched issues are simply upserted again.
+        minutes = int((datetime.now(since.tzinfo) - since).total_seconds() // 60) + 60
+        updated_within = f"{minutes}m"
+
+    url, payload = _search_request(username, updated_within=updated_within)
+
+    try:
+        return list(iter_jira_issues(url, payload))
+    except requests.exceptions.HTTPError as e:
+        raise JiraServiceUnavailable("Jira is temporarily unavailable") from e
+
+
+async def _asend_page(url: str, payload: dict) -> Dict[str, Any]:
+    resp = await scheduler.acall(
+        lambda timeout: transport.apost(url, auth=get_async_auth(), json=payload, timeout=timeout, stream=True),
+        stream=True,
+    )
+    data, size = await transport.aread_json_items(resp, "issues", _issue_record)
+    UPSTREAM_RESPONSE_BYTES.observe(size, scheduler.name)
+    return data
+
+
+async def afetch_jira_issues(url: str, payload: dict) -> Dict[str, Any]:
+    with upstream_stage(scheduler.name):
+        return await breaker.acall(_asend_page, url, payload)
+
+
+async def _arefresh_page(url: str, payload: dict, _entry: Optional[CacheEntry]) -> Tuple[Dict[str, Any], None]:
+    search_cache.record_miss()
+    return await afetch_jira_issues(url, payload), None
+
+
+async def asearch_page(url: str, payload: dict) -> Dict[str, Any]:
+    key = _flight_key(url, payload)
+    entry = await search_cache.aget(key)
+
+    if entry is not None and entry.is_fresh:
+        search_cache.record_hit()
+        return entry.value
+
+    return await inflight.ado(key, lambda: search_cache.aget_or_compute(key, partial(_arefresh_page, url, payload)))
+
+
+async def aiter_jira_issues(url: str, payload: dict) -> AsyncIterator[JiraIssueRecord]:
+    """
+    Async variant of ``iter_jira_issues``.
+    """
+    async for issue in _ResumableSearch(url, payload):
+        yield issue
+
+
+async def aget_jira_activity(
+    username: str, days: int = None, limit: Optional[int] = ACTIVITY_LIMIT
+) -> List[JiraIssueRecord]:
+    """
+    Async variant of ``get_jira_activity`` for the ASGI chat endpoint.
+    """
+    url, payload = _search_request(
+        username,
+        updated_within=f"{days}d" if days is not None else None,
+        page_size=_page_size(limit),
+    )
 
+    issues = []
     try:
-        resp = fetch_jira_issues(url, payload)
+        async for issue in aiter_jira_issues(url, payload):
+            issues.append(issue)
+            if limit is not None and len(issues) >= limit:
+                break
     except requests.exceptions.HTTPError as e:
         raise JiraServiceUnavailable("Jira is temporarily unavailable") from e
 
-    issues = resp.json().get("issues", [])
-
-    # Filter by time window if required
-    if days is not None:
-        since = datetime.now() - timedelta(days=days)
-        issues = [
-            issue
-            for issue in issues
-            if datetime.strptime(issue["fields"]["updated"], "%Y-%m-%dT%H:%M:%S.%f%z").replace(tzinfo=None) >= since
-        ]
-
-    return [
-        {
-            "key": issue["key"],
-            "summary": issue["fields"]["summary"],
-            "status": issue["fields"]["status"]["name"],
-            "updated": issue["fields"]["updated"],
-        }
-        for issue in issues
-    ]
+    return issues
+
+
+async def aget_jira_activity_page(
+    username: str, days: Optional[int], offset: int, size: int, resume: Optional[list] = None
+) -> Page:
+    url, payload = _search_request(
+        username,
+        updated_within=f"{days}d" if days is not None else None,
+        page_size=_page_size(size),
+    )
+
+    issues = _ResumableSearch(url, payload, resume)
+
+    try:
+        return await atake_page(issues, 0 if resume else offset, size, lambda: issues.position)
+    except requests.exceptions.HTTPError as e:
+        raise JiraServiceUnavailable("Jira is temporarily unavailable") from e
+
+
+def invalidate_user(account_id: str) -> int:
+    """
+    Drops cached search pages of issues assigned to one Jira account, e.g.
+    after a webhook reported a change. Returns how many entries went.
+    """
+    assignee = f'assignee = "{account_id}"'
+    return search_cache.invalidate(lambda key: json.loads(key[1])["jql"].startswith(assignee))
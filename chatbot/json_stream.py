@@ -0,0 +1,144 @@
+import codecs
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+# Decoder states, in document order
+_START, _FIRST_MEMBER, _MEMBER, _AFTER_MEMBER, _FIRST_ITEM, _ITEM, _AFTER_ITEM, _DONE = range(8)
+
+_WHITESPACE = " \t\n\r"
+
+
+class ItemDecoder:
+    """
+    Incremental decoder for a JSON object built around one large array, such
+    as a search response ``{"total_count": 3, "items": [...]}``.
+
+    Bytes are pushed with ``feed`` as they arrive. Each element of the
+    ``key`` array is decoded as soon as it is complete and passed through
+    ``record``, and only what ``record`` returns is kept, so at most one
+    raw element plus one network chunk is held at a time. The object's
+    other members, which are small, are kept as they are. ``close`` returns
+    them with the records under ``key``.
+    """
+
+    def __init__(self, key: str, record: Callable[[Any], Any]):
+        self.key = key
+        self.record = record
+        self.items: List[Any] = []
+        self.extras: Dict[str, Any] = {}
+        self.size = 0
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = _START
+        self._final = False
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self._buffer = self._buffer[self._pos :] + self._text.decode(chunk)
+        self._pos = 0
+        self._parse()
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Raises:
+            ValueError: if the document is not a complete JSON object
+        """
+        self._buffer = self._buffer[self._pos :] + self._text.decode(b"", final=True)
+        self._pos = 0
+        self._final = True
+        self._parse()
+        if self._state != _DONE:
+            raise ValueError("Truncated JSON document")
+        return {**self.extras, self.key: self.items}
+
+    def _skip(self, pos: int) -> int:
+        buffer = self._buffer
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _char(self, pos: int) -> Optional[str]:
+        return self._buffer[pos] if pos < len(self._buffer) else None
+
+    def _value(self, pos: int):
+        """
+        Decodes the value at ``pos``. Returns ``(value, end)``, or None when
+        it may continue in bytes not received yet.
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if self._final:
+                raise
+            return None
+        # A number at the end of the buffer may have more digits coming
+        if end == len(self._buffer) and not self._final:
+            return None
+        return value, end
+
+    def _expect(self, pos: int, expected: str) -> Optional[int]:
+        pos = self._skip(pos)
+        char = self._char(pos)
+        if char is None:
+            return None
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} at {pos} in JSON document, found {char!r}")
+        return pos + 1
+
+    def _parse(self) -> None:
+        # Each step either consumes a whole token (moving _pos) or waits for
+        # more input, so a partly received token is decoded again later
+        while self._state != _DONE:
+            pos = self._skip(self._pos)
+            char = self._char(pos)
+            if char is None:
+                return
+
+            state = self._state
+            if state == _START:
+                end = self._expect(pos, "{")
+                next_state = _FIRST_MEMBER
+            elif state in (_FIRST_MEMBER, _AFTER_MEMBER) and char == "}":
+                end, next_state = pos + 1, _DONE
+            elif state == _AFTER_MEMBER:
+                end, next_state = self._expect(pos, ","), _MEMBER
+            elif state in (_FIRST_MEMBER, _MEMBER):
+                end, next_state = self._member(pos)
+            elif state in (_FIRST_ITEM, _AFTER_ITEM) and char == "]":
+                end, next_state = pos + 1, _AFTER_MEMBER
+            elif state == _AFTER_ITEM:
+                end, next_state = self._expect(pos, ","), _ITEM
+            else:
+                decoded = self._value(pos)
+                if decoded is None:
+                    return
+                item, end = decoded
+                self.items.append(self.record(item))
+                next_state = _AFTER_ITEM
+
+            if end is None:
+                return
+            self._pos, self._state = end, next_state
+
+    def _member(self, pos: int):
+        decoded = self._value(pos)
+        if decoded is None:
+            return None, None
+        name, pos = decoded
+        pos = self._expect(pos, ":")
+        if pos is None:
+            return None, None
+
+        if name == self.key:
+            return self._expect(pos, "["), _FIRST_ITEM
+
+        pos = self._skip(pos)
+        if self._char(pos) is None:
+            return None, None
+        decoded = self._value(pos)
+        if decoded is None:
+            return None, None
+        self.extras[name], end = decoded
+        return end, _AFTER_MEMBER
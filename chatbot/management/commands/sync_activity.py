@@ -0,0 +1,72 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.activity_store import SYNC_FUNCTIONS
+from chatbot.exceptions import GitHubServiceUnavailable, JiraServiceUnavailable
+from chatbot.models import SyncState
+from chatbot.roster import get_roster
+
+logger = logging.getLogger(__name__)
+
+# Upstream account each source is synced from
+SYNC_ACCOUNTS = {
+    SyncState.SOURCE_COMMITS: "github",
+    SyncState.SOURCE_PULL_REQUESTS: "github",
+    SyncState.SOURCE_JIRA: "jira",
+}
+
+
+class Command(BaseCommand):
+    help = "Pull GitHub and Jira activity changed since the last sync into the local store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="users",
+            help="Team member to sync (repeatable). Defaults to everyone.",
+        )
+        parser.add_argument(
+            "--source",
+            action="append",
+            dest="sources",
+            choices=sorted(SYNC_FUNCTIONS),
+            help="Source to sync (repeatable). Defaults to all sources.",
+        )
+
+    def handle(self, *args, **options):
+        roster = get_roster()
+        sources = options["sources"] or sorted(SYNC_FUNCTIONS)
+
+        if options["users"]:
+            unknown = [user for user in options["users"] if roster.get(user) is None]
+            if unknown:
+                raise CommandError(f"Unknown user(s): {', '.join(unknown)}")
+            members = list({member.name: member for member in map(roster.get, options["users"])}.values())
+        else:
+            members = list(roster.members())
+
+        failures = 0
+        for member in members:
+            user = member.name
+            for source in sources:
+                if SYNC_ACCOUNTS[source] not in member.linked_sources:
+                    self.stdout.write(f"{user}/{source}: skipped, no linked account")
+                    continue
+                try:
+                    synced = SYNC_FUNCTIONS[source](user)
+                except (GitHubServiceUnavailable, JiraServiceUnavailable) as e:
+                    failures += 1
+                    self.stderr.write(f"{user}/{source}: {e}")
+                    continue
+                except Exception as e:  # pylint: disable=broad-except
+                    # One member's bad data must not stop everyone else's sync
+                    logger.exception("Sync failed for %s/%s", user, source)
+                    failures += 1
+                    self.stderr.write(f"{user}/{source}: {e}")
+                    continue
+                self.stdout.write(f"{user}/{source}: {synced} item(s) synced")
+
+        if failures:
+            raise CommandError(f"{failures} sync(s) failed")
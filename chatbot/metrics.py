@@ -0,0 +1,316 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond parsing up to upstream deadlines
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{self._labels(labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram. ``observe`` only bumps one bucket and the sum;
+    buckets are made cumulative when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = TIME_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: a count per bucket (the last one is +Inf), then the sum
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((labels, list(counts)) for labels, counts in self._series.items())
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{self._labels(labels)} {cumulative}"
+
+
+# Sources of component stats by kind. Each returns the ``stats()`` dict of
+# one or more components, keyed by component name.
+StatsSource = Callable[[], Dict[str, Dict[str, Any]]]
+_stats_sources: Dict[str, List[StatsSource]] = {}
+
+
+def register_stats(kind: str, source: StatsSource) -> None:
+    _stats_sources.setdefault(kind, []).append(source)
+
+
+class StatsMetric(_Metric):
+    """
+    Gauge or counter read from the ``stats()`` of the components registered
+    under ``kind`` when rendered, so the components keep their own counters.
+    ``fields`` maps each stats field to the value of the second label, or
+    to None for a metric labelled by component only.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        fields: Dict[str, Optional[str]],
+        labelnames: Sequence[str],
+        type: str = "gauge",  # pylint: disable=redefined-builtin
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.fields = fields
+        self.type = type
+
+    def samples(self) -> Iterator[str]:
+        for source in list(_stats_sources.get(self.kind, [])):
+            for component, stats in sorted(source().items()):
+                for field, label in self.fields.items():
+                    value = stats.get(field)
+                    if value is None:
+                        continue
+                    labels = (component,) if label is None else (component, label)
+                    yield f"{self.name}{self._labels(labels)} {_format_value(value)}"
+
+
+def render_metrics() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+    """
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+CHAT_STAGE_SECONDS = Histogram("chat_stage_seconds", "Time spent in each stage of a chat request", ["stage"])
+HTTP_REQUEST_SECONDS = Histogram("http_request_seconds", "Time to build a response, by route", ["route", "method"])
+UPSTREAM_CALL_SECONDS = Histogram(
+    "upstream_call_seconds", "Upstream calls including retries and rate limit waits", ["upstream"]
+)
+UPSTREAM_RESPONSES = Counter(
+    "upstream_responses_total", "Upstream attempts by status code (error: no response)", ["upstream", "status"]
+)
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream attempts that were retried", ["upstream"])
+UPSTREAM_RESPONSE_BYTES = Histogram(
+    "upstream_response_bytes", "Size of upstream response bodies", ["upstream"], buckets=SIZE_BUCKETS
+)
+WEBHOOK_EVENTS = Counter(
+    "webhook_events_total", "Webhook events by outcome (queued, rejected, applied, failed)", ["source", "outcome"]
+)
+
+# Component stats, read when rendered
+POOL_REQUESTS = StatsMetric(
+    "upstream_pool_requests_total",
+    "Upstream requests by whether they reused an open connection",
+    "pool",
+    {"hits": "reused", "misses": "new"},
+    ["host", "connection"],
+    type="counter",
+)
+CACHE_ENTRIES = StatsMetric("cache_entries", "Entries held by each cache", "cache", {"entries": None}, ["cache"])
+CACHE_LOOKUPS = StatsMetric(
+    "cache_lookups_total",
+    "Cache lookups by result (wait: another worker was filling the entry)",
+    "cache",
+    {"hits": "hit", "misses": "miss", "not_modified": "not_modified", "waits": "wait"},
+    ["cache", "result"],
+    type="counter",
+)
+INFLIGHT_CALLS = StatsMetric(
+    "singleflight_in_flight",
+    "Upstream calls in flight, shared by their callers",
+    "inflight",
+    {"in_flight": None},
+    ["upstream"],
+)
+INFLIGHT_OUTCOMES = StatsMetric(
+    "singleflight_calls_total",
+    "Calls that went upstream (executed) or joined one in flight (coalesced)",
+    "inflight",
+    {"executed": "executed", "coalesced": "coalesced"},
+    ["upstream", "outcome"],
+    type="counter",
+)
+RATE_LIMIT_REMAINING = StatsMetric(
+    "upstream_rate_limit_remaining",
+    "Requests left in the upstream rate limit window, as last reported",
+    "scheduler",
+    {"remaining": None},
+    ["upstream"],
+)
+RATE_LIMIT_BLOCKED = StatsMetric(
+    "upstream_blocked_seconds",
+    "Seconds until the upstream accepts calls again after a rate limit",
+    "scheduler",
+    {"blocked_for": None},
+    ["upstream"],
+)
+SCHEDULER_OUTCOMES = StatsMetric(
+    "upstream_scheduler_calls_total",
+    "Upstream calls delayed by the local rate limit (throttled) or refused while blocked (rejected)",
+    "scheduler",
+    {"throttled": "throttled", "rejected": "rejected"},
+    ["upstream", "outcome"],
+    type="counter",
+)
+REFRESHER_KEYS = StatsMetric(
+    "refresher_keys",
+    "Answers tracked for popularity and background refreshes pending",
+    "refresher",
+    {"tracked": "tracked", "pending": "pending"},
+    ["refresher", "state"],
+)
+REFRESHER_OUTCOMES = StatsMetric(
+    "refresher_events_total",
+    "Stale answers served and background refreshes by outcome",
+    "refresher",
+    {"stale_served": "stale_served", "refreshed": "refreshed", "failed": "failed", "dropped": "dropped"},
+    ["refresher", "outcome"],
+    type="counter",
+)
+
+
+class RequestTimings:
+    """
+    Stage durations of one request, for its ``Server-Timing`` header.
+    Stages that run more than once (one per upstream call) are summed.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._stages: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        # Upstream calls record from executor threads; appends are atomic
+        self._stages.setdefault(stage, []).append(seconds)
+
+    def header(self) -> str:
+        parts = []
+        for stage, durations in list(self._stages.items()):
+            part = f"{stage};dur={sum(durations) * 1000:.1f}"
+            if len(durations) > 1:
+                part += f';desc="{len(durations)} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def request_timings():
+    """
+    Collects the stages timed inside the block, including those of upstream
+    calls it hands to the executor.
+    """
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def stage(name: str, histogram: Histogram = CHAT_STAGE_SECONDS):
+    """
+    Times the block into ``histogram`` (labelled ``name``) and the current
+    request's Server-Timing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, name)
+        timings = _timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def upstream_stage(name: str):
+    return stage(name, UPSTREAM_CALL_SECONDS)
+
+
+def record_response(upstream: str, status: str, size: Optional[int] = None) -> None:
+    UPSTREAM_RESPONSES.inc(upstream, status)
+    if size is not None:
+        UPSTREAM_RESPONSE_BYTES.observe(size, upstream)
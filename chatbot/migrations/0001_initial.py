@@ -0,0 +1,138 @@
+# Generated by Django 4.2.27 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Commit",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user", models.CharField(max_length=100)),
+                ("sha", models.CharField(max_length=40)),
+                ("repo", models.CharField(max_length=255)),
+                ("message", models.TextField()),
+                ("authored_at", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["-authored_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="JiraIssue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user", models.CharField(max_length=100)),
+                ("key", models.CharField(max_length=50)),
+                ("summary", models.CharField(max_length=500)),
+                ("status", models.CharField(max_length=100)),
+                ("updated_at", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["-updated_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="PullRequest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user", models.CharField(max_length=100)),
+                ("url", models.URLField(max_length=500)),
+                ("repo", models.CharField(max_length=255)),
+                ("title", models.CharField(max_length=500)),
+                ("state", models.CharField(max_length=20)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("merged_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-updated_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user", models.CharField(max_length=100)),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("commits", "GitHub commits"),
+                            ("pull_requests", "GitHub pull requests"),
+                            ("jira", "Jira issues"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("high_water_mark", models.DateTimeField(blank=True, null=True)),
+                ("last_synced_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="syncstate",
+            constraint=models.UniqueConstraint(fields=("user", "source"), name="unique_sync_state"),
+        ),
+        migrations.AddIndex(
+            model_name="pullrequest",
+            index=models.Index(fields=["user", "-updated_at"], name="chatbot_pul_user_547403_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="pullrequest",
+            constraint=models.UniqueConstraint(fields=("user", "url"), name="unique_pull_request_per_user"),
+        ),
+        migrations.AddIndex(
+            model_name="jiraissue",
+            index=models.Index(fields=["user", "-updated_at"], name="chatbot_jir_user_269086_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="jiraissue",
+            constraint=models.UniqueConstraint(fields=("user", "key"), name="unique_jira_issue_per_user"),
+        ),
+        migrations.AddIndex(
+            model_name="commit",
+            index=models.Index(fields=["user", "-authored_at"], name="chatbot_com_user_4259cf_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="commit",
+            constraint=models.UniqueConstraint(fields=("user", "sha"), name="unique_commit_per_user"),
+        ),
+    ]
@@ -1 +1,78 @@
-# Create your models here.
+from django.db import models
+
+
+class Commit(models.Model):
+    user = models.CharField(max_length=100)
+    sha = models.CharField(max_length=40)
+    repo = models.CharField(max_length=255)
+    message = models.TextField()
+    authored_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "sha"], name="unique_commit_per_user")]
+        indexes = [models.Index(fields=["user", "-authored_at"])]
+        ordering = ["-authored_at"]
+
+    def __str__(self):
+        return f"{self.repo}@{self.sha[:7]}"
+
+
+class PullRequest(models.Model):
+    user = models.CharField(max_length=100)
+    url = models.URLField(max_length=500)
+    repo = models.CharField(max_length=255)
+    title = models.CharField(max_length=500)
+    state = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    merged_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "url"], name="unique_pull_request_per_user")]
+        indexes = [models.Index(fields=["user", "-updated_at"])]
+        ordering = ["-updated_at"]
+
+    def __str__(self):
+        return self.url
+
+
+class JiraIssue(models.Model):
+    user = models.CharField(max_length=100)
+    key = models.CharField(max_length=50)
+    summary = models.CharField(max_length=500)
+    status = models.CharField(max_length=100)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "key"], name="unique_jira_issue_per_user")]
+        indexes = [models.Index(fields=["user", "-updated_at"])]
+        ordering = ["-updated_at"]
+
+    def __str__(self):
+        return self.key
+
+
+class SyncState(models.Model):
+    """
+    High-water mark of the last incremental sync per user and source.
+    """
+
+    SOURCE_COMMITS = "commits"
+    SOURCE_PULL_REQUESTS = "pull_requests"
+    SOURCE_JIRA = "jira"
+    SOURCE_CHOICES = [
+        (SOURCE_COMMITS, "GitHub commits"),
+        (SOURCE_PULL_REQUESTS, "GitHub pull requests"),
+        (SOURCE_JIRA, "Jira issues"),
+    ]
+
+    user = models.CharField(max_length=100)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "source"], name="unique_sync_state")]
+
+    def __str__(self):
+        return f"{self.user}/{self.source}"
@@ -0,0 +1,81 @@
+"""
+Paging of the item lists behind structured chat replies. A page is read
+from a lazy iterator of items, so the upstream pages past it are never
+fetched, and the position of the next one travels in a signed cursor.
+Live pages also record where upstream the next one starts, so loading
+more resumes there instead of walking the earlier pages again.
+"""
+
+from itertools import islice
+from typing import Any, AsyncIterable, Callable, Iterable, List, NamedTuple, Optional, TypeVar
+
+from django.core import signing
+
+T = TypeVar("T")
+
+_CURSOR_SALT = "chatbot.pagination.cursor"
+
+
+class Cursor(NamedTuple):
+    """
+    Where the next page of one item list starts. Clients get it signed and
+    opaque, so it can't be pointed at anything the question didn't ask for.
+    """
+
+    kind: str
+    name: str
+    days: Optional[int]
+    offset: int
+    size: int
+    # Upstream position of the page, when the page before it was read live
+    resume: Any = None
+
+    def encode(self) -> str:
+        return signing.dumps(list(self), salt=_CURSOR_SALT, compress=True)
+
+    @classmethod
+    def decode(cls, token: str) -> Optional["Cursor"]:
+        try:
+            return cls(*signing.loads(token, salt=_CURSOR_SALT))
+        except (signing.BadSignature, TypeError):
+            return None
+
+
+class Page(NamedTuple):
+    items: List
+    more: bool
+    # Upstream position of the item after the page, when read live
+    resume: Any = None
+
+
+def _no_position() -> Any:
+    return None
+
+
+def take_page(items: Iterable[T], offset: int, size: int, position: Callable[[], Any] = _no_position) -> Page:
+    """
+    Returns items ``offset`` to ``offset + size`` and whether any follow.
+    At most one item past the page is read from ``items``; ``position``
+    tells where upstream that item was read.
+    """
+    page = list(islice(items, offset, offset + size + 1))
+    more = len(page) > size
+    return Page(page[:size], more, position() if more else None)
+
+
+async def atake_page(
+    items: AsyncIterable[T], offset: int, size: int, position: Callable[[], Any] = _no_position
+) -> Page:
+    """
+    Async variant of ``take_page``.
+    """
+    page = []
+    index = 0
+    async for item in items:
+        if index >= offset:
+            page.append(item)
+            if len(page) > size:
+                break
+        index += 1
+    more = len(page) > size
+    return Page(page[:size], more, position() if more else None)
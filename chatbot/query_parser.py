@@ -1,14 +1,36 @@
 import re
 
+from chatbot.roster import find_member, find_team
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Phrases asking to rank team members, or for activity broken down by day.
+# Only explicit ones: "top" or "each day" alone also read naturally in
+# questions about one source ("Sarah's top commits", "commit each day")
+LEADERBOARD_RE = re.compile(
+    r"\bleaderboard\b|\branking\b|\bwho\b.*\bmost\b|\btop (?:\d+ )?(?:contributors|committers|performers)\b"
+)
+DAILY_RE = re.compile(r"\bper day\b|\bby day\b|\bdaily\b")
+
+# Jira statuses asked about as closed
+CLOSED_WORDS = {"closed", "close", "done", "resolved", "finished", "completed"}
+
 
 def extract_name_and_intent(message: str):
     msg = message.lower()
 
-    name_match = re.search(r"\b(john|sarah|mike)\b", msg)
-    name = name_match.group(0).capitalize() if name_match else None
+    member = find_member(msg)
+    name = member.display_name if member else None
+
+    # Analytics intents, answered from stored activity
+    if LEADERBOARD_RE.search(msg):
+        intent = "LEADERBOARD"
+
+    elif DAILY_RE.search(msg):
+        intent = "DAILY_ACTIVITY"
 
     # Jira intent
-    if any(word in msg for word in ["jira", "ticket", "issue"]):
+    elif any(word in msg for word in ["jira", "ticket", "issue"]):
         intent = "JIRA_ONLY"
 
     # GitHub-specific intents
@@ -41,3 +63,30 @@ def extract_name_and_intent(message: str):
         days = None
 
     return name, intent, days
+
+
+def extract_team(message: str):
+    """
+    Returns the team a message asks about, or None. Messages naming a single
+    team member are always answered for that member.
+    """
+    if find_member(message):
+        return None
+    return find_team(message)
+
+
+def extract_metric(message: str) -> str:
+    """
+    Returns the analytics metric (see ``analytics.METRICS``) a message asks
+    about; commits unless it mentions Jira or pull requests.
+    """
+    msg = message.lower()
+    words = set(_WORD_RE.findall(msg))
+
+    if any(word in msg for word in ["jira", "ticket", "issue"]):
+        return "issues_done" if words & CLOSED_WORDS else "issues_updated"
+
+    if "pull request" in msg or words & {"pr", "prs"}:
+        return "prs_merged" if "merged" in words or "merge" in words else "prs_opened"
+
+    return "commits"
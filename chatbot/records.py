@@ -0,0 +1,34 @@
+"""
+Compact activity records passed between the upstream clients, the activity
+store and the response templates. Tuples carry no per-instance ``__dict__``,
+so thousands of them cost a fraction of the dicts (let alone the upstream
+JSON objects) they are extracted from. Timestamps stay ISO 8601 strings as
+the upstreams send them.
+"""
+
+from typing import NamedTuple, Optional
+
+
+class CommitRecord(NamedTuple):
+    sha: str
+    repo: str
+    message: str
+    date: str
+
+
+class PullRequestRecord(NamedTuple):
+    title: str
+    repo: str
+    url: str
+    # Search results and the store have these; GraphQL summaries don't
+    state: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    merged_at: Optional[str] = None
+
+
+class JiraIssueRecord(NamedTuple):
+    key: str
+    summary: str
+    status: str
+    updated: str
@@ -0,0 +1,295 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from chatbot.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class FrequencyTracker:
+    """
+    Approximate top-k request counter in bounded memory (Space-Saving).
+
+    At most ``capacity`` keys are counted. A new key replaces the least
+    counted one and inherits its count, so keys that keep being requested
+    stay tracked while one-offs are pushed out. ``decay`` halves all counts
+    so the ranking follows recent traffic.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._counts: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._counts:
+                self._counts[key] += 1
+                return
+            count = 0.0
+            if len(self._counts) >= self.capacity:
+                evicted = min(self._counts, key=self._counts.__getitem__)
+                count = self._counts.pop(evicted)
+            self._counts[key] = count + 1
+
+    def top(self, n: int) -> List[Hashable]:
+        with self._lock:
+            return sorted(self._counts, key=self._counts.__getitem__, reverse=True)[:n]
+
+    def decay(self) -> None:
+        with self._lock:
+            self._counts = {key: count / 2 for key, count in self._counts.items() if count >= 0.5}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+class Refresher:
+    """
+    Stale-while-revalidate cache in front of live activity fetches.
+
+    ``get(key)`` returns the cached result of ``load(key)`` while it is
+    fresh. Once expired, the entry is still served for up to ``max_stale``
+    seconds while a background worker refreshes it; only older or missing
+    entries are fetched inline. Failed fetches are not cached.
+
+    A background loop refreshes the ``hot_keys`` most requested keys whose
+    entries expire within ``refresh_ahead`` seconds, so the people asked
+    about most never hit an expired entry. Refreshes run on a pool of
+    ``workers`` threads; at most ``max_pending`` may be queued, further
+    ones are dropped. Request counts halve every ``half_life`` seconds.
+
+    Loads are stamped with the invalidation generation they started in, and
+    a load of a key invalidated since is returned but not cached, so a
+    refresh already running can't put back what ``invalidate`` dropped.
+    The cache is per process: invalidating in one worker leaves the others
+    serving their entries until they expire (after ``ttl`` plus up to
+    ``max_stale`` seconds).
+    """
+
+    def __init__(
+        self,
+        load: Callable[[Hashable], Any],
+        ttl: float,
+        max_stale: float,
+        max_entries: int,
+        tracked_keys: int,
+        hot_keys: int,
+        refresh_ahead: float,
+        interval: float,
+        half_life: float,
+        workers: int,
+        max_pending: int,
+    ):
+        self.load = load
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.hot_keys = hot_keys
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.half_life = half_life
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.tracker = FrequencyTracker(tracked_keys)
+
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        self._generation = 0
+        self._loading: Dict[Hashable, int] = {}
+        self._invalidated: Dict[Hashable, int] = {}
+        self._pool = None
+        self._loop = None
+
+        self.stale_served = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _start(self) -> None:
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="refresh")
+            self._loop = threading.Thread(target=self._run, name="refresh-loop", daemon=True)
+            self._loop.start()
+
+    def _lookup(self, key: Hashable):
+        """
+        Returns ``(hit, value)`` for a fresh or servable stale entry, queueing
+        a revalidation for the latter.
+        """
+        self._start()
+        self.tracker.record(key)
+
+        entry = self.cache.get(key)
+        if entry is None:
+            return False, None
+
+        if entry.is_fresh:
+            self.cache.record_hit()
+            return True, entry.value
+
+        if time.monotonic() < entry.expires_at + self.max_stale:
+            with self._lock:
+                self.stale_served += 1
+            self.revalidate(key)
+            return True, entry.value
+
+        return False, None
+
+    def get(self, key: Hashable) -> Any:
+        if not self.enabled:
+            return self.load(key)
+
+        hit, value = self._lookup(key)
+        if hit:
+            return value
+
+        self.cache.record_miss()
+        return self._fetch(key, partial(self.load, key))
+
+    async def aget(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of ``get``; a miss awaits ``fetch()`` instead of
+        calling ``load``. Revalidation always uses ``load`` on the pool.
+        """
+        if not self.enabled:
+            return await fetch()
+
+        hit, value = self._lookup(key)
+        if hit:
+            return value
+
+        self.cache.record_miss()
+        started = self._begin(key)
+        try:
+            value = await fetch()
+            self._store(key, value, started)
+            return value
+        finally:
+            self._end(key)
+
+    def _fetch(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        started = self._begin(key)
+        try:
+            value = load()
+            self._store(key, value, started)
+            return value
+        finally:
+            self._end(key)
+
+    def _begin(self, key: Hashable) -> int:
+        """
+        Registers a load of ``key`` and returns the generation it starts in.
+        """
+        with self._lock:
+            self._loading[key] = self._loading.get(key, 0) + 1
+            return self._generation
+
+    def _store(self, key: Hashable, value: Any, started: int) -> None:
+        # Under the lock, so an invalidation can't slip in between the check and the set
+        with self._lock:
+            if self._invalidated.get(key, started) <= started:
+                self.cache.set(key, value)
+
+    def _end(self, key: Hashable) -> None:
+        with self._lock:
+            self._loading[key] -= 1
+            if not self._loading[key]:
+                # Loads starting from now on see the invalidation already
+                del self._loading[key]
+                self._invalidated.pop(key, None)
+
+    def revalidate(self, key: Hashable) -> bool:
+        """
+        Queues a background refresh of ``key`` unless one is already queued
+        or the queue is full. Returns whether it was queued.
+        """
+        self._start()
+        with self._lock:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.add(key)
+        self._pool.submit(self._refresh, key)
+        return True
+
+    def _refresh(self, key: Hashable) -> None:
+        try:
+            self._fetch(key, partial(self.load, key))
+        except Exception:
+            # Keep serving the stale entry; the next request retries
+            logger.warning("Background refresh of %r failed", key, exc_info=True)
+            with self._lock:
+                self.failed += 1
+        else:
+            with self._lock:
+                self.refreshed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drops cached results whose key matches ``predicate`` so the next
+        request loads them again instead of serving them stale. Loads of
+        those keys already running won't cache their result.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in self._loading:
+                if predicate(key):
+                    self._invalidated[key] = self._generation
+            return self.cache.invalidate(predicate)
+
+    def refresh_hot(self) -> int:
+        """
+        Queues refreshes for hot keys that expire soon. Returns how many
+        were queued.
+        """
+        deadline = time.monotonic() + self.refresh_ahead
+        queued = 0
+        for key in self.tracker.top(self.hot_keys):
+            entry = self.cache.get(key)
+            # Only keep known entries warm; misses are fetched by requests
+            if entry is not None and entry.expires_at <= deadline and self.revalidate(key):
+                queued += 1
+        return queued
+
+    def _run(self) -> None:
+        decayed_at = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh_hot()
+                if time.monotonic() - decayed_at >= self.half_life:
+                    self.tracker.decay()
+                    decayed_at = time.monotonic()
+            except Exception:
+                logger.exception("Refresh loop failed")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self.cache.stats(),
+                "tracked": len(self.tracker),
+                "pending": len(self._pending),
+                "stale_served": self.stale_served,
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
@@ -4,7 +4,7 @@ def jira_template(name, issues):
 
     lines = [f"{name} is working on {len(issues)} JIRA issue(s):"]
     for i in issues:
-        lines.append(f"- {i['key']} ({i['status']}): {i['summary']}")
+        lines.append(f"- {i.key} ({i.status}): {i.summary}")
     return "\n".join(lines)
 
 
@@ -12,6 +12,14 @@ def github_template(name, data):
     return f"On GitHub, {name} has:\n" f"- {data['commits']} commits\n" f"- {data['pull_requests']} open pull requests"
 
 
+def github_unavailable_template(name):
+    return f"GitHub activity for {name} is temporarily unavailable."
+
+
+def account_not_linked_template(name, source):
+    return f"{name} has no linked {'JIRA' if source == 'jira' else 'GitHub'} account."
+
+
 def combined_template(name, jira_data, github_data):
     return jira_template(name, jira_data) + "\n\n" + github_commits_template(name, github_data)
 
@@ -22,7 +30,7 @@ def github_commits_template(name, commits):
 
     lines = [f"Recent GitHub commits by {name}:"]
     for c in commits:
-        lines.append(f"- {c['repo']}: {c['message']}")
+        lines.append(f"- {c.repo}: {c.message}")
     return "\n".join(lines)
 
 
@@ -32,7 +40,7 @@ def github_prs_template(name, prs):
 
     lines = [f"Active pull requests by {name}:"]
     for pr in prs:
-        lines.append(f"- {pr['repo']}: {pr['title']}")
+        lines.append(f"- {pr.repo}: {pr.title}")
     return "\n".join(lines)
 
 
@@ -44,3 +52,53 @@ def github_repos_template(name, repos):
     for repo in repos:
         lines.append(f"- {repo}")
     return "\n".join(lines)
+
+
+def items_title_template(kind, name):
+    if kind == "jira":
+        return f"JIRA issues {name} is working on:"
+    if kind == "commits":
+        return f"Recent GitHub commits by {name}:"
+    if kind == "pull_requests":
+        return f"Active pull requests by {name}:"
+    return f"Repositories recently contributed to by {name}:"
+
+
+def team_template(team, replies):
+    return "\n\n".join([team_header_template(team, len(replies))] + replies)
+
+
+def team_header_template(team, count):
+    return f"Team activity for {team} ({count} member(s)):"
+
+
+def member_unavailable_template(name):
+    return f"Couldn't fetch activity for {name}."
+
+
+def _window_phrase(days):
+    if days is None:
+        return "so far"
+    if days == 1:
+        return "today"
+    return f"in the last {days} days"
+
+
+def leaderboard_template(scope, label, days, ranking):
+    if not ranking:
+        return f"No {label} recorded for {scope} {_window_phrase(days)}."
+
+    lines = [f"Most {label} {_window_phrase(days)} ({scope}):"]
+    for position, (name, count) in enumerate(ranking, 1):
+        lines.append(f"{position}. {name}: {count}")
+    return "\n".join(lines)
+
+
+def daily_activity_template(scope, label, days, series, statuses=None):
+    total = sum(count for _, count in series)
+    lines = [f"{label[0].upper()}{label[1:]} per day for {scope} {_window_phrase(days)} ({total} in total):"]
+    if statuses:
+        lines.append("By status: " + ", ".join(f"{status} {count}" for status, count in statuses.items()))
+    for day, count in series:
+        lines.append(f"- {day.isoformat()}: {count}")
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+from operator import itemgetter, sub
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+# Per-status Jira series are kept under this prefix
+STATUS_PREFIX = "status:"
+
+# Running totals per day; unsigned 32-bit counts are plenty and half the
+# size of Python's default array of longs
+_TYPECODE = "I"
+
+# Daily counts as {metric: {user: {day: count}}}
+DailyCounts = Dict[str, Dict[str, Dict[date, int]]]
+
+
+class ActivityRollups:
+    """
+    Per-user, per-day activity counts, built once from the local store (see
+    ``analytics.get_rollups``) and then queried without touching the
+    database.
+
+    Each (metric, user) series is an ``array`` of running totals over
+    consecutive days from ``start``: element ``i`` counts everything before
+    day ``start + i``. The count in any window is then two lookups, so a
+    leaderboard costs one subtraction per user and a per-day series one
+    slice per user, whatever the window length or the amount of activity.
+    Users without activity for a metric have no series and count as zero.
+    """
+
+    def __init__(self, daily: DailyCounts, today: Optional[date] = None):
+        days = [day for users in daily.values() for counts in users.values() for day in counts]
+        self.end = max([today or timezone.localdate(), *days])
+        self.start = min(days, default=self.end)
+        self.length = (self.end - self.start).days + 1
+        self._series: Dict[str, Dict[str, array]] = {}
+
+        for metric, users in daily.items():
+            self._series[metric] = {}
+            for user, counts in users.items():
+                per_day = [0] * self.length
+                for day, count in counts.items():
+                    per_day[(day - self.start).days] += count
+                self._series[metric][user] = array(_TYPECODE, accumulate(per_day, initial=0))
+
+        self.statuses = sorted(
+            metric[len(STATUS_PREFIX) :] for metric in self._series if metric.startswith(STATUS_PREFIX)
+        )
+
+    def _position(self, day: date) -> int:
+        """
+        Index of the running total counting everything before ``day``.
+        """
+        return min(max((day - self.start).days, 0), self.length)
+
+    def _window(self, days: Optional[int], today: Optional[date]) -> Tuple[date, date]:
+        """
+        First and last day of the ``days`` days up to ``today``; all days
+        when ``days`` is None.
+        """
+        last = today or timezone.localdate()
+        first = self.start if days is None else last - timedelta(days=days - 1)
+        return min(first, last), last
+
+    def _user_series(self, metric: str, users: Iterable[str]) -> List[array]:
+        series = self._series.get(metric, {})
+        return [series[user] for user in users if user in series]
+
+    def totals(
+        self, metric: str, users: List[str], days: Optional[int] = None, today: Optional[date] = None
+    ) -> List[int]:
+        """
+        Counts per user, in ``users`` order, over the last ``days`` days.
+        """
+        first, last = self._window(days, today)
+        begin, stop = self._position(first), self._position(last + timedelta(days=1))
+        series = self._series.get(metric, {})
+        return [series[user][stop] - series[user][begin] if user in series else 0 for user in users]
+
+    def daily(self, metric: str, users: List[str], days: int, today: Optional[date] = None) -> List[Tuple[date, int]]:
+        """
+        Counts per day, summed over ``users``, for the last ``days`` days.
+        """
+        first, last = self._window(days, today)
+        dates = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        positions = [self._position(day) for day in dates] + [self._position(last + timedelta(days=1))]
+
+        # Running totals at each day boundary, summed over users column by
+        # column, then differenced into per-day counts
+        pick = itemgetter(*positions)
+        running = [sum(column) for column in zip(*map(pick, self._user_series(metric, users)))]
+        if not running:
+            return [(day, 0) for day in dates]
+        return list(zip(dates, map(sub, running[1:], running[:-1])))
+
+    def status_totals(
+        self, users: List[str], days: Optional[int] = None, today: Optional[date] = None
+    ) -> Dict[str, int]:
+        """
+        Jira issues last updated in the window per current status, summed
+        over ``users``. Statuses without issues are left out.
+        """
+        counts = {status: sum(self.totals(STATUS_PREFIX + status, users, days, today)) for status in self.statuses}
+        return {status: count for status, count in counts.items() if count}
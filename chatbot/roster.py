@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from chatbot.constants import GITHUB_USER_ALIAS_TO_USERNAME_MAP, JIRA_USERNAME_TO_ACCOUNT_ID_MAP
+from team_activity_tracker.settings import ROSTER_FILE, ROSTER_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Letters and digits only, so "John's" and "o'brien" split the same way in
+# messages and in aliases
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Marks the end of an alias inside a token trie
+_VALUE = object()
+
+# Words that ask about everyone on the roster
+EVERYONE_ALIASES = ("team", "everyone", "everybody", "whole team")
+
+
+class Member(NamedTuple):
+    name: str
+    jira_account_id: Optional[str]
+    github_username: Optional[str]
+    aliases: tuple = ()
+
+    @property
+    def display_name(self) -> str:
+        return self.name.capitalize()
+
+    @property
+    def linked_sources(self) -> tuple:
+        """
+        The upstreams ("jira", "github") this member has an account on.
+        """
+        return tuple(
+            source for source, account in (("jira", self.jira_account_id), ("github", self.github_username)) if account
+        )
+
+
+class Team(NamedTuple):
+    name: str
+    members: tuple
+    aliases: tuple = ()
+
+    @property
+    def display_name(self) -> str:
+        return self.name.capitalize()
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class _TokenTrie:
+    """
+    Maps aliases to values through a trie keyed by word tokens, so a message
+    is searched in a single left-to-right pass whose cost depends on the
+    message length, not on how many aliases are indexed.
+    """
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def insert(self, alias: str, value: Any) -> None:
+        tokens = _tokenize(alias)
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # The first value to claim an alias keeps it
+        node.setdefault(_VALUE, value)
+
+    def find(self, message: str) -> Optional[Any]:
+        """
+        Returns the value whose alias appears earliest in the message,
+        preferring the longest alias at that position.
+        """
+        tokens = _tokenize(message)
+        root = self._root
+
+        for start in range(len(tokens)):
+            node = root
+            found = None
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                found = node.get(_VALUE, found)
+            if found is not None:
+                return found
+
+        return None
+
+    def get(self, alias: str) -> Optional[Any]:
+        node = self._root
+        for token in _tokenize(alias):
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get(_VALUE)
+
+
+class RosterIndex:
+    """
+    Immutable, compiled view of the roster and its teams.
+    """
+
+    def __init__(self, members: Iterable[Member], teams: Iterable[Team] = ()):
+        self._members: Dict[str, Member] = {}
+        # Accounts may be shared (e.g. one service account), so each maps to
+        # every member that uses it
+        self._by_github_username: Dict[str, List[Member]] = {}
+        self._by_jira_account_id: Dict[str, List[Member]] = {}
+        self._member_trie = _TokenTrie()
+        self._team_trie = _TokenTrie()
+
+        for member in members:
+            key = member.name.lower()
+            if key in self._members:
+                continue
+            self._members[key] = member
+            if member.github_username:
+                self._by_github_username.setdefault(member.github_username.lower(), []).append(member)
+            if member.jira_account_id:
+                self._by_jira_account_id.setdefault(member.jira_account_id, []).append(member)
+            for alias in (member.name, *member.aliases):
+                self._member_trie.insert(alias, member)
+
+        for team in teams:
+            # Unknown names in a team definition are ignored
+            known = tuple(dict.fromkeys(m.name for m in map(self.get, team.members) if m is not None))
+            team = team._replace(members=known)
+            for alias in (team.name, *team.aliases):
+                self._team_trie.insert(alias, team)
+
+        self._everyone = Team(name="everyone", members=tuple(self._members))
+        for alias in EVERYONE_ALIASES:
+            self._team_trie.insert(alias, self._everyone)
+
+    def find(self, message: str) -> Optional[Member]:
+        """
+        Returns the member named earliest in the message.
+        """
+        return self._member_trie.find(message)
+
+    def find_team(self, message: str) -> Optional[Team]:
+        """
+        Returns the team named earliest in the message; "team", "everyone"
+        and the like mean the whole roster unless a team claims them.
+        """
+        return self._team_trie.find(message)
+
+    def everyone(self) -> Team:
+        """
+        The whole roster as a team.
+        """
+        return self._everyone
+
+    def get(self, name: str) -> Optional[Member]:
+        """
+        Looks a member up by canonical name or exact alias.
+        """
+        member = self._members.get(name.lower())
+        if member is not None:
+            return member
+        return self._member_trie.get(name)
+
+    def by_github_username(self, username: str) -> List[Member]:
+        return list(self._by_github_username.get(username.lower(), ()))
+
+    def by_jira_account_id(self, account_id: str) -> List[Member]:
+        return list(self._by_jira_account_id.get(account_id, ()))
+
+    def members(self) -> List[Member]:
+        return list(self._members.values())
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+def _members_from_constants() -> List[Member]:
+    return [
+        Member(
+            name=name,
+            jira_account_id=JIRA_USERNAME_TO_ACCOUNT_ID_MAP.get(name),
+            github_username=GITHUB_USER_ALIAS_TO_USERNAME_MAP.get(name),
+        )
+        for name in {**JIRA_USERNAME_TO_ACCOUNT_ID_MAP, **GITHUB_USER_ALIAS_TO_USERNAME_MAP}
+    ]
+
+
+def _roster_from_file(path: str) -> RosterIndex:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    members = [
+        Member(
+            name=entry["name"].lower(),
+            jira_account_id=entry.get("jira_account_id"),
+            github_username=entry.get("github_username"),
+            aliases=tuple(entry.get("aliases", [])),
+        )
+        for entry in data.get("members", [])
+    ]
+    teams = [
+        Team(
+            name=entry["name"].lower(),
+            members=tuple(entry.get("members", [])),
+            aliases=tuple(entry.get("aliases", [])),
+        )
+        for entry in data.get("teams", [])
+    ]
+    return RosterIndex(members, teams)
+
+
+class _RosterHolder:
+    """
+    Keeps the current RosterIndex and rebuilds it when ROSTER_FILE changes.
+    """
+
+    def __init__(self, path: Optional[str], reload_interval: float):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._index: Optional[RosterIndex] = None
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def load(self) -> RosterIndex:
+        with self._lock:
+            mtime = self._file_mtime() if self.path else None
+            if mtime is not None:
+                try:
+                    self._index = _roster_from_file(self.path)
+                except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                    # A half-written or broken file keeps the last good roster
+                    # until the file changes again
+                    logger.warning("Could not load roster from %s", self.path, exc_info=True)
+                    if self._index is None:
+                        self._index = RosterIndex(_members_from_constants())
+            else:
+                self._index = RosterIndex(_members_from_constants())
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.reload_interval
+            return self._index
+
+    def get(self) -> RosterIndex:
+        index = self._index
+        if index is None:
+            return self.load()
+
+        if self.path and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.reload_interval
+            if self._file_mtime() != self._mtime:
+                return self.load()
+
+        return index
+
+
+_holder = _RosterHolder(ROSTER_FILE, ROSTER_RELOAD_INTERVAL)
+
+
+def get_roster() -> RosterIndex:
+    return _holder.get()
+
+
+def reload_roster() -> RosterIndex:
+    """
+    Rebuilds the roster index now instead of waiting for the next file check.
+    """
+    return _holder.load()
+
+
+def find_member(message: str) -> Optional[Member]:
+    return get_roster().find(message)
+
+
+def find_team(message: str) -> Optional[Team]:
+    return get_roster().find_team(message)
+
+
+def resolve_member(name: str) -> Member:
+    """
+    Raises:
+        KeyError: if nobody on the roster has this name or alias
+    """
+    member = get_roster().get(name)
+    if member is None:
+        raise KeyError(name)
+    return member
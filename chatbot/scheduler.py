@@ -0,0 +1,261 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+import requests
+
+from chatbot.metrics import UPSTREAM_RETRIES, record_response
+
+
+class RateLimitExceeded(requests.exceptions.HTTPError):
+    """
+    Raised without calling the upstream when its rate limit budget can't
+    recover before the call's deadline.
+    """
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Returns the seconds to wait from a ``Retry-After`` header, given either
+    as a number of seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Returns the epoch time from ``X-RateLimit-Reset``: epoch seconds on
+    GitHub, an ISO 8601 timestamp on Jira.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _is_rate_limited(response: requests.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    # GitHub answers exhausted primary and secondary limits with a 403
+    headers = response.headers
+    return response.status_code == 403 and (headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in headers)
+
+
+class UpstreamScheduler:
+    """
+    Paces and retries calls to one upstream rate limit budget.
+
+    Calls take a token from a bucket refilled at ``rate`` per second (up to
+    ``burst``). Responses update the budget: when ``X-RateLimit-Remaining``
+    reaches 0 or a ``Retry-After`` arrives, every call waits until the
+    upstream says it may go again instead of spending more requests.
+    5xx, 429 and rate limit 403 responses are retried with jittered
+    exponential backoff, never waiting past the call's ``deadline``; a call
+    that would have to wait longer fails straight away.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_attempts: int,
+        deadline: float,
+        timeout: float = 10,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_attempts = max(1, max_attempts)
+        self.deadline = deadline
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+
+        self.remaining: Optional[int] = None
+        self.throttled = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def _reserve(self) -> float:
+        """
+        Takes a token and returns how long to wait before it may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def _refund(self) -> None:
+        with self._lock:
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + 1)
+
+    def observe(self, response: requests.Response) -> None:
+        """
+        Updates the budget from the rate limit headers of ``response``.
+        """
+        headers = response.headers
+        now = time.monotonic()
+        blocked_until = None
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            self.remaining = int(remaining)
+            reset = _parse_reset(headers.get("X-RateLimit-Reset"))
+            if self.remaining == 0 and reset is not None:
+                blocked_until = now + max(0.0, reset - time.time())
+
+        retry_after = _parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None and (_is_rate_limited(response) or response.status_code == 503):
+            blocked_until = max(blocked_until or 0.0, now + retry_after)
+
+        if blocked_until is not None:
+            with self._lock:
+                self._blocked_until = max(self._blocked_until, blocked_until)
+
+    def _backoff(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """
+        Returns how long to back off before retrying, or None when the
+        response is final.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if not (_is_rate_limited(response) or 500 <= response.status_code < 600):
+            return None
+
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        return max(backoff, _parse_retry_after(response.headers.get("Retry-After")) or 0.0)
+
+    def _wait_before_attempt(self, deadline: float, backoff: float, last: Optional[requests.Response]) -> float:
+        wait = max(backoff, self._reserve())
+        if wait > 0 and wait >= deadline - time.monotonic():
+            self._refund()
+            self.rejected += 1
+            if last is not None:
+                last.raise_for_status()
+            raise RateLimitExceeded(f"{self.name} rate limit budget exhausted")
+        if wait > 0 and not backoff:
+            self.throttled += 1
+        return wait
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        return max(0.001, min(self.timeout, deadline - time.monotonic()))
+
+    def _failed_attempt(self) -> None:
+        record_response(self.name, "error")
+
+    def _finish_attempt(self, response: requests.Response, attempt: int, stream: bool = False) -> Optional[float]:
+        # A streamed 2xx body is left for the caller, who records its size
+        if stream and 200 <= response.status_code < 300:
+            record_response(self.name, str(response.status_code))
+        else:
+            record_response(self.name, str(response.status_code), len(response.content or b""))
+        self.observe(response)
+        backoff = self._backoff(response, attempt)
+        if backoff is None:
+            response.raise_for_status()
+        else:
+            self.retries += 1
+            UPSTREAM_RETRIES.inc(self.name)
+        return backoff
+
+    def call(self, send: Callable[[float], requests.Response], stream: bool = False) -> requests.Response:
+        """
+        Sends ``send(timeout)`` under the budget, retrying as needed, and
+        returns the final response. With ``stream``, the body of a 2xx
+        response is not read.
+
+        Raises:
+            requests.exceptions.HTTPError: for an error response that is not
+                retried (any more), or ``RateLimitExceeded``
+        """
+        deadline = time.monotonic() + self.deadline
+        backoff = 0.0
+        response = None
+        attempt = 0
+
+        while True:
+            wait = self._wait_before_attempt(deadline, backoff, response)
+            if wait > 0:
+                time.sleep(wait)
+            attempt += 1
+
+            try:
+                response = send(self._attempt_timeout(deadline))
+            except Exception:
+                self._failed_attempt()
+                raise
+            backoff = self._finish_attempt(response, attempt, stream)
+            if backoff is None:
+                return response
+
+    async def acall(
+        self, send: Callable[[float], Awaitable[requests.Response]], stream: bool = False
+    ) -> requests.Response:
+        """
+        Async variant of ``call``; waits without blocking the event loop.
+        """
+        deadline = time.monotonic() + self.deadline
+        backoff = 0.0
+        response = None
+        attempt = 0
+
+        while True:
+            wait = self._wait_before_attempt(deadline, backoff, response)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            attempt += 1
+
+            try:
+                response = await send(self._attempt_timeout(deadline))
+            except Exception:
+                self._failed_attempt()
+                raise
+            backoff = self._finish_attempt(response, attempt, stream)
+            if backoff is None:
+                return response
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            blocked_for = max(0.0, self._blocked_until - time.monotonic())
+        return {
+            "remaining": self.remaining,
+            "blocked_for": round(blocked_for, 3),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
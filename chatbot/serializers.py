@@ -1,5 +1,22 @@
 from rest_framework import serializers
 
+from team_activity_tracker.settings import CHAT_BATCH_MAX_MESSAGES, CHAT_PAGE_MAX_SIZE, CHAT_PAGE_SIZE
+
 
 class ChatbotSerializer(serializers.Serializer):
     message = serializers.CharField()
+
+
+class ChatbotPagingSerializer(serializers.Serializer):
+    structured = serializers.BooleanField(default=False)
+    page_size = serializers.IntegerField(min_value=1, max_value=CHAT_PAGE_MAX_SIZE, default=CHAT_PAGE_SIZE)
+
+
+class ChatbotCursorSerializer(serializers.Serializer):
+    cursor = serializers.CharField()
+
+
+class ChatbotBatchSerializer(serializers.Serializer):
+    messages = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=CHAT_BATCH_MAX_MESSAGES
+    )
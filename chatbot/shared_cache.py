@@ -0,0 +1,337 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple, Union
+
+from chatbot.cache import CacheEntry, TTLCache
+from team_activity_tracker.settings import (
+    UPSTREAM_CACHE_BACKEND,
+    UPSTREAM_CACHE_MAX_BYTES,
+    UPSTREAM_CACHE_PATH,
+    UPSTREAM_DEADLINE,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    key_blob BLOB NOT NULL,
+    value BLOB NOT NULL,
+    etag TEXT,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_by_expiry ON entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS locks (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+# Seconds between checks while another process computes a value
+_POLL_INTERVAL = 0.02
+
+# compute(stale_entry) returns the new value and its ETag
+Compute = Callable[[Optional[CacheEntry]], Tuple[Any, Optional[str]]]
+AsyncCompute = Callable[[Optional[CacheEntry]], Awaitable[Tuple[Any, Optional[str]]]]
+
+
+class SharedCache:
+    """
+    TTL cache shared by every worker process on a host through one SQLite
+    database in WAL mode, so readers never block each other or the writer.
+    It has the same interface as ``TTLCache``; several caches can share a
+    file under different ``namespace`` names.
+
+    Values are pickled; the file must only be writable by the app. Expired
+    entries are kept for ``keep_stale`` seconds so their ETag can still be
+    used for a conditional refresh. Past ``max_entries`` or ``max_bytes``,
+    the entries closest to expiry are evicted first.
+
+    ``get_or_compute`` holds a per-key lock row while it computes, so a miss
+    is computed by one process while the others wait for its result instead
+    of each calling the upstream. A lock left by a crashed process expires
+    after ``lock_timeout`` seconds.
+
+    Hit, miss and not-modified counts are per process. The async methods
+    run their SQLite work on a worker thread, since waiting for the write
+    lock can block for up to ``lock_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_entries: int,
+        ttl: float,
+        max_bytes: int,
+        keep_stale: float = 3600,
+        lock_timeout: float = 30,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.keep_stale = keep_stale
+        self.lock_timeout = lock_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.waits = 0
+
+    # Connections are per thread and per process: SQLite connections must
+    # not cross a fork (e.g. gunicorn --preload)
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return repr(key)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        row = (
+            self._db()
+            .execute(
+                "SELECT value, etag, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, self._key(key)),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        value, etag, expires_at = row
+        try:
+            value = pickle.loads(value)
+        except Exception:  # pylint: disable=broad-except
+            # Written by an incompatible version of the app
+            return None
+        # Entries expire by wall clock, shared between processes
+        return CacheEntry(value, etag, time.monotonic() + expires_at - time.time())
+
+    def set(self, key: Hashable, value: Any, etag: Optional[str] = None) -> None:
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._write() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    self._key(key),
+                    pickle.dumps(key, pickle.HIGHEST_PROTOCOL),
+                    blob,
+                    etag,
+                    time.time() + self.ttl,
+                    len(blob),
+                ),
+            )
+            self._evict(db)
+
+    async def aget(self, key: Hashable) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: Hashable, value: Any, etag: Optional[str] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, etag)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        db.execute(
+            "DELETE FROM entries WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time() - self.keep_stale),
+        )
+        entries, size = db.execute(
+            "SELECT count(*), coalesce(sum(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, entry_size in db.execute(
+            "SELECT key, size FROM entries WHERE namespace = ? ORDER BY expires_at", (self.namespace,)
+        ):
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            evicted.append((self.namespace, key))
+            entries -= 1
+            size -= entry_size
+        db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", evicted)
+
+    def touch(self, key: Hashable) -> None:
+        """
+        Extends the TTL of an entry after the upstream confirmed it is unchanged.
+        """
+        with self._write() as db:
+            db.execute(
+                "UPDATE entries SET expires_at = ? WHERE namespace = ? AND key = ?",
+                (time.time() + self.ttl, self.namespace, self._key(key)),
+            )
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    # Atomic get-or-compute across processes
+
+    def _try_lock(self, key: str, owner: str) -> bool:
+        now = time.time()
+        with self._write() as db:
+            db.execute(
+                "DELETE FROM locks WHERE namespace = ? AND key = ? AND expires_at < ?", (self.namespace, key, now)
+            )
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO locks VALUES (?, ?, ?, ?)",
+                (self.namespace, key, owner, now + self.lock_timeout),
+            )
+            return cursor.rowcount == 1
+
+    def _unlock(self, key: str, owner: str) -> None:
+        with self._write() as db:
+            db.execute("DELETE FROM locks WHERE namespace = ? AND key = ? AND owner = ?", (self.namespace, key, owner))
+
+    def _fresh(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self.get(key)
+        if entry is not None and entry.is_fresh:
+            self.record_hit()
+            return entry
+        return None
+
+    def get_or_compute(self, key: Hashable, compute: Compute) -> Any:
+        """
+        Returns the fresh cached value of ``key``, or stores and returns what
+        ``compute`` makes of the stale entry (or None). Only one process at a
+        time computes a key; the others wait and reuse its result.
+        """
+        owner = uuid.uuid4().hex
+        if not self._try_lock(self._key(key), owner):
+            self._record_wait()
+            while not self._try_lock(self._key(key), owner):
+                time.sleep(_POLL_INTERVAL)
+                entry = self._fresh(key)
+                if entry is not None:
+                    return entry.value
+
+        try:
+            # Another process may have stored it since the caller looked
+            entry = self.get(key)
+            if entry is not None and entry.is_fresh:
+                self.record_hit()
+                return entry.value
+            value, etag = compute(entry)
+            self.set(key, value, etag)
+            return value
+        finally:
+            self._unlock(self._key(key), owner)
+
+    async def aget_or_compute(self, key: Hashable, compute: AsyncCompute) -> Any:
+        """
+        Async variant of ``get_or_compute``. Neither SQLite nor waiting for
+        another process blocks the event loop.
+        """
+        owner = uuid.uuid4().hex
+        if not await asyncio.to_thread(self._try_lock, self._key(key), owner):
+            self._record_wait()
+            while not await asyncio.to_thread(self._try_lock, self._key(key), owner):
+                await asyncio.sleep(_POLL_INTERVAL)
+                entry = await asyncio.to_thread(self._fresh, key)
+                if entry is not None:
+                    return entry.value
+
+        try:
+            entry = await self.aget(key)
+            if entry is not None and entry.is_fresh:
+                self.record_hit()
+                return entry.value
+            value, etag = await compute(entry)
+            await self.aset(key, value, etag)
+            return value
+        finally:
+            await asyncio.to_thread(self._unlock, self._key(key), owner)
+
+    def _record_wait(self) -> None:
+        with self._lock:
+            self.waits += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drops the entries whose key matches ``predicate``. Returns how many.
+        """
+        with self._write() as db:
+            keys = [
+                (self.namespace, key)
+                for key, blob in db.execute("SELECT key, key_blob FROM entries WHERE namespace = ?", (self.namespace,))
+                if predicate(pickle.loads(blob))
+            ]
+            db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._write() as db:
+            db.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, int]:
+        (entries,) = (
+            self._db().execute("SELECT count(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()
+        )
+        with self._lock:
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "waits": self.waits,
+            }
+
+
+def upstream_cache(namespace: str, max_entries: int, ttl: float) -> Union[SharedCache, TTLCache]:
+    """
+    Cache for upstream responses: shared by the worker processes through
+    UPSTREAM_CACHE_PATH, or per process when UPSTREAM_CACHE_BACKEND is
+    "local".
+    """
+    if UPSTREAM_CACHE_BACKEND == "local":
+        return TTLCache(max_entries=max_entries, ttl=ttl)
+    return SharedCache(
+        UPSTREAM_CACHE_PATH,
+        namespace,
+        max_entries=max_entries,
+        ttl=ttl,
+        max_bytes=UPSTREAM_CACHE_MAX_BYTES,
+        lock_timeout=UPSTREAM_DEADLINE + 5,
+    )
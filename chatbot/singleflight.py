@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result or exception.
+    Nothing is kept once the call finishes. Async calls run in a task of
+    their own, so a cancelled caller doesn't cancel the others; the task is
+    cancelled only once every caller waiting on it is gone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _AsyncCall]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+            call = calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+            else:
+                self.executed += 1
+                call = calls[key] = _AsyncCall(loop.create_task(fn()))
+                call.task.add_done_callback(lambda _: self._forget(calls, key, call))
+            call.waiters += 1
+
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # The last caller gave up: nobody is left to use the result
+                self._forget(calls, key, call)
+                call.task.cancel()
+
+    def _forget(self, calls: Dict[Hashable, _AsyncCall], key: Hashable, call: _AsyncCall) -> None:
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + sum(len(calls) for calls in self._async_calls.values()),
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,270 @@
+"""
+Streaming chat replies. Each NDJSON line is {"type": "section", "index": i,
+"text": ...} as soon as that section's data is in, then {"type": "done"}
+(or {"type": "error", ...}). Joining the sections in index order with blank
+lines gives the same text as the non-streaming endpoints.
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import as_completed
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.response import Response
+from rest_framework.status import HTTP_400_BAD_REQUEST
+from rest_framework.viewsets import ViewSet
+
+from chatbot.activity_store import stored_activity
+from chatbot.executor import submit_parallel
+from chatbot.metrics import stage
+from chatbot.response_generator import (
+    account_not_linked_template,
+    github_commits_template,
+    github_unavailable_template,
+    jira_template,
+    team_header_template,
+)
+from chatbot.structured import first_pages, is_structured, page_calls, render_item_section
+from chatbot.views import (
+    ANALYTICS_INTENTS,
+    analytics_reply,
+    group_team_outcomes,
+    json_body,
+    member_names,
+    merge_activity,
+    parse_paged_chat,
+    render_member_reply,
+    render_reply,
+    team_calls,
+    unlinked_sources,
+)
+from team_activity_tracker.settings import TEAM_FETCH_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class ChatbotStreamView(ViewSet):
+    """
+    Streams the reply as NDJSON sections (see ``SectionStream``) as soon as
+    each upstream fetch finishes.
+    """
+
+    def post(self, request):
+        with stage("parse"):
+            parsed, error = parse_paged_chat(request.data)
+        if error:
+            return Response(error, status=HTTP_400_BAD_REQUEST)
+
+        query, page_size = parsed
+        stream, calls = open_section_stream(*query, page_size=page_size)
+        return _streaming_response(stream_sections(stream, calls))
+
+
+class AsyncChatbotStreamView(View):
+    """
+    Async counterpart of ``ChatbotStreamView`` for ASGI servers.
+    """
+
+    async def post(self, request):
+        with stage("parse"):
+            parsed, error = parse_paged_chat(json_body(request))
+        if error:
+            return JsonResponse(error, status=HTTP_400_BAD_REQUEST)
+
+        query, page_size = parsed
+        stream, calls = await sync_to_async(open_section_stream)(*query, page_size=page_size, asynchronous=True)
+        return _streaming_response(astream_sections(stream, calls))
+
+
+# Position of each source's section in a single-member reply
+SOURCE_SECTIONS = {"jira": 0, "github": 1}
+
+
+def render_section(name, intent, source, outcome):
+    """
+    Renders the part of a single-member reply that comes from ``source``.
+    """
+    jira_data, github_data, github_unavailable = merge_activity({}, {source: outcome})
+
+    if source == "jira":
+        return jira_template(name, jira_data)
+
+    if github_unavailable:
+        return github_unavailable_template(name)
+
+    if intent == "BOTH":
+        return github_commits_template(name, github_data)
+
+    return render_reply(name, intent, [], github_data, github_unavailable)
+
+
+class SectionStream:
+    """
+    Turns fetch outcomes into NDJSON lines as soon as a section can be
+    rendered: one section per source for a single member, or a header and
+    then one section per member for team queries.
+    """
+
+    def __init__(self, names, intent, stored, call_keys, team=None):
+        self.names = names
+        self.intent = intent
+        self.stored = stored
+        self.team = team
+        self.positions = {name: i + 1 for i, name in enumerate(names)}
+        self.outcomes = {name: {} for name in names}
+        self.pending = {name: set() for name in names}
+
+        for key, source in call_keys:
+            for name in key if isinstance(key, tuple) else (key,):
+                self.pending[name].add(source)
+
+    @staticmethod
+    def line(event):
+        return json.dumps(event) + "\n"
+
+    def _section(self, index, text):
+        return self.line({"type": "section", "index": index, "text": text})
+
+    def start(self):
+        """
+        Yields the sections that need no upstream fetch.
+        """
+        if self.team:
+            yield self._section(0, team_header_template(self.team.display_name, len(self.names)))
+            for name in self.names:
+                if not self.pending[name]:
+                    yield self._member_section(name)
+        else:
+            name = self.names[0]
+            for source in unlinked_sources(name, self.intent):
+                yield self._section(SOURCE_SECTIONS[source], account_not_linked_template(name, source))
+            for source, data in self.stored[name].items():
+                yield self._section(SOURCE_SECTIONS[source], render_section(name, self.intent, source, data))
+
+    def add(self, call_key, outcome):
+        """
+        Records the outcome of the ``team_calls`` entry ``call_key`` and
+        yields any sections it completes.
+        """
+        grouped = group_team_outcomes(self.names, self.intent, {call_key: outcome})
+
+        for name, outcomes in grouped.items():
+            if not outcomes:
+                continue
+            self.outcomes[name].update(outcomes)
+            self.pending[name].difference_update(outcomes)
+
+            if not self.team:
+                for source, result in outcomes.items():
+                    yield self._section(SOURCE_SECTIONS[source], render_section(name, self.intent, source, result))
+            elif not self.pending[name]:
+                yield self._member_section(name)
+
+    def _member_section(self, name):
+        text = render_member_reply(name, self.intent, self.stored[name], self.outcomes[name])
+        return self._section(self.positions[name], text)
+
+
+class ReplyStream(SectionStream):
+    """
+    A reply that needs no fetches, streamed as a single section.
+    """
+
+    def __init__(self, text):  # pylint: disable=super-init-not-called
+        self.text = text
+
+    def start(self):
+        yield self._section(0, self.text)
+
+
+class ItemSectionStream(SectionStream):
+    """
+    A structured reply streamed one item list section (see
+    ``render_item_section``) at a time, as each first page is read.
+    """
+
+    def __init__(self, cursors, stored):  # pylint: disable=super-init-not-called
+        self.positions = {cursor: i for i, cursor in enumerate(cursors)}
+        self.stored = stored
+
+    def start(self):
+        for cursor, page in self.stored.items():
+            yield self._item_section(cursor, page)
+
+    def add(self, call_key, outcome):
+        yield self._item_section(call_key, outcome)
+
+    def _item_section(self, cursor, outcome):
+        return self.line({"type": "section", "index": self.positions[cursor], **render_item_section(cursor, outcome)})
+
+
+def open_section_stream(name, team, intent, days, metric, page_size=None, asynchronous=False):
+    """
+    Reads the local store and prepares the live fetches for a streamed
+    reply. Returns the ``SectionStream`` and its ``team_calls`` (or
+    ``page_calls``, for a structured reply of ``page_size`` items a page).
+    """
+    if intent in ANALYTICS_INTENTS:
+        return ReplyStream(analytics_reply(name, team, intent, days, metric)), {}
+
+    if page_size is not None and is_structured(team, intent):
+        with stage("store"):
+            cursors, stored = first_pages(name, intent, days, page_size)
+        return ItemSectionStream(cursors, stored), page_calls(cursors, stored, asynchronous)
+
+    names = member_names(team) if team else [name]
+    with stage("store"):
+        stored = {member: stored_activity(member, intent, days) for member in names}
+    calls = team_calls(names, intent, days, stored, asynchronous)
+    return SectionStream(names, intent, stored, calls, team), calls
+
+
+def stream_sections(stream, calls):
+    try:
+        yield from stream.start()
+
+        futures = submit_parallel(calls, max_concurrency=TEAM_FETCH_CONCURRENCY)
+        keys = {future: key for key, future in futures.items()}
+        for future in as_completed(keys):
+            yield from stream.add(keys[future], future.exception() or future.result())
+
+        yield stream.line({"type": "done"})
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Streaming chat reply failed")
+        yield stream.line({"type": "error", "message": "Something went wrong"})
+
+
+async def astream_sections(stream, calls):
+    try:
+        for line in stream.start():
+            yield line
+
+        slots = asyncio.Semaphore(TEAM_FETCH_CONCURRENCY)
+
+        async def bounded(key, call):
+            async with slots:
+                try:
+                    return key, await call()
+                except Exception as e:  # pylint: disable=broad-except
+                    return key, e
+
+        for done in asyncio.as_completed([bounded(key, call) for key, call in calls.items()]):
+            key, outcome = await done
+            for line in stream.add(key, outcome):
+                yield line
+
+        yield stream.line({"type": "done"})
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Streaming chat reply failed")
+        yield stream.line({"type": "error", "message": "Something went wrong"})
+
+
+def _streaming_response(lines):
+    response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+    response["Cache-Control"] = "no-cache"
+    # Stop reverse proxies such as nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
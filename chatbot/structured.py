@@ -0,0 +1,194 @@
+"""
+Structured chat replies. Instead of text, each item list of a single-member
+reply is a section {"source": kind, "text": title, "items": [...],
+"next_cursor": ...} holding a page of typed items. The next page is read
+from the store or upstream only when its cursor is sent back.
+"""
+
+from functools import partial
+
+from asgiref.sync import sync_to_async
+
+from chatbot.activity_store import stored_page
+from chatbot.exceptions import GitHubServiceUnavailable, JiraServiceUnavailable
+from chatbot.github_client import (
+    aget_active_pull_requests_page,
+    aget_recent_commits_page,
+    aget_recent_repositories_page,
+    get_active_pull_requests_page,
+    get_recent_commits_page,
+    get_recent_repositories_page,
+)
+from chatbot.jira_client import aget_jira_activity_page, get_jira_activity_page
+from chatbot.metrics import stage
+from chatbot.pagination import Cursor, Page
+from chatbot.response_generator import (
+    account_not_linked_template,
+    github_commits_template,
+    github_prs_template,
+    github_repos_template,
+    items_title_template,
+    jira_template,
+)
+from chatbot.roster import get_roster
+from chatbot.serializers import ChatbotCursorSerializer
+
+# Item lists that answer each intent, in section order
+ITEM_SECTIONS = {
+    "JIRA_ONLY": ["jira"],
+    "GITHUB_COMMITS": ["commits"],
+    "GITHUB_PRS": ["pull_requests"],
+    "GITHUB_REPOS": ["repositories"],
+    "BOTH": ["jira", "commits"],
+}
+
+# Sync and async live reader of a page of each item list
+PAGE_FETCHES = {
+    "jira": (get_jira_activity_page, aget_jira_activity_page),
+    "commits": (get_recent_commits_page, aget_recent_commits_page),
+    "pull_requests": (get_active_pull_requests_page, aget_active_pull_requests_page),
+    "repositories": (get_recent_repositories_page, aget_recent_repositories_page),
+}
+
+# Type of the items of each list, and what its section says when empty
+ITEM_TYPES = {"jira": "jira_issue", "commits": "commit", "pull_requests": "pull_request", "repositories": "repository"}
+EMPTY_SECTION_TEMPLATES = {
+    "jira": jira_template,
+    "commits": github_commits_template,
+    "pull_requests": github_prs_template,
+    "repositories": github_repos_template,
+}
+
+# Upstream each item list is read from
+ITEM_SOURCES = {"jira": "jira", "commits": "github", "pull_requests": "github", "repositories": "github"}
+
+UPSTREAM_OUTAGES = (JiraServiceUnavailable, GitHubServiceUnavailable)
+
+
+def parse_cursor(data):
+    """
+    Validates a next page payload. Returns ``(cursor, None)``, or
+    ``(None, error)`` with the body of a 400 response.
+    """
+    serializer = ChatbotCursorSerializer(data=data)
+    if not serializer.is_valid():
+        return None, {
+            "success": False,
+            "message": "Invalid payload",
+            "errors": serializer.errors,
+        }
+
+    cursor = Cursor.decode(serializer.validated_data["cursor"])
+    if cursor is None or cursor.kind not in PAGE_FETCHES:
+        return None, {"success": False, "message": "Invalid cursor"}
+    return cursor, None
+
+
+def is_structured(team, intent):
+    return not team and intent in ITEM_SECTIONS
+
+
+def first_pages(name, intent, days, size):
+    """
+    Returns the cursors of the first page of each item list answering
+    ``intent``, in section order, and the pages the store can serve by
+    cursor. The others have to be read live.
+    """
+    cursors = [Cursor(kind, name, days, 0, size) for kind in ITEM_SECTIONS[intent]]
+    stored = {}
+    for cursor in cursors:
+        # Lists from an upstream the member has no account on are empty
+        page = Page([], False) if not is_linked(cursor) else stored_cursor_page(cursor)
+        if page is not None:
+            stored[cursor] = page
+    return cursors, stored
+
+
+def is_linked(cursor):
+    member = get_roster().get(cursor.name)
+    return member is None or ITEM_SOURCES[cursor.kind] in member.linked_sources
+
+
+def stored_cursor_page(cursor):
+    return stored_page(cursor.kind, cursor.name, cursor.days, cursor.offset, cursor.size)
+
+
+def page_call(cursor, asynchronous=False):
+    """
+    Returns a zero-argument callable reading the page at ``cursor`` live;
+    with ``asynchronous`` it returns a coroutine.
+    """
+    fetch, afetch = PAGE_FETCHES[cursor.kind]
+    return partial(afetch if asynchronous else fetch, *cursor[1:])
+
+
+def page_calls(cursors, stored, asynchronous=False):
+    return {cursor: page_call(cursor, asynchronous) for cursor in cursors if cursor not in stored}
+
+
+def typed_item(kind, item):
+    fields = {"name": item} if isinstance(item, str) else item._asdict()
+    return {"type": ITEM_TYPES[kind], **fields}
+
+
+def render_page(cursor, page):
+    """
+    Turns a page into its typed items and the cursor of the page after it,
+    which resumes upstream where this one stopped when it was read live.
+    """
+    next_cursor = cursor._replace(offset=cursor.offset + cursor.size, resume=page.resume)
+    return {
+        "items": [typed_item(cursor.kind, item) for item in page.items],
+        "next_cursor": next_cursor.encode() if page.more else None,
+    }
+
+
+def render_item_section(cursor, outcome):
+    """
+    Renders a first page (or the exception reading it raised) as a section.
+    Upstream outages degrade to an empty section, as in text replies.
+    """
+    if isinstance(outcome, UPSTREAM_OUTAGES):
+        outcome = Page([], False)
+    elif isinstance(outcome, Exception):
+        raise outcome
+
+    page = render_page(cursor, outcome)
+    if page["items"]:
+        text = items_title_template(cursor.kind, cursor.name)
+    elif not is_linked(cursor):
+        text = account_not_linked_template(cursor.name, ITEM_SOURCES[cursor.kind])
+    else:
+        text = EMPTY_SECTION_TEMPLATES[cursor.kind](cursor.name, [])
+    return {"source": cursor.kind, "text": text, **page}
+
+
+def render_structured(intent, cursors, pages):
+    return {"intent": intent, "text": None, "sections": [render_item_section(c, pages[c]) for c in cursors]}
+
+
+def page_reply(cursor):
+    """
+    Reads the page at ``cursor``, from the store while its source is fresh.
+    """
+    with stage("store"):
+        page = stored_cursor_page(cursor)
+
+    if page is None:
+        with stage("fetch"):
+            page = page_call(cursor)()
+
+    with stage("render"):
+        return render_page(cursor, page)
+
+
+async def apage_reply(cursor):
+    with stage("store"):
+        page = await sync_to_async(stored_cursor_page)(cursor)
+
+    if page is None:
+        with stage("fetch"):
+            page = await page_call(cursor, asynchronous=True)()
+
+    with stage("render"):
+        return render_page(cursor, page)
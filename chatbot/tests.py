@@ -1 +1,1029 @@
-# Create your tests here.
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from unittest import mock
+
+import requests
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from benchmarks.harness import percentile
+from benchmarks.load_test import MESSAGES, NAMES
+from benchmarks.stub_upstream import StubUpstream
+from chatbot import activity_store, github_client, jira_client, roster, transport, views
+from chatbot.cache import TTLCache
+from chatbot.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from chatbot.exceptions import GitHubServiceUnavailable
+from chatbot.executor import run_parallel
+from chatbot.json_stream import ItemDecoder
+from chatbot.metrics import render_metrics
+from chatbot.pagination import Cursor, Page
+from chatbot.query_parser import extract_name_and_intent
+from chatbot.records import PullRequestRecord
+from chatbot.refresher import Refresher
+from chatbot.rollups import ActivityRollups
+from chatbot.roster import Member, RosterIndex, Team, _RosterHolder
+from chatbot.scheduler import RateLimitExceeded, UpstreamScheduler
+from chatbot.shared_cache import SharedCache
+from chatbot.singleflight import SingleFlight
+from chatbot.streaming import open_section_stream, stream_sections
+from chatbot.structured import first_pages, parse_cursor, render_item_section, render_page
+from chatbot.webhooks import verify_signature
+
+
+class StubUpstreamTestCase(SimpleTestCase):
+    """
+    Points the GitHub client at the stub upstream, which pages search
+    results through ``Link`` headers, answers the aliased activity query
+    and treats "ghost*" logins as unknown users.
+    """
+
+    backend = "rest"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubUpstream(latency=0, items=12).start()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        # Fresh per-process caches, so every test reaches the stub
+        for name, value in {
+            "GITHUB_BASE_URL": self.stub.base_url,
+            "GITHUB_GRAPHQL_URL": f"{self.stub.base_url}/graphql",
+            "GITHUB_BACKEND": self.backend,
+            "search_cache": TTLCache(max_entries=64, ttl=60),
+            "activity_cache": TTLCache(max_entries=64, ttl=60),
+            "github_username": lambda name: name,
+        }.items():
+            patcher = mock.patch.object(github_client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def requests_made(self, fn, *args):
+        before = self.stub.requests
+        result = fn(*args)
+        return result, self.stub.requests - before
+
+
+class TransportTests(SimpleTestCase):
+    def test_one_keep_alive_pool_per_upstream_host(self):
+        stub = StubUpstream(latency=0, items=3).start()
+        self.addCleanup(stub.stop)
+
+        session = transport.get_session(f"{stub.base_url}/search/commits")
+        self.assertIs(transport.get_session(f"{stub.base_url}/rest/api/3/search/jql"), session)
+        self.assertIsNot(transport.get_session("http://other.test/"), session)
+
+        for _ in range(3):
+            transport.get(f"{stub.base_url}/search/commits", params={"q": "author:alice"}).raise_for_status()
+
+        pools = session.get_adapter(stub.base_url).poolmanager.pools
+        self.assertEqual([(pools[key].num_connections, pools[key].num_requests) for key in pools.keys()], [(1, 3)])
+
+
+class SearchCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual([key for key in "abc" if cache.get(key) is not None], ["a", "c"])
+
+    def test_stale_page_is_revalidated_with_its_etag(self):
+        def response(status, etag=None):
+            resp = requests.Response()
+            resp.status_code = status
+            resp.headers["ETag"] = etag
+            return resp
+
+        page = {"total_count": 1, "items": []}
+        sent = []
+
+        def fetch(url, headers=None, params=None):
+            sent.append(headers)
+            return (response(200, '"v1"'), page) if headers is None else (response(304), None)
+
+        # A TTL of 0 makes every entry stale, so each call revalidates
+        cache = TTLCache(max_entries=8, ttl=0)
+        with mock.patch.object(github_client, "search_cache", cache), mock.patch.object(
+            github_client, "fetch_search_page", fetch
+        ):
+            first = github_client.search_page("http://github.test/search/commits", {"q": "author:alice"})
+            second = github_client.search_page("http://github.test/search/commits", {"q": "author:alice"})
+
+        self.assertEqual(sent, [None, {"If-None-Match": '"v1"'}])
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats()["not_modified"], 1)
+
+
+class ExecutorTests(SimpleTestCase):
+    def test_calls_run_concurrently_and_fail_alone(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fail():
+            barrier.wait()
+            raise ValueError("jira")
+
+        def commits():
+            barrier.wait()
+            return "commits"
+
+        futures = run_parallel({"jira": fail, "github": commits})
+
+        self.assertIsInstance(futures["jira"].exception(), ValueError)
+        self.assertEqual(futures["github"].result(), "commits")
+
+    def test_bounded_fan_out_chains_the_next_call(self):
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def call(n):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return n
+
+        futures = run_parallel({n: partial(call, n) for n in range(6)}, max_concurrency=2)
+
+        self.assertEqual([future.result() for future in futures.values()], list(range(6)))
+        self.assertEqual(peak[0], 2)
+
+    def test_nested_fan_out_runs_inline(self):
+        def outer():
+            inner = run_parallel({n: threading.current_thread for n in range(2)})
+            return {future.result() for future in inner.values()} == {threading.current_thread()}
+
+        self.assertTrue(run_parallel({"a": outer, "b": outer})["a"].result())
+
+
+class GraphQLBackendTests(StubUpstreamTestCase):
+    backend = "graphql"
+
+    def test_several_logins_share_one_request(self):
+        activities, requests = self.requests_made(github_client.fetch_activities, ["alice", "bob", "carol"])
+
+        self.assertEqual(requests, 1)
+        self.assertEqual(set(activities), {"alice", "bob", "carol"})
+        for activity in activities.values():
+            self.assertEqual(activity["summary"], {"commits": 12, "pull_requests": 12})
+            self.assertTrue(activity["repositories"])
+
+    def test_unknown_login_only_fails_its_own_member(self):
+        activities = github_client.get_github_activities(["alice", "ghost-user", "bob"])
+
+        self.assertIsInstance(activities["ghost-user"], GitHubServiceUnavailable)
+        self.assertEqual(activities["alice"]["summary"], {"commits": 12, "pull_requests": 12})
+        self.assertEqual(activities["bob"]["summary"], {"commits": 12, "pull_requests": 12})
+        with self.assertRaises(GitHubServiceUnavailable):
+            github_client.get_github_activity("ghost-user")
+
+    def test_batches_are_split_by_batch_size(self):
+        logins = [f"user{i}" for i in range(5)]
+        with mock.patch.object(github_client, "GITHUB_GRAPHQL_BATCH_SIZE", 2):
+            activities, requests = self.requests_made(github_client.fetch_activities, logins)
+
+        self.assertEqual(requests, 3)
+        self.assertEqual(set(activities), set(logins))
+
+    def test_cached_logins_are_not_requested_again(self):
+        github_client.fetch_activities(["alice"])
+        _, requests = self.requests_made(github_client.fetch_activities, ["alice", "bob"])
+
+        self.assertEqual(requests, 1)
+        _, requests = self.requests_made(github_client.fetch_activities, ["alice", "bob"])
+        self.assertEqual(requests, 0)
+
+    def test_shapes_match_the_rest_backend(self):
+        graphql = {
+            "summary": github_client.get_github_activity("alice"),
+            "pull_requests": github_client.get_active_pull_requests("alice"),
+            "repositories": github_client.get_recent_repositories("alice"),
+        }
+        with mock.patch.object(github_client, "GITHUB_BACKEND", "rest"):
+            rest = {
+                "summary": github_client.get_github_activity("alice"),
+                "pull_requests": github_client.get_active_pull_requests("alice"),
+                "repositories": github_client.get_recent_repositories("alice"),
+            }
+
+        self.assertEqual(graphql["summary"], rest["summary"])
+        self.assertTrue(graphql["pull_requests"])
+        for pr in graphql["pull_requests"] + rest["pull_requests"]:
+            self.assertIsInstance(pr, PullRequestRecord)
+            self.assertTrue(pr.title and pr.repo and pr.url)
+        self.assertEqual(graphql["repositories"], rest["repositories"])
+
+
+class InvalidateUserTests(StubUpstreamTestCase):
+    def test_follow_on_pages_are_dropped(self):
+        for name in ("alice", "bob"):
+            github_client.get_recent_commits_page(name, None, 5, 5)
+        self.assertGreater(github_client.search_cache.stats()["entries"], 2)
+
+        dropped = github_client.invalidate_user("alice")
+
+        self.assertEqual(dropped * 2, github_client.search_cache.stats()["entries"] + dropped)
+        _, requests = self.requests_made(github_client.get_recent_commits_page, "bob", None, 5, 5)
+        self.assertEqual(requests, 0)
+        _, requests = self.requests_made(github_client.get_recent_commits_page, "alice", None, 5, 5)
+        self.assertEqual(requests, dropped)
+
+
+class ResumedPageTests(StubUpstreamTestCase):
+    """
+    Pages after the first resume upstream where the previous one stopped.
+    """
+
+    def setUp(self):
+        super().setUp()
+        roster = RosterIndex([Member("alice", "account-alice", "alice")])
+        for name, value in {
+            "JIRA_BASE_URL": self.stub.base_url,
+            "search_cache": TTLCache(max_entries=64, ttl=60),
+            "get_roster": lambda: roster,
+        }.items():
+            patcher = mock.patch.object(jira_client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_pages(self, fetch, size):
+        """
+        Reads every page through its resume position, emptying the caches
+        first so each page counts the search pages it reads.
+        """
+        pages, resume, offset = [], None, 0
+        while True:
+            github_client.search_cache.clear()
+            jira_client.search_cache.clear()
+            page, requests = self.requests_made(fetch, "alice", None, offset, size, resume)
+            pages.append((page.items, requests))
+            if not page.more:
+                return pages
+            resume, offset = page.resume, offset + size
+
+    def assert_resumed(self, fetch, size, expected_requests):
+        pages = self.read_pages(fetch, size)
+        walked = [fetch("alice", None, offset, size).items for offset in range(0, size * len(pages), size)]
+
+        self.assertEqual([items for items, _ in pages], walked)
+        self.assertEqual([requests for _, requests in pages], expected_requests)
+
+    def test_commits(self):
+        # 12 commits in search pages of 5: each page reads its own and the next
+        self.assert_resumed(github_client.get_recent_commits_page, 5, [2, 2, 1])
+
+    def test_jira_issues(self):
+        self.assert_resumed(jira_client.get_jira_activity_page, 5, [2, 2, 1])
+
+    def test_github_window_and_limit_are_pushed_down(self):
+        with mock.patch.object(github_client, "search_page", wraps=github_client.search_page) as search_page:
+            commits, requests = self.requests_made(github_client.get_recent_commits, "alice", 7, 5)
+
+        self.assertEqual((len(commits), requests), (5, 1))
+        _, params = search_page.call_args.args
+        since = github_client._window_start(7).date().isoformat()
+        self.assertEqual((params["q"], params["per_page"]), (f"author:alice author-date:>={since}", 5))
+
+    def test_jira_window_and_limit_are_pushed_down(self):
+        with mock.patch.object(jira_client, "search_page", wraps=jira_client.search_page) as search_page:
+            issues, requests = self.requests_made(jira_client.get_jira_activity, "alice", 7, 5)
+
+        self.assertEqual((len(issues), requests), (5, 1))
+        _, payload = search_page.call_args.args
+        self.assertEqual(payload["jql"], 'assignee = "account-alice" AND updated >= -7d ORDER BY updated DESC')
+        self.assertEqual(payload["maxResults"], 5)
+
+    def test_repositories_skip_those_already_listed(self):
+        pages = self.read_pages(github_client.get_recent_repositories_page, 3)
+
+        repositories = [repo for items, _ in pages for repo in items]
+        self.assertEqual(repositories, [f"org/repo-{i}" for i in range(7)])
+
+
+class ChatStubTestCase(StubUpstreamTestCase):
+    """
+    Answers chats for ``members`` from the stub upstream: Jira points at it
+    too, the local store is never fresh and no cached answer is reused.
+    """
+
+    members = [Member("alice", "account-alice", "alice")]
+    teams = []
+
+    def setUp(self):
+        super().setUp()
+        index = RosterIndex(self.members, self.teams)
+        for target, name, value in [
+            (jira_client, "JIRA_BASE_URL", self.stub.base_url),
+            (jira_client, "search_cache", TTLCache(max_entries=64, ttl=60)),
+            (activity_store, "ACTIVITY_STORE_MAX_AGE", 0),
+            (roster, "_holder", mock.Mock(get=lambda: index)),
+        ]:
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        views.refresher.invalidate(lambda key: True)
+
+
+class OneAccountMemberTests(ChatStubTestCase):
+    """
+    Members linked to only one upstream get a notice for the other, which
+    is never called.
+    """
+
+    members = [Member("alice", None, "alice"), Member("bob", "account-bob", None)]
+
+    def test_github_only_member(self):
+        reply, requests = self.requests_made(views.chat_reply, "alice", None, "JIRA_ONLY", None, None)
+        self.assertEqual((reply, requests), ("alice has no linked JIRA account.", 0))
+
+        reply = views.chat_reply("alice", None, "BOTH", None, None)
+        self.assertTrue(reply.startswith("alice has no linked JIRA account.\n\nRecent GitHub commits by alice:"))
+
+    def test_jira_only_member(self):
+        reply, requests = self.requests_made(views.chat_reply, "bob", None, "GITHUB_ONLY", None, None)
+        self.assertEqual((reply, requests), ("bob has no linked GitHub account.", 0))
+
+        reply = views.chat_reply("bob", None, "BOTH", None, None)
+        self.assertTrue(reply.startswith("bob is working on 12 JIRA issue(s):"))
+        self.assertTrue(reply.endswith("\n\nbob has no linked GitHub account."))
+
+    def test_structured_sections(self):
+        cursors, stored = first_pages("bob", "BOTH", None, 5)
+
+        self.assertEqual(list(stored), [cursors[1]])
+        self.assertEqual(
+            render_item_section(cursors[1], stored[cursors[1]])["text"], "bob has no linked GitHub account."
+        )
+
+
+class SyncActivityCommandTests(SimpleTestCase):
+    def test_skips_unlinked_sources_and_continues_after_errors(self):
+        index = RosterIndex([Member("alice", "account-alice", "alice"), Member("bob", "account-bob", None)])
+        synced = []
+
+        def sync(user):
+            synced.append(user)
+            if user == "alice":
+                raise ValueError("bad issue")
+            return 0
+
+        functions = {"commits": sync, "pull_requests": sync, "jira": sync}
+        with mock.patch.object(roster, "_holder", mock.Mock(get=lambda: index)), mock.patch.dict(
+            activity_store.SYNC_FUNCTIONS, functions
+        ), self.assertLogs("chatbot.management.commands.sync_activity", "ERROR"):
+            with self.assertRaisesMessage(CommandError, "3 sync(s) failed"):
+                call_command("sync_activity", stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(synced, ["alice", "alice", "alice", "bob"])
+
+
+class QueryParserTests(SimpleTestCase):
+    def assert_intents(self, expected):
+        for message, intent in expected.items():
+            with self.subTest(message=message):
+                self.assertEqual(extract_name_and_intent(message)[1], intent)
+
+    def test_member_intents(self):
+        self.assert_intents(
+            {
+                "Show me Sarah top commits": "GITHUB_COMMITS",
+                "what are johns top priority jira tickets": "JIRA_ONLY",
+                "What did Mike commit each day this week": "GITHUB_COMMITS",
+                "what did john do a day ago": "BOTH",
+                "what pull requests has john opened": "GITHUB_PRS",
+                "which repos has john contributed to": "GITHUB_REPOS",
+                "how active is john on github": "GITHUB_ONLY",
+                "what is john working on": "BOTH",
+            }
+        )
+
+    def test_analytics_intents(self):
+        self.assert_intents(
+            {
+                "show the commit leaderboard": "LEADERBOARD",
+                "who closed the most jira tickets this week": "LEADERBOARD",
+                "top contributors this month": "LEADERBOARD",
+                "how many commits per day this week": "DAILY_ACTIVITY",
+                "daily jira issues for the team": "DAILY_ACTIVITY",
+            }
+        )
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append("fetch")
+            started.set()
+            release.wait(5)
+            raise ValueError("upstream")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "key", fetch)
+            started.wait(5)
+            follower = pool.submit(flight.do, "key", fetch)
+            while not flight.stats()["coalesced"]:
+                time.sleep(0.001)
+            release.set()
+
+        self.assertIsInstance(leader.exception(), ValueError)
+        self.assertIs(follower.exception(), leader.exception())
+        self.assertEqual(calls, ["fetch"])
+
+    def test_cancelled_leader_leaves_followers_the_result(self):
+        async def scenario():
+            flight, release = SingleFlight(), asyncio.Event()
+
+            async def fetch():
+                await release.wait()
+                return "result"
+
+            leader = asyncio.ensure_future(flight.ado("key", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.ado("key", fetch))
+            await asyncio.sleep(0)
+            leader.cancel()
+            await asyncio.sleep(0)
+            release.set()
+            return await follower, leader.cancelled(), flight.stats()
+
+        result, leader_cancelled, stats = asyncio.run(scenario())
+
+        self.assertEqual((result, leader_cancelled), ("result", True))
+        self.assertEqual(stats, {"in_flight": 0, "executed": 1, "coalesced": 1})
+
+    def test_call_is_cancelled_with_its_last_caller(self):
+        cancelled = []
+
+        async def scenario():
+            flight = SingleFlight()
+
+            async def fetch():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append("key")
+                    raise
+
+            caller = asyncio.ensure_future(flight.ado("key", fetch))
+            await asyncio.sleep(0)
+            caller.cancel()
+            await asyncio.gather(caller, return_exceptions=True)
+            await asyncio.sleep(0)
+            return flight.stats()
+
+        self.assertEqual(asyncio.run(scenario())["in_flight"], 0)
+        self.assertEqual(cancelled, ["key"])
+
+
+class ConditionalChatTests(ChatStubTestCase):
+    def test_any_phrasing_of_an_unchanged_reply_is_not_modified(self):
+        first = self.client.get("/api/chat/", {"message": "what is alice working on"})
+        etag = first["ETag"]
+
+        again = self.client.get("/api/chat/", {"message": "What is Alice doing?"}, HTTP_IF_NONE_MATCH=etag)
+        other = self.client.get("/api/chat/", {"message": "show me alice commits"}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual((first.status_code, again.status_code, other.status_code), (200, 304, 200))
+        self.assertIn("max-age=", first["Cache-Control"])
+        self.assertEqual(again["ETag"], etag)
+        self.assertNotEqual(other["ETag"], etag)
+
+
+class BatchReplyTests(ChatStubTestCase):
+    def test_messages_share_their_fetches(self):
+        messages = ["what is alice working on", "What is Alice doing?", "show me alice commits"]
+        replies, requests = self.requests_made(views.batch_replies, messages)
+
+        # One Jira search and one commit search answer all three
+        self.assertEqual(requests, 2)
+        self.assertEqual(replies[0], replies[1])
+        self.assertTrue(replies[2]["data"].startswith("Recent GitHub commits by Alice:"))
+
+    def test_failing_analytics_message_fails_alone(self):
+        messages = ["show the team leaderboard", "team commits per day this week"]
+        with mock.patch.object(views, "analytics_reply", side_effect=[ValueError("no rollups"), "Commits per day"]):
+            with self.assertLogs("chatbot.views", "ERROR"):
+                replies = views.batch_replies(messages)
+
+        self.assertEqual(
+            replies,
+            [{"success": False, "message": "Something went wrong"}, {"success": True, "data": "Commits per day"}],
+        )
+
+
+class RefresherTests(SimpleTestCase):
+    @staticmethod
+    def refresher(load, ttl=60):
+        return Refresher(
+            load,
+            ttl=ttl,
+            max_stale=60,
+            max_entries=8,
+            tracked_keys=8,
+            hot_keys=0,
+            refresh_ahead=0,
+            interval=60,
+            half_life=60,
+            workers=1,
+            max_pending=8,
+        )
+
+    def test_expired_entry_is_served_while_it_is_refreshed(self):
+        loads = []
+
+        def load(key):
+            loads.append(key)
+            return len(loads)
+
+        refresher = self.refresher(load, ttl=0.01)
+        self.assertEqual(refresher.get("alice"), 1)
+        time.sleep(0.02)
+
+        self.assertEqual(refresher.get("alice"), 1)
+        refresher._pool.shutdown(wait=True)
+        self.assertEqual(refresher.cache.get("alice").value, 2)
+        self.assertEqual((refresher.stats()["stale_served"], refresher.stats()["refreshed"]), (1, 1))
+
+    def test_load_running_across_an_invalidation_is_not_cached(self):
+        started, release = threading.Event(), threading.Event()
+
+        def load(key):
+            started.set()
+            release.wait(5)
+            return "before"
+
+        refresher = self.refresher(load)
+        self.assertTrue(refresher.revalidate("alice"))
+        started.wait(5)
+        refresher.invalidate(lambda key: key == "alice")
+        release.set()
+        refresher._pool.shutdown(wait=True)
+
+        self.assertIsNone(refresher.cache.get("alice"))
+        self.assertEqual(refresher.stats()["refreshed"], 1)
+
+
+class JiraActivityLimitTests(SimpleTestCase):
+    def test_text_reply_reads_one_search_page(self):
+        stub = StubUpstream(latency=0, items=250).start()
+        self.addCleanup(stub.stop)
+        index = RosterIndex([Member("alice", "account-alice", "alice")])
+
+        with mock.patch.object(jira_client, "JIRA_BASE_URL", stub.base_url), mock.patch.object(
+            jira_client, "search_cache", TTLCache(max_entries=64, ttl=60)
+        ), mock.patch.object(jira_client, "get_roster", lambda: index):
+            issues = jira_client.get_jira_activity("alice")
+
+        self.assertEqual((len(issues), stub.requests), (jira_client.ACTIVITY_LIMIT, 1))
+
+
+class TeamReplyTests(ChatStubTestCase):
+    members = [Member(name, f"account-{name}", name) for name in ("alice", "bob", "carol")]
+    teams = [Team("backend", ("alice", "bob", "carol"))]
+
+    def test_one_section_per_member_and_failures_stay_with_their_member(self):
+        def github_username(name):
+            if name == "Carol":
+                raise KeyError(name)
+            return name
+
+        with mock.patch.object(github_client, "github_username", github_username), self.assertLogs(
+            "chatbot.views", "ERROR"
+        ):
+            reply, requests = self.requests_made(views.team_reply, self.teams[0], "GITHUB_COMMITS", None)
+
+        sections = reply.split("\n\n")
+        self.assertEqual(sections[0], "Team activity for Backend (3 member(s)):")
+        self.assertTrue(sections[1].startswith("Recent GitHub commits by Alice:"))
+        self.assertTrue(sections[2].startswith("Recent GitHub commits by Bob:"))
+        self.assertEqual(sections[3], "Couldn't fetch activity for Carol.")
+        self.assertEqual(requests, 2)
+
+
+class StreamingTests(ChatStubTestCase):
+    def test_sections_arrive_as_fetched_and_join_into_the_reply(self):
+        get_jira_activity, _ = views.LIVE_FETCHES["jira"]
+
+        def slow_jira(*args):
+            time.sleep(0.2)
+            return get_jira_activity(*args)
+
+        with mock.patch.dict(views.LIVE_FETCHES, {"jira": (slow_jira, None)}):
+            events = [
+                json.loads(line) for line in stream_sections(*open_section_stream("alice", None, "BOTH", None, None))
+            ]
+
+        self.assertEqual([event.get("index") for event in events], [1, 0, None])
+        self.assertEqual(events[-1], {"type": "done"})
+        sections = sorted(events[:-1], key=lambda event: event["index"])
+        self.assertEqual(
+            "\n\n".join(event["text"] for event in sections), views.chat_reply("alice", None, "BOTH", None, None)
+        )
+
+
+class BenchmarkSuiteTests(SimpleTestCase):
+    def test_load_test_messages_parse_to_their_intent(self):
+        for intent, message in MESSAGES.items():
+            with self.subTest(intent=intent):
+                self.assertEqual(extract_name_and_intent(message.format(NAMES[0]))[1], intent)
+
+    def test_nearest_rank_percentile(self):
+        ordered = list(range(1, 11))
+        self.assertEqual([percentile(ordered, fraction) for fraction in (0.5, 0.95, 0.99)], [5, 10, 10])
+
+    def test_stub_injects_server_errors(self):
+        stub = StubUpstream(latency=0, items=3, error_rate=1.0).start()
+        self.addCleanup(stub.stop)
+
+        resp = requests.get(f"{stub.base_url}/search/commits", params={"q": "author:alice"}, timeout=5)
+        health = requests.get(f"{stub.base_url}/health", timeout=5).json()
+
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(health, {"requests": 1, "errors": 1})
+
+
+class LeanProfileTests(SimpleTestCase):
+    def test_preloaded_wsgi_app_answers_without_aiohttp(self):
+        # A fresh interpreter, so modules imported by other tests don't count
+        script = """
+import sys
+from django.apps import apps
+from django.test import Client
+from team_activity_tracker.wsgi import application
+response = Client().get("/ping")
+print(response.status_code, "aiohttp" in sys.modules, apps.is_installed("django.contrib.admin"))
+"""
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "team_activity_tracker.settings_lean", "PRELOAD_APP": "1"}
+        result = subprocess.run(
+            [sys.executable, "-c", script], env=env, capture_output=True, text=True, timeout=60, check=True
+        )
+
+        self.assertEqual(result.stdout.split(), ["200", "False", "False"])
+
+
+class ItemDecoderTests(SimpleTestCase):
+    document = {
+        "total_count": 3,
+        "items": [{"sha": "a1", "message": 'fix \u00e9t\u00e9 "quotes" [x]'}, {"sha": "b2", "n": 10}, {"sha": "c3"}],
+        "incomplete_results": False,
+    }
+
+    def decode(self, body, chunk_size):
+        decoder = ItemDecoder("items", lambda item: item["sha"])
+        for start in range(0, len(body), chunk_size):
+            decoder.feed(body[start : start + chunk_size])
+        return decoder.close()
+
+    def test_items_are_recorded_whatever_the_chunking(self):
+        body = json.dumps(self.document, ensure_ascii=False, indent=1).encode()
+        expected = {"total_count": 3, "incomplete_results": False, "items": ["a1", "b2", "c3"]}
+
+        for chunk_size in (1, 2, 7, len(body)):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.decode(body, chunk_size), expected)
+
+    def test_truncated_document_is_rejected(self):
+        body = json.dumps(self.document).encode()
+        with self.assertRaises(ValueError):
+            self.decode(body[:-20], 16)
+
+
+class RollupTests(SimpleTestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+
+        def day(ago):
+            return self.today - timedelta(days=ago)
+
+        self.rollups = ActivityRollups(
+            {
+                "commits": {"alice": {day(0): 2, day(1): 1, day(5): 4}, "bob": {day(1): 3}},
+                "status:Done": {"alice": {day(0): 1}},
+            }
+        )
+
+    def test_window_totals_and_daily_series(self):
+        users = ["alice", "bob", "carol"]
+
+        self.assertEqual(self.rollups.totals("commits", users, 2), [3, 3, 0])
+        self.assertEqual(self.rollups.totals("commits", users), [7, 3, 0])
+        self.assertEqual(
+            self.rollups.daily("commits", users, 3),
+            [(self.today - timedelta(days=2), 0), (self.today - timedelta(days=1), 4), (self.today, 2)],
+        )
+        self.assertEqual(self.rollups.status_totals(users, 1), {"Done": 1})
+
+    def test_leaderboard_reply(self):
+        index = RosterIndex([Member(name, None, name) for name in ("alice", "bob", "carol")])
+        with mock.patch.object(roster, "_holder", mock.Mock(get=lambda: index)), mock.patch.object(
+            views, "get_rollups", lambda: self.rollups
+        ):
+            query, _ = views.parse_chat({"message": "who made the most commits this week"})
+            reply = views.analytics_reply(*query)
+
+        self.assertEqual(reply.splitlines()[1:], ["1. Alice: 7", "2. Bob: 3"])
+
+
+class WebhookSignatureTests(SimpleTestCase):
+    body = json.dumps({"ref": "refs/heads/main", "commits": []}).encode()
+
+    @staticmethod
+    def sign(secret, body):
+        return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    def test_verify_signature(self):
+        signature = self.sign("s3cret", self.body)
+
+        self.assertTrue(verify_signature("s3cret", self.body, signature))
+        self.assertFalse(verify_signature("s3cret", self.body + b" ", signature))
+        self.assertFalse(verify_signature("other", self.body, signature))
+        self.assertFalse(verify_signature("s3cret", self.body, signature[len("sha256=") :]))
+        # Without a configured secret every delivery is refused
+        self.assertFalse(verify_signature("", self.body, self.sign("", self.body)))
+
+    def test_only_signed_deliveries_are_queued(self):
+        submit = mock.Mock(return_value=True)
+        with mock.patch.object(views.GitHubWebhookView, "secret", "s3cret"), mock.patch.object(
+            views.webhook_queue, "submit", submit
+        ):
+            unsigned = self.client.post(
+                "/api/webhooks/github/", self.body, content_type="application/json", HTTP_X_GITHUB_EVENT="push"
+            )
+            signed = self.client.post(
+                "/api/webhooks/github/",
+                self.body,
+                content_type="application/json",
+                HTTP_X_GITHUB_EVENT="push",
+                HTTP_X_HUB_SIGNATURE_256=self.sign("s3cret", self.body),
+            )
+
+        self.assertEqual((unsigned.status_code, signed.status_code), (401, 202))
+        submit.assert_called_once_with("github", "push", json.loads(self.body))
+
+
+class SharedCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite3")
+
+    def cache(self, lock_timeout=30):
+        # One instance per simulated worker process, sharing the file
+        return SharedCache(self.path, "test", max_entries=8, ttl=60, max_bytes=1 << 20, lock_timeout=lock_timeout)
+
+    def test_one_worker_computes_while_the_others_wait(self):
+        leader, follower = self.cache(), self.cache()
+        started, release = threading.Event(), threading.Event()
+
+        def slow(entry):
+            started.set()
+            release.wait(5)
+            return "page", '"v1"'
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(leader.get_or_compute, "key", slow)
+            started.wait(5)
+            second = pool.submit(follower.get_or_compute, "key", lambda entry: self.fail("computed twice"))
+            while not follower.stats()["waits"]:
+                time.sleep(0.001)
+            release.set()
+
+        self.assertEqual((first.result(), second.result()), ("page", "page"))
+
+    def test_lock_left_by_a_crashed_worker_expires(self):
+        cache = self.cache(lock_timeout=0.05)
+        self.assertTrue(cache._try_lock(cache._key("key"), "crashed"))
+
+        self.assertEqual(cache.get_or_compute("key", lambda entry: ("page", None)), "page")
+        self.assertEqual(cache.stats()["waits"], 1)
+
+
+class RosterReloadTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.write(json.dumps({"members": [{"name": "Alice", "github_username": "alice-gh"}]}))
+        self.holder = _RosterHolder(self.path, reload_interval=0)
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Move the mtime on, so the change is seen within the same second
+        mtime = os.stat(self.path).st_mtime + 1
+        os.utime(self.path, (mtime, mtime))
+
+    def test_broken_file_keeps_the_last_good_roster(self):
+        self.assertEqual(self.holder.get().get("alice").github_username, "alice-gh")
+
+        self.write('{"members": [')
+        with self.assertLogs("chatbot.roster", "WARNING"):
+            index = self.holder.get()
+
+        self.assertEqual(index.get("alice").github_username, "alice-gh")
+
+
+class AsyncSessionTests(SimpleTestCase):
+    def test_sessions_close_with_their_loop(self):
+        async def open_session():
+            return transport.get_async_session("http://upstream.test/")
+
+        session = asyncio.run(open_session())
+
+        self.assertTrue(session.closed)
+        self.assertEqual(len(transport._async_sessions), 0)
+
+    def test_lifespan_shutdown_closes_sessions(self):
+        from team_activity_tracker.asgi import application  # pylint: disable=import-outside-toplevel
+
+        async def serve():
+            session = transport.get_async_session("http://upstream.test/")
+            messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+            sent = []
+
+            async def receive():
+                return next(messages)
+
+            async def send(message):
+                sent.append((message["type"], session.closed))
+
+            await application({"type": "lifespan"}, receive, send)
+            return sent
+
+        self.assertEqual(
+            asyncio.run(serve()), [("lifespan.startup.complete", False), ("lifespan.shutdown.complete", True)]
+        )
+
+
+class MetricsTests(SimpleTestCase):
+    def test_component_stats_are_rendered(self):
+        cache = TTLCache(max_entries=8, ttl=60)
+        cache.set("key", "value")
+        cache.record_hit()
+        with mock.patch.object(github_client, "search_cache", cache):
+            body = render_metrics()
+
+        self.assertIn('cache_entries{cache="github-search"} 1\n', body)
+        self.assertIn('cache_lookups_total{cache="github-search",result="hit"} 1\n', body)
+        self.assertIn("# TYPE upstream_scheduler_calls_total counter\n", body)
+        self.assertIn('singleflight_in_flight{upstream="jira"} 0\n', body)
+
+
+class StructuredReplyTests(SimpleTestCase):
+    cursor = Cursor("repositories", "alice", None, 0, 2)
+
+    def test_next_cursor_carries_the_upstream_position(self):
+        page = render_page(self.cursor, Page(["org/a", "org/b"], True, [None, 5, ["org/a", "org/b"]]))
+
+        self.assertEqual(
+            page["items"], [{"type": "repository", "name": "org/a"}, {"type": "repository", "name": "org/b"}]
+        )
+        cursor, error = parse_cursor({"cursor": page["next_cursor"]})
+        self.assertIsNone(error)
+        self.assertEqual(cursor, self.cursor._replace(offset=2, resume=[None, 5, ["org/a", "org/b"]]))
+
+    def test_last_page_has_no_cursor(self):
+        self.assertIsNone(render_page(self.cursor, Page(["org/a"], False))["next_cursor"])
+
+    def test_tampered_cursor_is_rejected(self):
+        token = self.cursor.encode()
+        _, error = parse_cursor({"cursor": token[:-1] + ("A" if token[-1] != "A" else "B")})
+
+        self.assertEqual(error, {"success": False, "message": "Invalid cursor"})
+
+    def test_upstream_outage_renders_an_empty_section(self):
+        section = render_item_section(self.cursor, GitHubServiceUnavailable("down"))
+
+        self.assertEqual(section["items"], [])
+        self.assertIsNone(section["next_cursor"])
+        self.assertEqual(section["source"], "repositories")
+
+
+class SchedulerTests(SimpleTestCase):
+    @staticmethod
+    def response(status, **headers):
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers.update(headers)
+        resp._content = b""
+        return resp
+
+    def scheduler(self, deadline=5):
+        return UpstreamScheduler("test", rate=0, burst=1, max_attempts=3, deadline=deadline, backoff_base=0.001)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        responses = iter([self.response(503), self.response(502), self.response(200)])
+        scheduler = self.scheduler()
+
+        self.assertEqual(scheduler.call(lambda timeout: next(responses)).status_code, 200)
+        self.assertEqual(scheduler.stats()["retries"], 2)
+
+    def test_retry_after_past_the_deadline_fails_at_once(self):
+        sent = []
+        scheduler = self.scheduler(deadline=1)
+
+        def send(timeout):
+            sent.append(timeout)
+            return self.response(429, **{"Retry-After": "30"})
+
+        started = time.monotonic()
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            scheduler.call(send)
+
+        self.assertEqual(raised.exception.response.status_code, 429)
+        self.assertEqual(len(sent), 1)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_exhausted_budget_blocks_later_calls_until_reset(self):
+        scheduler = self.scheduler()
+        reset = str(int(time.time()) + 60)
+        scheduler.call(lambda timeout: self.response(200, **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}))
+
+        with self.assertRaises(RateLimitExceeded):
+            scheduler.call(lambda timeout: self.fail("called while the budget is exhausted"))
+        self.assertEqual(scheduler.stats()["rejected"], 1)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def breaker(self, failure_threshold=1):
+        return CircuitBreaker(
+            "test-upstream", GitHubServiceUnavailable, "down", failure_threshold=failure_threshold, reset_timeout=0.05
+        )
+
+    @staticmethod
+    def upstream_error(status=None):
+        if status is None:
+            raise requests.exceptions.ConnectionError()
+        resp = requests.Response()
+        resp.status_code = status
+        raise requests.exceptions.HTTPError(response=resp)
+
+    def test_state_transitions(self):
+        breaker = self.breaker(failure_threshold=2)
+
+        # Client errors mean the upstream is up
+        for status in (None, 404, None):
+            with self.assertRaises((GitHubServiceUnavailable, requests.exceptions.HTTPError)):
+                breaker.call(self.upstream_error, status)
+        self.assertEqual(breaker.state, CLOSED)
+
+        with self.assertRaises(GitHubServiceUnavailable):
+            breaker.call(self.upstream_error, 503)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(GitHubServiceUnavailable):
+            breaker.call(lambda: self.fail("called while the circuit is open"))
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+        # A failed probe reopens the circuit at once, a successful one closes it
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(GitHubServiceUnavailable):
+            breaker.call(self.upstream_error)
+        self.assertEqual(breaker.state, OPEN)
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_cancelled_probe_frees_its_slot(self):
+        breaker = self.breaker()
+
+        async def failing():
+            raise requests.exceptions.ConnectionError()
+
+        async def scenario():
+            with self.assertRaises(GitHubServiceUnavailable):
+                await breaker.acall(failing)
+            await asyncio.sleep(0.06)
+
+            probe = asyncio.ensure_future(breaker.acall(asyncio.sleep, 10))
+            await asyncio.sleep(0)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+            return await breaker.acall(asyncio.sleep, 0, "ok")
+
+        self.assertEqual(asyncio.run(scenario()), "ok")
+        self.assertEqual(breaker.state, CLOSED)
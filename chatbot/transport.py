@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from chatbot.json_stream import ItemDecoder
+from chatbot.metrics import register_stats
+from team_activity_tracker.settings import UPSTREAM_ASYNC_POOL_SIZE, UPSTREAM_POOL_SIZE
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# Bytes read per step when decoding a streamed response body
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# aiohttp sessions are bound to the event loop that created them, and are
+# closed when it shuts down (see _close_sessions_on_shutdown)
+_async_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, aiohttp.ClientSession]]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_closers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = weakref.WeakKeyDictionary()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=UPSTREAM_POOL_SIZE,
+        pool_block=False,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the keep-alive session for the upstream host of ``url``.
+
+    One session (and one connection pool) is kept per scheme + host, so
+    GitHub and Jira each reuse their own TCP/TLS connections across calls
+    and across threads.
+    """
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _build_session()
+                _sessions[key] = session
+    return session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_session(url).get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_session(url).post(url, **kwargs)
+
+
+def get_async_session(url: str) -> "aiohttp.ClientSession":
+    """
+    Returns the keep-alive async session for the upstream host of ``url`` on
+    the running event loop.
+    """
+    # Imported on first use: it is heavy and sync (WSGI) workers never need it
+    import aiohttp  # pylint: disable=import-outside-toplevel
+
+    loop = asyncio.get_running_loop()
+    key = _host_key(url)
+    with _sessions_lock:
+        sessions = _async_sessions.get(loop)
+        if sessions is None:
+            sessions = _async_sessions[loop] = {}
+            _async_closers[loop] = loop.create_task(_close_sessions_on_shutdown())
+        session = sessions.get(key)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=UPSTREAM_ASYNC_POOL_SIZE),
+            )
+            sessions[key] = session
+    return session
+
+
+def _as_response(resp: "aiohttp.ClientResponse", body: Optional[bytes]) -> requests.Response:
+    response = requests.Response()
+    response.status_code = resp.status
+    response.reason = resp.reason
+    response.url = str(resp.url)
+    response.headers = requests.structures.CaseInsensitiveDict(resp.headers)
+    response.encoding = resp.charset
+    if body is None:
+        # Streamed: the body is read from ``raw`` by ``aread_json_items``
+        response.raw = resp
+    else:
+        response._content = body  # pylint: disable=protected-access
+    return response
+
+
+async def _arequest(method: str, url: str, timeout: float = None, stream: bool = False, **kwargs) -> requests.Response:
+    """
+    Sends a request over the async session and returns the fully read
+    response as a ``requests.Response``, so callers handle both transports
+    (``raise_for_status``, ``json``, ``headers``) the same way.
+
+    With ``stream``, the body of a 2xx response is left unread for
+    ``aread_json_items``, which also releases the connection.
+    """
+    import aiohttp  # pylint: disable=import-outside-toplevel
+
+    session = get_async_session(url)
+    client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout is not None else None
+
+    if not stream:
+        async with session.request(method, url, timeout=client_timeout, **kwargs) as resp:
+            return _as_response(resp, await resp.read())
+
+    resp = await session.request(method, url, timeout=client_timeout, **kwargs)
+    if 200 <= resp.status < 300:
+        return _as_response(resp, None)
+    try:
+        return _as_response(resp, await resp.read())
+    finally:
+        resp.release()
+
+
+async def aget(url: str, params: dict = None, **kwargs) -> requests.Response:
+    if params:
+        params = {key: str(value) for key, value in params.items()}
+    return await _arequest("GET", url, params=params, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> requests.Response:
+    return await _arequest("POST", url, **kwargs)
+
+
+def read_json_items(response: requests.Response, key: str, record: Callable[[Any], Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    Decodes a JSON object while its body streams in, keeping only
+    ``record(item)`` of each element of its ``key`` array (see
+    ``ItemDecoder``). Returns the object and the body size in bytes.
+    """
+    decoder = ItemDecoder(key, record)
+    with response:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            decoder.feed(chunk)
+    return decoder.close(), decoder.size
+
+
+async def aread_json_items(
+    response: requests.Response, key: str, record: Callable[[Any], Any]
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Async variant of ``read_json_items`` for responses from ``_arequest``.
+    """
+    decoder = ItemDecoder(key, record)
+    if response.raw is None:
+        decoder.feed(response.content)
+        return decoder.close(), decoder.size
+
+    try:
+        async for chunk in response.raw.content.iter_chunked(STREAM_CHUNK_SIZE):
+            decoder.feed(chunk)
+    finally:
+        response.raw.release()
+    return decoder.close(), decoder.size
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Returns connection pool counters per upstream host.
+
+    ``misses`` is the number of new connections opened and ``hits`` is the
+    number of requests that went out over an already open connection.
+    """
+    stats = {}
+    with _sessions_lock:
+        sessions = list(_sessions.items())
+
+    for key, session in sessions:
+        requests_made = 0
+        connections_opened = 0
+        # Both mounts share one adapter, count its pools once
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                requests_made += pool.num_requests
+                connections_opened += pool.num_connections
+
+        stats[key] = {
+            "requests": requests_made,
+            "hits": max(requests_made - connections_opened, 0),
+            "misses": connections_opened,
+        }
+
+    return stats
+
+
+register_stats("pool", get_pool_stats)
+
+
+def close_sessions() -> None:
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+async def aclose_sessions() -> None:
+    """
+    Closes the async sessions of the running event loop. Called on ASGI
+    lifespan shutdown; loops that end without one (such as the loop Django
+    runs each async view in under WSGI) close theirs on shutdown anyway.
+    """
+    loop = asyncio.get_running_loop()
+    with _sessions_lock:
+        sessions = list(_async_sessions.pop(loop, {}).values())
+        closer = _async_closers.pop(loop, None)
+    if closer is not None and closer is not asyncio.current_task():
+        closer.cancel()
+    for session in sessions:
+        await session.close()
+
+
+async def _close_sessions_on_shutdown() -> None:
+    # asyncio.run, which uvicorn and asgiref's per-call loops use, cancels
+    # the tasks still pending before it closes the loop, which ends up here
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await aclose_sessions()
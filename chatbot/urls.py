@@ -1,7 +1,29 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
-from .views import ChatbotView
+from .streaming import AsyncChatbotStreamView, ChatbotStreamView
+from .views import (
+    AsyncChatbotBatchView,
+    AsyncChatbotItemsView,
+    AsyncChatbotView,
+    ChatbotBatchView,
+    ChatbotItemsView,
+    ChatbotView,
+    CircuitBreakerView,
+    GitHubWebhookView,
+    JiraWebhookView,
+)
 
 urlpatterns = [
-    path("chat/", ChatbotView.as_view({"post": "post"})),
+    path("chat/", ChatbotView.as_view({"get": "get", "post": "post"})),
+    path("chat/stream/", ChatbotStreamView.as_view({"post": "post"})),
+    path("chat/batch/", ChatbotBatchView.as_view({"post": "post"})),
+    path("chat/items/", ChatbotItemsView.as_view({"post": "post"})),
+    path("chat/async/", csrf_exempt(AsyncChatbotView.as_view())),
+    path("chat/async/stream/", csrf_exempt(AsyncChatbotStreamView.as_view())),
+    path("chat/async/batch/", csrf_exempt(AsyncChatbotBatchView.as_view())),
+    path("chat/async/items/", csrf_exempt(AsyncChatbotItemsView.as_view())),
+    path("circuits/", CircuitBreakerView.as_view({"get": "get"})),
+    path("webhooks/github/", csrf_exempt(GitHubWebhookView.as_view())),
+    path("webhooks/jira/", csrf_exempt(JiraWebhookView.as_view())),
 ]
@@ -1,96 +1,914 @@
+import asyncio
+import hashlib
+import json
+import logging
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views import View
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_401_UNAUTHORIZED,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 from rest_framework.viewsets import ViewSet
 
+from team_activity_tracker.settings import (
+    ACTIVITY_CACHE_MAX_ENTRIES,
+    ACTIVITY_CACHE_MAX_STALE,
+    ACTIVITY_CACHE_TTL,
+    CHAT_CACHE_MAX_AGE,
+    GITHUB_BACKEND,
+    GITHUB_WEBHOOK_SECRET,
+    JIRA_WEBHOOK_SECRET,
+    REFRESH_AHEAD,
+    REFRESH_HALF_LIFE,
+    REFRESH_HOT_KEYS,
+    REFRESH_INTERVAL,
+    REFRESH_MAX_PENDING,
+    REFRESH_TRACKED_KEYS,
+    REFRESH_WORKERS,
+    TEAM_FETCH_CONCURRENCY,
+    WEBHOOK_QUEUE_SIZE,
+)
+
+from .activity_store import stored_activity
+from .analytics import METRICS, get_rollups, invalidate_rollups
+from .circuit_breaker import breaker_stats
+from .executor import run_parallel
 from .github_client import (
     GitHubServiceUnavailable,
+    aget_active_pull_requests,
+    aget_github_activities,
+    aget_github_activity,
+    aget_recent_commits,
+    aget_recent_repositories,
     get_active_pull_requests,
+    get_github_activities,
     get_github_activity,
     get_recent_commits,
     get_recent_repositories,
+    invalidate_user as invalidate_github_user,
 )
-from .jira_client import JiraServiceUnavailable, get_jira_activity
-from .query_parser import extract_name_and_intent
+from .jira_client import (
+    JiraServiceUnavailable,
+    aget_jira_activity,
+    get_jira_activity,
+    invalidate_user as invalidate_jira_user,
+)
+from .metrics import register_stats, stage
+from .query_parser import extract_metric, extract_name_and_intent, extract_team
+from .refresher import Refresher
 from .response_generator import (
+    account_not_linked_template,
     combined_template,
+    daily_activity_template,
     github_commits_template,
     github_prs_template,
     github_repos_template,
     github_template,
+    github_unavailable_template,
     jira_template,
+    leaderboard_template,
+    member_unavailable_template,
+    team_template,
+)
+from .roster import get_roster, resolve_member
+from .serializers import ChatbotBatchSerializer, ChatbotPagingSerializer, ChatbotSerializer
+from .structured import (
+    UPSTREAM_OUTAGES,
+    apage_reply,
+    first_pages,
+    is_structured,
+    page_calls,
+    page_reply,
+    parse_cursor,
+    render_structured,
 )
-from .serializers import ChatbotSerializer
+from .webhooks import GITHUB_HANDLERS, WebhookQueue, handle_github_event, handle_jira_event, verify_signature
+
+logger = logging.getLogger(__name__)
+
+# Intents answered from the activity rollups instead of per-user fetches
+ANALYTICS_INTENTS = ["LEADERBOARD", "DAILY_ACTIVITY"]
+
+SUPPORTED_INTENTS = [
+    "JIRA_ONLY",
+    "GITHUB_COMMITS",
+    "GITHUB_PRS",
+    "GITHUB_REPOS",
+    "GITHUB_ONLY",
+    "BOTH",
+    *ANALYTICS_INTENTS,
+]
+
+# Upstreams each intent reads, in reply order
+INTENT_SOURCES = {
+    "JIRA_ONLY": ["jira"],
+    "GITHUB_COMMITS": ["github"],
+    "GITHUB_PRS": ["github"],
+    "GITHUB_REPOS": ["github"],
+    "GITHUB_ONLY": ["github"],
+    "BOTH": ["jira", "github"],
+}
+
+# Places shown in a leaderboard, and the window of a per-day breakdown
+# asked for without one
+LEADERBOARD_SIZE = 10
+DAILY_DEFAULT_DAYS = 7
+
+# Field of a batched GraphQL activity that answers each GitHub intent
+GRAPHQL_BATCH_FIELDS = {"GITHUB_ONLY": "summary", "GITHUB_PRS": "pull_requests", "GITHUB_REPOS": "repositories"}
 
 
 class ChatbotView(ViewSet):
     def post(self, request):
-        serializer = ChatbotSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(
-                {
-                    "success": False,
-                    "message": "Invalid payload",
-                    "errors": serializer.errors,
-                },
-                status=HTTP_400_BAD_REQUEST,
-            )
+        with stage("parse"):
+            parsed, error = parse_paged_chat(request.data)
+        if error:
+            return Response(error, status=HTTP_400_BAD_REQUEST)
 
-        message = serializer.validated_data["message"]
-        name, intent, days = extract_name_and_intent(message)
+        query, page_size = parsed
+        reply = chat_reply(*query) if page_size is None else structured_reply(*query, page_size)
+        return Response({"success": True, "data": reply}, status=HTTP_200_OK)
+
+    def get(self, request):
+        """
+        Cacheable form of ``post`` taking the message as a query parameter.
+        """
+        with stage("parse"):
+            query, error = parse_chat(request.query_params)
+        if error:
+            return Response(error, status=HTTP_400_BAD_REQUEST)
+
+        return conditional_reply(request, query, chat_reply(*query), Response)
+
+
+class AsyncChatbotView(View):
+    """
+    Async chat endpoint for ASGI servers. Upstream calls are awaited on the
+    event loop instead of blocking a worker thread.
+    """
+
+    async def post(self, request):
+        with stage("parse"):
+            parsed, error = parse_paged_chat(json_body(request))
+        if error:
+            return JsonResponse(error, status=HTTP_400_BAD_REQUEST)
+
+        query, page_size = parsed
+        reply = await achat_reply(*query) if page_size is None else await astructured_reply(*query, page_size)
+        return JsonResponse({"success": True, "data": reply}, status=HTTP_200_OK)
+
+    async def get(self, request):
+        with stage("parse"):
+            query, error = parse_chat(request.GET)
+        if error:
+            return JsonResponse(error, status=HTTP_400_BAD_REQUEST)
+
+        return conditional_reply(request, query, await achat_reply(*query), JsonResponse)
+
+
+class ChatbotItemsView(ViewSet):
+    """
+    Returns the next page of an item list of a structured reply, from the
+    cursor the previous page ended with.
+    """
+
+    def post(self, request):
+        cursor, error = parse_cursor(request.data)
+        if error:
+            return Response(error, status=HTTP_400_BAD_REQUEST)
+
+        try:
+            page = page_reply(cursor)
+        except UPSTREAM_OUTAGES as e:
+            return Response({"success": False, "message": str(e)}, status=HTTP_503_SERVICE_UNAVAILABLE)
+
+        return Response({"success": True, "data": page}, status=HTTP_200_OK)
+
+
+class AsyncChatbotItemsView(View):
+    async def post(self, request):
+        cursor, error = parse_cursor(json_body(request))
+        if error:
+            return JsonResponse(error, status=HTTP_400_BAD_REQUEST)
+
+        try:
+            page = await apage_reply(cursor)
+        except UPSTREAM_OUTAGES as e:
+            return JsonResponse({"success": False, "message": str(e)}, status=HTTP_503_SERVICE_UNAVAILABLE)
+
+        return JsonResponse({"success": True, "data": page}, status=HTTP_200_OK)
+
+
+class ChatbotBatchView(ViewSet):
+    """
+    Answers a list of messages in one request. Messages that need the same
+    upstream data share one fetch, and every reply carries its own success
+    flag, in message order.
+    """
+
+    def post(self, request):
+        messages, error = parse_batch(request.data)
+        if error:
+            return Response(error, status=HTTP_400_BAD_REQUEST)
+
+        return Response({"success": True, "data": batch_replies(messages)}, status=HTTP_200_OK)
+
+
+class AsyncChatbotBatchView(View):
+    async def post(self, request):
+        messages, error = parse_batch(json_body(request))
+        if error:
+            return JsonResponse(error, status=HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({"success": True, "data": await abatch_replies(messages)}, status=HTTP_200_OK)
+
+
+class WebhookView(View):
+    """
+    Receives signed webhook deliveries and queues them on ``webhook_queue``
+    to update the activity store; the response doesn't wait for that.
+    """
+
+    source = ""
+    secret = ""
+    signature_header = ""
+
+    def event(self, request, payload):
+        """
+        Returns the arguments the queued handler needs, or None to ignore
+        the delivery.
+        """
+        raise NotImplementedError
+
+    def post(self, request):
+        if not verify_signature(self.secret, request.body, request.headers.get(self.signature_header)):
+            return JsonResponse({"success": False, "message": "Invalid signature"}, status=HTTP_401_UNAUTHORIZED)
+
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"success": False, "message": "Invalid payload"}, status=HTTP_400_BAD_REQUEST)
 
-        if not name:
-            return Response(
-                {"success": False, "message": "User not found"},
-                status=HTTP_400_BAD_REQUEST,
+        event = self.event(request, payload)
+        if event is not None and not webhook_queue.submit(self.source, *event):
+            response = JsonResponse(
+                {"success": False, "message": "Too many pending events"}, status=HTTP_503_SERVICE_UNAVAILABLE
             )
+            response["Retry-After"] = "5"
+            return response
+
+        return JsonResponse({"success": True}, status=HTTP_202_ACCEPTED)
+
+
+class GitHubWebhookView(WebhookView):
+    source = "github"
+    secret = GITHUB_WEBHOOK_SECRET
+    signature_header = "X-Hub-Signature-256"
+
+    def event(self, request, payload):
+        event = request.headers.get("X-GitHub-Event", "")
+        return (event, payload) if event in GITHUB_HANDLERS else None
+
+
+class JiraWebhookView(WebhookView):
+    source = "jira"
+    secret = JIRA_WEBHOOK_SECRET
+    signature_header = "X-Hub-Signature"
+
+    def event(self, request, payload):
+        return (payload,)
+
+
+class CircuitBreakerView(ViewSet):
+    """
+    Reports each upstream's circuit breaker state.
+    """
+
+    def get(self, request):
+        return Response({"success": True, "data": breaker_stats()}, status=HTTP_200_OK)
+
+
+def json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return {}
+
+
+def parse_chat(data):
+    """
+    Validates a chat payload and parses its message. Returns
+    ``((name, team, intent, days, metric), None)``, or ``(None, error)`` with
+    the body of a 400 response. ``metric`` is only set for analytics intents,
+    which cover the whole roster when the message names no one.
+    """
+    serializer = ChatbotSerializer(data=data)
+    if not serializer.is_valid():
+        return None, {
+            "success": False,
+            "message": "Invalid payload",
+            "errors": serializer.errors,
+        }
+
+    message = serializer.validated_data["message"]
+    name, intent, days = extract_name_and_intent(message)
+    team = None if name else extract_team(message)
+    metric = None
+
+    if intent in ANALYTICS_INTENTS:
+        metric = extract_metric(message)
+        if not name and not team:
+            team = get_roster().everyone()
+
+    if not name and not team:
+        return None, {"success": False, "message": "User not found"}
+
+    if intent not in SUPPORTED_INTENTS:
+        return None, {"success": False, "errors": ["Unsupported intent"]}
+
+    return (name, team, intent, days, metric), None
+
+
+def parse_paged_chat(data):
+    """
+    ``parse_chat`` plus the structured mode options. Returns
+    ``((query, page_size), None)``, where ``page_size`` is None unless a
+    structured reply was asked for, or ``(None, error)``.
+    """
+    query, error = parse_chat(data)
+    if error:
+        return None, error
+
+    serializer = ChatbotPagingSerializer(data=data)
+    if not serializer.is_valid():
+        return None, {
+            "success": False,
+            "message": "Invalid payload",
+            "errors": serializer.errors,
+        }
+
+    options = serializer.validated_data
+    return (query, options["page_size"] if options["structured"] else None), None
+
+
+# Sync and async variant of each kind of live fetch
+LIVE_FETCHES = {
+    "jira": (get_jira_activity, aget_jira_activity),
+    "commits": (get_recent_commits, aget_recent_commits),
+    "pull_requests": (get_active_pull_requests, aget_active_pull_requests),
+    "repositories": (get_recent_repositories, aget_recent_repositories),
+    "github_summary": (get_github_activity, aget_github_activity),
+}
+
+
+def fetch_keys(name, intent, days):
+    """
+    Returns the live fetches, keyed "jira"/"github", that answer ``intent``
+    as ``(kind, name, *args)`` tuples. Intents that need the same data get
+    the same key, e.g. BOTH and GITHUB_COMMITS share the commits fetch.
+    """
+    keys = {}
+
+    if intent in ["JIRA_ONLY", "BOTH"]:
+        keys["jira"] = ("jira", name, days)
+
+    if intent in ["GITHUB_COMMITS", "BOTH"]:
+        keys["github"] = ("commits", name, days)
+    elif intent == "GITHUB_PRS":
+        keys["github"] = ("pull_requests", name)
+    elif intent == "GITHUB_REPOS":
+        keys["github"] = ("repositories", name)
+    elif intent == "GITHUB_ONLY":
+        keys["github"] = ("github_summary", name)
+
+    # Nothing is fetched from an upstream the member has no account on
+    unlinked = unlinked_sources(name, intent)
+    return {source: key for source, key in keys.items() if source not in unlinked}
+
+
+def unlinked_sources(name, intent):
+    """
+    Returns the sources ``intent`` reads that ``name`` has no account on,
+    in reply order.
+    """
+    member = get_roster().get(name)
+    if member is None:
+        return []
+    return [source for source in INTENT_SOURCES.get(intent, []) if source not in member.linked_sources]
+
+
+def _load(key):
+    fetch, _ = LIVE_FETCHES[key[0]]
+    return fetch(*key[1:])
+
+
+def fetch_call(key, asynchronous=False):
+    """
+    Returns a zero-argument callable running the fetch ``key`` through the
+    refresher; with ``asynchronous`` it returns a coroutine.
+    """
+    if asynchronous:
+        _, afetch = LIVE_FETCHES[key[0]]
+        return partial(refresher.aget, key, partial(afetch, *key[1:]))
+    return partial(refresher.get, key)
+
+
+# Live fetches are served stale-while-revalidate, and the most asked about
+# ones are refreshed before they expire
+refresher = Refresher(
+    _load,
+    ttl=ACTIVITY_CACHE_TTL,
+    max_stale=ACTIVITY_CACHE_MAX_STALE,
+    max_entries=ACTIVITY_CACHE_MAX_ENTRIES,
+    tracked_keys=REFRESH_TRACKED_KEYS,
+    hot_keys=REFRESH_HOT_KEYS,
+    refresh_ahead=REFRESH_AHEAD,
+    interval=REFRESH_INTERVAL,
+    half_life=REFRESH_HALF_LIFE,
+    workers=REFRESH_WORKERS,
+    max_pending=REFRESH_MAX_PENDING,
+)
+register_stats("cache", lambda: {"answers": refresher.cache.stats()})
+register_stats("refresher", lambda: {"answers": refresher.stats()})
+
+
+def apply_webhook(source, *args):
+    if source == "github":
+        return handle_github_event(*args)
+    return handle_jira_event(*args)
+
+
+def invalidate_users(users):
+    """
+    Drops the cached live answers of ``users`` after a webhook changed their
+    activity, so their next question reads the updated store or refetches.
+    The answers are dropped in this process only (see ``Refresher``); the
+    upstream caches are shared, so other workers refetch fresh data once
+    their answers expire.
+    """
+    names = {user.lower() for user in users}
+    refresher.invalidate(lambda key: key[1].lower() in names)
+    invalidate_rollups()
+
+    for user in users:
+        member = get_roster().get(user)
+        if member is not None and member.github_username:
+            invalidate_github_user(member.github_username)
+        if member is not None and member.jira_account_id:
+            invalidate_jira_user(member.jira_account_id)
+
+
+# Webhook deliveries are applied in the background, bounded
+webhook_queue = WebhookQueue(apply_webhook, invalidate_users, size=WEBHOOK_QUEUE_SIZE)
+
+
+def activity_calls(name, intent, days, stored, asynchronous=False):
+    """
+    Returns zero-argument callables, keyed "jira"/"github", for the parts of
+    the answer that are not in ``stored`` and have to be fetched live. With
+    ``asynchronous`` the callables return coroutines.
+    """
+    return {
+        source: fetch_call(key, asynchronous)
+        for source, key in fetch_keys(name, intent, days).items()
+        if source not in stored
+    }
+
 
+def _outcomes(futures):
+    """
+    Unwraps completed futures into their result or raised exception.
+    """
+    return {key: future.exception() or future.result() for key, future in futures.items()}
+
+
+def merge_activity(stored, outcomes):
+    """
+    Combines stored parts with live outcomes (results or exceptions) into
+    ``(jira_data, github_data, github_unavailable)``. Upstream outages
+    degrade to empty data; any other exception is re-raised.
+    """
+    jira_data = outcomes.get("jira", stored.get("jira", []))
+    if isinstance(jira_data, JiraServiceUnavailable):
         jira_data = []
+    elif isinstance(jira_data, Exception):
+        raise jira_data
+
+    github_data = outcomes.get("github", stored.get("github", []))
+    github_unavailable = isinstance(github_data, GitHubServiceUnavailable)
+    if github_unavailable:
         github_data = []
+    elif isinstance(github_data, Exception):
+        raise github_data
 
-        if intent in ["JIRA_ONLY", "BOTH"]:
-            try:
-                jira_data = get_jira_activity(name, days)
-            except JiraServiceUnavailable:
-                jira_data = []
+    return jira_data, github_data, github_unavailable
 
-        try:
-            if intent == "JIRA_ONLY":
-                response = jira_template(name, jira_data)
 
-            elif intent == "GITHUB_COMMITS":
-                github_data = get_recent_commits(name, days)
-                response = github_commits_template(name, github_data)
+def chat_reply(name, team, intent, days, metric):
+    if intent in ANALYTICS_INTENTS:
+        return analytics_reply(name, team, intent, days, metric)
+
+    if team:
+        return team_reply(team, intent, days)
+
+    # Sources recently synced into the local store are answered from it
+    with stage("store"):
+        stored = stored_activity(name, intent, days)
+
+    # Jira and GitHub are fetched concurrently on the shared executor
+    with stage("fetch"):
+        results = run_parallel(activity_calls(name, intent, days, stored))
+
+    with stage("render"):
+        jira_data, github_data, github_unavailable = merge_activity(stored, _outcomes(results))
+        return render_reply(name, intent, jira_data, github_data, github_unavailable)
+
+
+async def achat_reply(name, team, intent, days, metric):
+    if intent in ANALYTICS_INTENTS:
+        return await sync_to_async(analytics_reply)(name, team, intent, days, metric)
+
+    if team:
+        return await ateam_reply(team, intent, days)
+
+    with stage("store"):
+        stored = await sync_to_async(stored_activity)(name, intent, days)
+
+    with stage("fetch"):
+        calls = activity_calls(name, intent, days, stored, asynchronous=True)
+        results = await asyncio.gather(*(call() for call in calls.values()), return_exceptions=True)
+
+    with stage("render"):
+        jira_data, github_data, github_unavailable = merge_activity(stored, dict(zip(calls, results)))
+        return render_reply(name, intent, jira_data, github_data, github_unavailable)
+
+
+def reply_etag(query, reply):
+    """
+    Strong ETag of a reply, keyed on the canonical query rather than the
+    message wording: any phrasing of the same question over the same data
+    gets the same tag.
+    """
+    name, team, intent, days, metric = query
+    canonical = json.dumps([name or team.display_name, intent, days, metric, reply])
+    return f'"{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"'
+
+
+def conditional_reply(request, query, reply, response_class):
+    """
+    Wraps a GET reply with its ETag and cache headers, answering 304 Not
+    Modified when the client already holds it.
+    """
+    etag = reply_etag(query, reply)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = response_class({"success": True, "data": reply}, status=HTTP_200_OK)
+
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=CHAT_CACHE_MAX_AGE)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def analytics_reply(name, team, intent, days, metric):
+    """
+    Answers a leaderboard or per-day question for a member or a team from
+    the activity rollups.
+    """
+    names = [name] if name else member_names(team)
+    users = [member.lower() for member in names]
+    scope = name or team.display_name
+
+    with stage("store"):
+        rollups = get_rollups()
+
+    with stage("render"):
+        if intent == "LEADERBOARD":
+            counts = rollups.totals(metric, users, days)
+            ranking = sorted(((member, count) for member, count in zip(names, counts) if count), key=lambda r: -r[1])
+            return leaderboard_template(scope, METRICS[metric], days, ranking[:LEADERBOARD_SIZE])
+
+        days = days or DAILY_DEFAULT_DAYS
+        statuses = rollups.status_totals(users, days) if metric == "issues_updated" else None
+        return daily_activity_template(scope, METRICS[metric], days, rollups.daily(metric, users, days), statuses)
+
 
-            elif intent == "GITHUB_PRS":
-                github_data = get_active_pull_requests(name)
-                response = github_prs_template(name, github_data)
+def team_reply(team, intent, days):
+    names = member_names(team)
+    with stage("store"):
+        stored = {name: stored_activity(name, intent, days) for name in names}
 
-            elif intent == "GITHUB_REPOS":
-                github_data = get_recent_repositories(name)
-                response = github_repos_template(name, github_data)
+    # Every member's fetches share one bounded fan-out
+    with stage("fetch"):
+        results = run_parallel(team_calls(names, intent, days, stored), max_concurrency=TEAM_FETCH_CONCURRENCY)
 
-            elif intent == "GITHUB_ONLY":
-                github_data = get_github_activity(name)
-                response = github_template(name, github_data)
+    with stage("render"):
+        outcomes = group_team_outcomes(names, intent, _outcomes(results))
+        return render_team_reply(team, intent, stored, outcomes)
 
-            elif intent == "BOTH":
-                github_data = get_recent_commits(name, days)
-                response = combined_template(name, jira_data, github_data)
 
+async def ateam_reply(team, intent, days):
+    names = member_names(team)
+    with stage("store"):
+        stored = await sync_to_async(lambda: {name: stored_activity(name, intent, days) for name in names})()
+
+    calls = team_calls(names, intent, days, stored, asynchronous=True)
+    slots = asyncio.Semaphore(TEAM_FETCH_CONCURRENCY)
+
+    async def bounded(call):
+        async with slots:
+            return await call()
+
+    with stage("fetch"):
+        results = await asyncio.gather(*(bounded(call) for call in calls.values()), return_exceptions=True)
+
+    with stage("render"):
+        outcomes = group_team_outcomes(names, intent, dict(zip(calls, results)))
+        return render_team_reply(team, intent, stored, outcomes)
+
+
+def team_calls(names, intent, days, stored, asynchronous=False):
+    """
+    Returns the live fetches of a team query keyed by ``(name, source)``.
+    With the GraphQL backend, the GitHub parts it can answer are fetched by
+    one call keyed ``(names, "github")`` instead of one call per member.
+    """
+    batched = GITHUB_BACKEND == "graphql" and intent in GRAPHQL_BATCH_FIELDS
+    calls = {}
+    batch = []
+
+    for name in names:
+        for source, call in activity_calls(name, intent, days, stored[name], asynchronous).items():
+            if batched and source == "github":
+                batch.append(name)
             else:
-                return Response(
-                    {"success": False, "errors": ["Unsupported intent"]},
-                    status=HTTP_400_BAD_REQUEST,
-                )
-
-        except GitHubServiceUnavailable:
-            # GitHub failed after retries → degrade gracefully
-            if intent in ["GITHUB_ONLY", "GITHUB_COMMITS", "GITHUB_PRS", "GITHUB_REPOS"]:
-                response = github_template(name, {})
-            elif intent == "BOTH":
-                response = combined_template(name, jira_data, [])
-
-        return Response(
-            {"success": True, "data": response},
-            status=HTTP_200_OK,
+                calls[(name, source)] = call
+
+    if batch:
+        fetch = aget_github_activities if asynchronous else get_github_activities
+        calls[(tuple(batch), "github")] = partial(fetch, batch)
+
+    return calls
+
+
+def group_team_outcomes(names, intent, outcomes):
+    """
+    Regroups ``team_calls`` outcomes per member, splitting batched GitHub
+    results into the shape the per-member call would have returned.
+    """
+    grouped = {name: {} for name in names}
+
+    for (key, source), outcome in outcomes.items():
+        if not isinstance(key, tuple):
+            grouped[key][source] = outcome
+            continue
+
+        for name in key:
+            activity = outcome if isinstance(outcome, Exception) else outcome[name]
+            grouped[name][source] = (
+                activity if isinstance(activity, Exception) else activity[GRAPHQL_BATCH_FIELDS[intent]]
+            )
+
+    return grouped
+
+
+def member_names(team):
+    return [resolve_member(name).display_name for name in team.members]
+
+
+def render_team_reply(team, intent, stored, outcomes):
+    """
+    Renders one section per member. A member whose fetch or rendering fails
+    gets a short notice instead of failing the whole team reply.
+    """
+    replies = [
+        render_member_reply(name, intent, stored[name], member_outcomes) for name, member_outcomes in outcomes.items()
+    ]
+    return team_template(team.display_name, replies)
+
+
+def render_member_reply(name, intent, stored, outcomes):
+    try:
+        return render_reply(name, intent, *merge_activity(stored, outcomes))
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Team query failed for %s", name)
+        return member_unavailable_template(name)
+
+
+def render_reply(name, intent, jira_data, github_data, github_unavailable=False):
+    unlinked = unlinked_sources(name, intent)
+    if unlinked:
+        # Sources the member has no account on get a notice instead
+        return "\n\n".join(
+            render_source_section(name, source, jira_data, github_data, github_unavailable, unlinked)
+            for source in INTENT_SOURCES[intent]
         )
+
+    if github_unavailable:
+        # GitHub failed after retries or its circuit is open → degrade gracefully
+        if intent == "BOTH":
+            return jira_template(name, jira_data) + "\n\n" + github_unavailable_template(name)
+        return github_unavailable_template(name)
+
+    if intent == "JIRA_ONLY":
+        return jira_template(name, jira_data)
+
+    if intent == "GITHUB_COMMITS":
+        return github_commits_template(name, github_data)
+
+    if intent == "GITHUB_PRS":
+        return github_prs_template(name, github_data)
+
+    if intent == "GITHUB_REPOS":
+        return github_repos_template(name, github_data)
+
+    if intent == "GITHUB_ONLY":
+        return github_template(name, github_data)
+
+    return combined_template(name, jira_data, github_data)
+
+
+def render_source_section(name, source, jira_data, github_data, github_unavailable, unlinked):
+    """
+    Renders one source's part of a BOTH reply, or the notice that the
+    member has no account there.
+    """
+    if source in unlinked:
+        return account_not_linked_template(name, source)
+    if source == "jira":
+        return jira_template(name, jira_data)
+    if github_unavailable:
+        return github_unavailable_template(name)
+    return github_commits_template(name, github_data)
+
+
+def parse_batch(data):
+    """
+    Validates a batch payload. Returns ``(messages, None)``, or
+    ``(None, error)`` with the body of a 400 response.
+    """
+    serializer = ChatbotBatchSerializer(data=data)
+    if not serializer.is_valid():
+        return None, {
+            "success": False,
+            "message": "Invalid payload",
+            "errors": serializer.errors,
+        }
+    return serializer.validated_data["messages"], None
+
+
+def plan_batch(messages):
+    """
+    Parses every message and works out the live fetches the whole batch
+    needs. Returns ``(items, keys)``: per message either its finished reply
+    body (a rejection, or an analytics answer, which needs no fetches), or
+    ``(name, team, intent, stored, fetches)`` where ``stored`` and ``fetches``
+    map each member to its stored parts and its ``{source: fetch key}``;
+    ``keys`` lists each fetch once.
+    """
+    items = []
+    keys = {}
+    stored_by_query = {}
+
+    for message in messages:
+        query, error = parse_chat({"message": message})
+        if error:
+            items.append(error)
+            continue
+
+        name, team, intent, days, _ = query
+        if intent in ANALYTICS_INTENTS:
+            items.append(batch_analytics_reply(query))
+            continue
+
+        stored, fetches = {}, {}
+        for member in member_names(team) if team else [name]:
+            if (member, intent, days) not in stored_by_query:
+                stored_by_query[(member, intent, days)] = stored_activity(member, intent, days)
+            stored[member] = stored_by_query[(member, intent, days)]
+            fetches[member] = {
+                source: key for source, key in fetch_keys(member, intent, days).items() if source not in stored[member]
+            }
+            keys.update(dict.fromkeys(fetches[member].values()))
+
+        items.append((name, team, intent, stored, fetches))
+
+    return items, list(keys)
+
+
+def batch_analytics_reply(query):
+    """
+    Answers an analytics message of a batch; a failure fails that message
+    only.
+    """
+    try:
+        return {"success": True, "data": analytics_reply(*query)}
+    except Exception:  # pylint: disable=broad-except
+        name, team = query[:2]
+        logger.exception("Batch chat failed for %s", name or team.display_name)
+        return {"success": False, "message": "Something went wrong"}
+
+
+def render_batch(items, outcomes):
+    """
+    Renders the replies of ``plan_batch`` items from the fetch outcomes
+    (results or exceptions) keyed by fetch key.
+    """
+    replies = []
+
+    for item in items:
+        if isinstance(item, dict):
+            replies.append(item)
+            continue
+
+        name, team, intent, stored, fetches = item
+        member_outcomes = {
+            member: {source: outcomes[key] for source, key in member_fetches.items()}
+            for member, member_fetches in fetches.items()
+        }
+        try:
+            if team:
+                reply = render_team_reply(team, intent, stored, member_outcomes)
+            else:
+                reply = render_reply(name, intent, *merge_activity(stored[name], member_outcomes[name]))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Batch chat failed for %s", name or team.display_name)
+            replies.append({"success": False, "message": "Something went wrong"})
+            continue
+
+        replies.append({"success": True, "data": reply})
+
+    return replies
+
+
+def batch_replies(messages):
+    with stage("plan"):
+        items, keys = plan_batch(messages)
+
+    with stage("fetch"):
+        results = run_parallel({key: fetch_call(key) for key in keys}, max_concurrency=TEAM_FETCH_CONCURRENCY)
+
+    with stage("render"):
+        return render_batch(items, _outcomes(results))
+
+
+async def abatch_replies(messages):
+    with stage("plan"):
+        items, keys = await sync_to_async(plan_batch)(messages)
+
+    slots = asyncio.Semaphore(TEAM_FETCH_CONCURRENCY)
+
+    async def bounded(key):
+        async with slots:
+            return await fetch_call(key, asynchronous=True)()
+
+    with stage("fetch"):
+        results = await asyncio.gather(*(bounded(key) for key in keys), return_exceptions=True)
+
+    with stage("render"):
+        return render_batch(items, dict(zip(keys, results)))
+
+
+# Structured replies (see chatbot/structured.py)
+
+
+def structured_reply(name, team, intent, days, metric, page_size):
+    """
+    Answers with the first ``page_size`` typed items of each item list.
+    Questions without item lists (team, summary and analytics ones) get
+    their text reply and no sections.
+    """
+    if not is_structured(team, intent):
+        return {"intent": intent, "text": chat_reply(name, team, intent, days, metric), "sections": []}
+
+    with stage("store"):
+        cursors, stored = first_pages(name, intent, days, page_size)
+
+    with stage("fetch"):
+        results = run_parallel(page_calls(cursors, stored))
+
+    with stage("render"):
+        return render_structured(intent, cursors, {**stored, **_outcomes(results)})
+
+
+async def astructured_reply(name, team, intent, days, metric, page_size):
+    if not is_structured(team, intent):
+        return {"intent": intent, "text": await achat_reply(name, team, intent, days, metric), "sections": []}
+
+    with stage("store"):
+        cursors, stored = await sync_to_async(first_pages)(name, intent, days, page_size)
+
+    with stage("fetch"):
+        calls = page_calls(cursors, stored, asynchronous=True)
+        results = await asyncio.gather(*(call() for call in calls.values()), return_exceptions=True)
+
+    with stage("render"):
+        return render_structured(intent, cursors, {**stored, **dict(zip(calls, results))})
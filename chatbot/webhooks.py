@@ -0,0 +1,184 @@
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import close_old_connections
+
+from chatbot.activity_store import delete_jira_issue, push_commits, push_jira_issue, push_pull_requests
+from chatbot.metrics import WEBHOOK_EVENTS
+from chatbot.records import CommitRecord, JiraIssueRecord, PullRequestRecord
+from chatbot.roster import get_roster
+
+logger = logging.getLogger(__name__)
+
+# Jira events that remove an issue; the others create or update one
+JIRA_DELETE_EVENTS = ("jira:issue_deleted",)
+JIRA_UPSERT_EVENTS = ("jira:issue_created", "jira:issue_updated")
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Checks a ``sha256=<hex>`` HMAC header, the format GitHub
+    (``X-Hub-Signature-256``) and Jira (``X-Hub-Signature``) both use.
+    """
+    if not secret or not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256=") :])
+
+
+# Payload handling. Each handler applies an event to the activity store and
+# returns the roster names whose activity changed.
+
+
+def _github_members(username: Optional[str]) -> List[str]:
+    return [member.name for member in get_roster().by_github_username(username)] if username else []
+
+
+def handle_push(payload: Dict[str, Any]) -> List[str]:
+    repository = payload["repository"]
+    # Commit search only covers default branches, so other pushes would
+    # make the store disagree with a live answer
+    if payload.get("ref") != f"refs/heads/{repository.get('default_branch')}":
+        return []
+
+    by_user = defaultdict(list)
+    for commit in payload.get("commits", []):
+        for user in _github_members(commit.get("author", {}).get("username")):
+            by_user[user].append(
+                CommitRecord(
+                    sha=commit["id"],
+                    repo=repository["full_name"],
+                    message=commit["message"],
+                    date=commit["timestamp"],
+                )
+            )
+
+    for user, commits in by_user.items():
+        push_commits(user, commits)
+    return list(by_user)
+
+
+def handle_pull_request(payload: Dict[str, Any]) -> List[str]:
+    pr = payload["pull_request"]
+    users = _github_members(pr["user"]["login"])
+    record = PullRequestRecord(
+        title=pr["title"],
+        repo=payload["repository"]["full_name"],
+        url=pr["html_url"],
+        state=pr["state"],
+        created_at=pr["created_at"],
+        updated_at=pr["updated_at"],
+        merged_at=pr.get("merged_at"),
+    )
+    for user in users:
+        push_pull_requests(user, [record])
+    return users
+
+
+GITHUB_HANDLERS = {"push": handle_push, "pull_request": handle_pull_request}
+
+
+def handle_github_event(event: str, payload: Dict[str, Any]) -> List[str]:
+    handler = GITHUB_HANDLERS.get(event)
+    return handler(payload) if handler else []
+
+
+def handle_jira_event(payload: Dict[str, Any]) -> List[str]:
+    event = payload.get("webhookEvent")
+    issue = payload.get("issue")
+    if not issue:
+        return []
+
+    if event in JIRA_DELETE_EVENTS:
+        return delete_jira_issue(issue["key"])
+
+    if event not in JIRA_UPSERT_EVENTS:
+        return []
+
+    fields = issue["fields"]
+    assignee = (fields.get("assignee") or {}).get("accountId")
+    users = [member.name for member in get_roster().by_jira_account_id(assignee)] if assignee else []
+    record = JiraIssueRecord(
+        key=issue["key"],
+        summary=fields["summary"],
+        status=fields["status"]["name"],
+        updated=fields["updated"],
+    )
+    return push_jira_issue(users, record)
+
+
+class WebhookQueue:
+    """
+    Bounded queue of webhook events applied by one background thread, so a
+    burst of deliveries is acknowledged at once instead of holding request
+    workers on database writes. ``submit`` refuses events once ``size`` are
+    waiting; senders retry those later.
+
+    ``handle(source, *args)`` applies an event and returns the users whose
+    activity changed; ``on_change(users)`` is then called to invalidate
+    whatever was cached for them.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[..., List[str]],
+        on_change: Callable[[List[str]], None],
+        size: int,
+    ):
+        self.handle = handle
+        self.on_change = on_change
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, size))
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def _start(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="webhooks", daemon=True)
+            self._worker.start()
+
+    def submit(self, source: str, *args: Any) -> bool:
+        """
+        Queues an event. Returns False if the queue is full.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((source, args))
+        except queue.Full:
+            WEBHOOK_EVENTS.inc(source, "rejected")
+            return False
+        WEBHOOK_EVENTS.inc(source, "queued")
+        return True
+
+    def _run(self) -> None:
+        while True:
+            source, args = self._queue.get()
+            try:
+                users = self.handle(source, *args)
+                if users:
+                    self.on_change(users)
+            except Exception:
+                logger.exception("Applying a %s webhook failed", source)
+                WEBHOOK_EVENTS.inc(source, "failed")
+            else:
+                WEBHOOK_EVENTS.inc(source, "applied")
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """
+        Blocks until every queued event has been applied.
+        """
+        self._queue.join()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
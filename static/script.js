@@ -49,6 +49,101 @@ function showWelcomeMessage() {
   }
 }
 
+function showError(element, data) {
+  updateMessage(
+    element,
+    data.message ||
+    (data.errors && data.errors.join(", ")) ||
+    "Something went wrong"
+  );
+}
+
+// One line per item of a structured section, as in the text replies
+function itemText(item) {
+  switch (item.type) {
+    case "jira_issue":
+      return `- ${item.key} (${item.status}): ${item.summary}`;
+    case "commit":
+      return `- ${item.repo}: ${item.message}`;
+    case "pull_request":
+      return `- ${item.repo}: ${item.title}`;
+    default:
+      return `- ${item.name}`;
+  }
+}
+
+// Fetches the next page of a section's items each time it is clicked
+function loadMoreButton(list, cursor) {
+  const button = document.createElement("button");
+  button.className = "load-more";
+  button.innerText = "Load more";
+
+  button.addEventListener("click", () => {
+    button.disabled = true;
+    fetch("/api/chat/items/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ cursor })
+    })
+      .then(res => res.json())
+      .then(data => {
+        if (!data.success) {
+          button.innerText = `${data.message || "Something went wrong"}. Retry`;
+          button.disabled = false;
+          return;
+        }
+        const lines = data.data.items.map(itemText);
+        if (lines.length) list.innerText += "\n" + lines.join("\n");
+        cursor = data.data.next_cursor;
+        if (cursor) {
+          button.innerText = "Load more";
+          button.disabled = false;
+        } else {
+          button.remove();
+        }
+      })
+      .catch(() => {
+        button.innerText = "Server error. Retry";
+        button.disabled = false;
+      });
+  });
+  return button;
+}
+
+// A section of a streamed reply; structured ones list their items and can
+// load more of them
+function sectionElement(event) {
+  const section = document.createElement("div");
+  section.className = "section";
+
+  const list = document.createElement("div");
+  list.innerText = [event.text, ...(event.items || []).map(itemText)].join("\n");
+  section.appendChild(list);
+
+  if (event.next_cursor) {
+    section.appendChild(loadMoreButton(list, event.next_cursor));
+  }
+  return section;
+}
+
+// Reads an NDJSON stream line by line, calling onEvent for each parsed line
+async function readEvents(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
 function send() {
   const message = input.value.trim();
   if (!message) return;
@@ -59,22 +154,38 @@ function send() {
   const loadingMsg = addMessage("", "bot", true);
   setLoading(true);
 
-  fetch("/api/chat/", {
+  // Sections arrive as each upstream answers; keep them in reply order
+  const sections = [];
+  const render = () => {
+    loadingMsg.className = loadingMsg.className.replace(" loading", "");
+    loadingMsg.replaceChildren(...sections.filter(Boolean));
+    chat.scrollTop = chat.scrollHeight;
+  };
+
+  // Item lists come a page at a time, with a cursor for the next
+  fetch("/api/chat/stream/", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ message })
+    body: JSON.stringify({ message, structured: true })
   })
-    .then(res => res.json())
-    .then(data => {
-      if (data.success) {
-        updateMessage(loadingMsg, data.data);
-      } else {
-        updateMessage(
-          loadingMsg,
-          data.message ||
-          (data.errors && data.errors.join(", ")) ||
-          "Something went wrong"
-        );
+    .then(async res => {
+      if (!res.ok) {
+        showError(loadingMsg, await res.json());
+        return;
+      }
+
+      await readEvents(res, event => {
+        if (event.type === "section") {
+          sections[event.index] = sectionElement(event);
+          render();
+        } else if (event.type === "error") {
+          sections.push(sectionElement({ text: event.message }));
+          render();
+        }
+      });
+
+      if (sections.length === 0) {
+        showError(loadingMsg, {});
       }
     })
     .catch(() => {
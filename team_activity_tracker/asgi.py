@@ -11,6 +11,33 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from chatbot.transport import aclose_sessions
+from team_activity_tracker.preload import preload_app
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "team_activity_tracker.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+preload_app()
+
+
+async def lifespan(receive, send):
+    """
+    Handles the ASGI lifespan protocol, which Django does not: upstream
+    sessions are closed on shutdown instead of being left to the collector.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_sessions()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,74 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from chatbot.metrics import HTTP_REQUEST_SECONDS, request_timings
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise middleware that also runs natively under ASGI.
+
+    The stock middleware is sync-only, which makes Django run every request
+    of an ASGI server through a single sync thread and serialises the async
+    chat view behind it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """
+    Times every request: adds a ``Server-Timing`` header listing the stages
+    recorded while building the response (parse, fetch, upstream calls, ...)
+    and records the total per route.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_timings() as timings:
+            response = self.get_response(request)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        with request_timings() as timings:
+            response = await self.get_response(request)
+        return self._finish(request, response, timings)
+
+    @staticmethod
+    def _finish(request, response, timings):
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - timings.start, route, request.method)
+        response["Server-Timing"] = timings.header()
+        return response
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.urls import get_resolver
+
+
+def preload_app():
+    """
+    Does the imports and setup that otherwise happen on the first request:
+    the URLconf pulls in the views, the upstream clients and their
+    dependencies.
+    """
+    if not settings.PRELOAD_APP:
+        return
+
+    get_resolver().url_patterns  # pylint: disable=expression-not-assigned
+
+    from chatbot.roster import get_roster  # pylint: disable=import-outside-toplevel
+
+    get_roster()
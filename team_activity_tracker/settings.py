@@ -50,8 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "team_activity_tracker.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "team_activity_tracker.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -147,3 +148,119 @@ JIRA_EMAIL = os.getenv("JIRA_EMAIL")
 JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
 JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
 GITHUB_BASE_URL = os.getenv("GITHUB_BASE_URL")
+
+# Max keep-alive connections per upstream host and process; match the
+# number of gunicorn threads per worker.
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "10"))
+
+GITHUB_CACHE_TTL = float(os.getenv("GITHUB_CACHE_TTL", "60"))
+GITHUB_CACHE_MAX_ENTRIES = int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", "1024"))
+JIRA_CACHE_TTL = float(os.getenv("JIRA_CACHE_TTL", "60"))
+JIRA_CACHE_MAX_ENTRIES = int(os.getenv("JIRA_CACHE_MAX_ENTRIES", "1024"))
+
+# Where the GitHub and Jira response caches live: "shared" keeps them in one
+# SQLite file (UPSTREAM_CACHE_PATH) used by every worker process on the
+# host, holding at most UPSTREAM_CACHE_MAX_BYTES of values per cache;
+# "local" keeps them in each process's memory.
+UPSTREAM_CACHE_BACKEND = os.getenv("UPSTREAM_CACHE_BACKEND", "shared")
+UPSTREAM_CACHE_PATH = os.getenv("UPSTREAM_CACHE_PATH", str(BASE_DIR / "upstream_cache.sqlite3"))
+UPSTREAM_CACHE_MAX_BYTES = int(os.getenv("UPSTREAM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Threads shared by all requests of a worker process for upstream fetches
+UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "16"))
+
+# Max concurrent connections per upstream host for the async (ASGI) clients
+UPSTREAM_ASYNC_POOL_SIZE = int(os.getenv("UPSTREAM_ASYNC_POOL_SIZE", "100"))
+
+# Seconds a synced user/source stays fresh enough to answer chats from the
+# local activity store (see `manage.py sync_activity`); 0 always goes live.
+ACTIVITY_STORE_MAX_AGE = int(os.getenv("ACTIVITY_STORE_MAX_AGE", "900"))
+
+# JSON file listing team members, their aliases and upstream accounts; when
+# unset the roster comes from chatbot/constants.py. The file is re-read when
+# its mtime changes, checked at most every ROSTER_RELOAD_INTERVAL seconds.
+ROSTER_FILE = os.getenv("ROSTER_FILE")
+ROSTER_RELOAD_INTERVAL = float(os.getenv("ROSTER_RELOAD_INTERVAL", "5"))
+
+# Max upstream fetches in flight at once for a single team or batch query
+TEAM_FETCH_CONCURRENCY = int(os.getenv("TEAM_FETCH_CONCURRENCY", "8"))
+
+# "rest" (default) or "graphql". The GraphQL backend answers activity
+# summaries, open pull requests and repositories for many users in one
+# request; commit lists always come from REST search. GraphQL needs a token.
+GITHUB_BACKEND = os.getenv("GITHUB_BACKEND", "rest")
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL") or f"{GITHUB_BASE_URL}/graphql"
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_GRAPHQL_BATCH_SIZE = int(os.getenv("GITHUB_GRAPHQL_BATCH_SIZE", "20"))
+
+# Client-side pacing per upstream: a token bucket refilled at this many
+# requests per second, holding up to UPSTREAM_BURST. Budgets announced in
+# X-RateLimit-* and Retry-After headers are honoured on top of it.
+GITHUB_REQUESTS_PER_SECOND = float(os.getenv("GITHUB_REQUESTS_PER_SECOND", "10"))
+JIRA_REQUESTS_PER_SECOND = float(os.getenv("JIRA_REQUESTS_PER_SECOND", "10"))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "20"))
+
+# Attempts per upstream call (5xx, 429 and rate limit 403 responses are
+# retried with jittered exponential backoff) and the seconds a call may
+# take overall, waits included.
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+UPSTREAM_DEADLINE = float(os.getenv("UPSTREAM_DEADLINE", "20"))
+
+# Consecutive upstream failures (5xx after retries, connection errors,
+# timeouts) that open an upstream's circuit; while open, calls fail fast
+# for CIRCUIT_RESET_TIMEOUT seconds before a single trial request is let
+# through.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Live Jira/GitHub answers per (user, intent, window) are reused for
+# ACTIVITY_CACHE_TTL seconds, then served stale for up to
+# ACTIVITY_CACHE_MAX_STALE more while they are refreshed in the background.
+# The cache is per process: a webhook drops the answers of the worker that
+# received it, others keep theirs until they expire. 0 disables the cache.
+ACTIVITY_CACHE_TTL = float(os.getenv("ACTIVITY_CACHE_TTL", "60"))
+ACTIVITY_CACHE_MAX_STALE = float(os.getenv("ACTIVITY_CACHE_MAX_STALE", "600"))
+ACTIVITY_CACHE_MAX_ENTRIES = int(os.getenv("ACTIVITY_CACHE_MAX_ENTRIES", "1024"))
+
+# Background refresh: request counts are kept for at most
+# REFRESH_TRACKED_KEYS combinations (halving every REFRESH_HALF_LIFE
+# seconds). Every REFRESH_INTERVAL seconds the REFRESH_HOT_KEYS most asked
+# about are refreshed if they expire within REFRESH_AHEAD seconds, on
+# REFRESH_WORKERS threads with at most REFRESH_MAX_PENDING refreshes queued.
+REFRESH_TRACKED_KEYS = int(os.getenv("REFRESH_TRACKED_KEYS", "512"))
+REFRESH_HALF_LIFE = float(os.getenv("REFRESH_HALF_LIFE", "300"))
+REFRESH_HOT_KEYS = int(os.getenv("REFRESH_HOT_KEYS", "50"))
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "5"))
+REFRESH_AHEAD = float(os.getenv("REFRESH_AHEAD", "15"))
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "4"))
+REFRESH_MAX_PENDING = int(os.getenv("REFRESH_MAX_PENDING", "64"))
+
+# Import the views and upstream clients and build the roster when the
+# WSGI/ASGI application is created instead of on each worker's first
+# request. With `gunicorn --preload` this happens once, before forking.
+PRELOAD_APP = os.getenv("PRELOAD_APP", "false").lower() in ("1", "true", "yes")
+
+# Most messages accepted by one batch chat request
+CHAT_BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", "50"))
+
+# Seconds browsers and proxies may reuse a GET /api/chat/ answer before
+# revalidating it with its ETag
+CHAT_CACHE_MAX_AGE = int(os.getenv("CHAT_CACHE_MAX_AGE", "30"))
+
+# Items per page of a structured chat reply, by default and at most (the
+# upstreams return at most 100 per search page)
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+CHAT_PAGE_MAX_SIZE = int(os.getenv("CHAT_PAGE_MAX_SIZE", "100"))
+
+# Shared secrets of the GitHub and Jira webhooks; deliveries are refused
+# while unset. Up to WEBHOOK_QUEUE_SIZE events wait to be applied, further
+# deliveries get a 503 so the sender retries them.
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+JIRA_WEBHOOK_SECRET = os.getenv("JIRA_WEBHOOK_SECRET", "")
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Jira statuses that count as closed in activity analytics (comma-separated,
+# case-insensitive)
+JIRA_DONE_STATUSES = [
+    status.strip() for status in os.getenv("JIRA_DONE_STATUSES", "Done,Closed,Resolved").split(",") if status.strip()
+]
@@ -0,0 +1,40 @@
+"""
+Lean serving profile: only the chat API, static files and the health and
+metrics routes.
+
+    DJANGO_SETTINGS_MODULE=team_activity_tracker.settings_lean gunicorn team_activity_tracker.wsgi:application
+
+Drops the admin, auth, sessions, messages and django_extensions apps and
+their middleware, which the JSON API never uses, and renders JSON only.
+Management commands (migrate, sync_activity, ...) keep using the default
+settings.
+"""
+
+from team_activity_tracker.settings import *  # pylint: disable=wildcard-import,unused-wildcard-import
+
+INSTALLED_APPS = [
+    "django.contrib.staticfiles",
+    "chatbot",
+    "rest_framework",
+    "team_activity_tracker",
+]
+
+MIDDLEWARE = [
+    "team_activity_tracker.middleware.ServerTimingMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "team_activity_tracker.middleware.AsyncWhiteNoiseMiddleware",
+]
+
+ROOT_URLCONF = "team_activity_tracker.urls_lean"
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# No users: skip authentication and the browsable API
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
@@ -17,10 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
-from .views import PingView
+from .views import MetricsView, PingView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("chatbot.urls")),
     path("ping", PingView.as_view({"get": "ping"})),
+    path("metrics", MetricsView.as_view({"get": "metrics"})),
 ]
@@ -0,0 +1,14 @@
+"""
+URL configuration for the lean serving profile (``settings_lean``): the
+default routes without the admin.
+"""
+
+from django.urls import include, path
+
+from .views import MetricsView, PingView
+
+urlpatterns = [
+    path("api/", include("chatbot.urls")),
+    path("ping", PingView.as_view({"get": "ping"})),
+    path("metrics", MetricsView.as_view({"get": "metrics"})),
+]
@@ -1,8 +1,16 @@
+from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK
 from rest_framework.viewsets import ViewSet
 
+from chatbot.metrics import render_metrics
+
 
 class PingView(ViewSet):
     def ping(self, request):
         return Response({"success": True, "data": "pong"}, status=HTTP_200_OK)
+
+
+class MetricsView(ViewSet):
+    def metrics(self, request):
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -11,6 +11,10 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from team_activity_tracker.preload import preload_app
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "team_activity_tracker.settings")
 
 application = get_wsgi_application()
+
+preload_app()